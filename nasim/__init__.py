@@ -1,13 +1,13 @@
 import gymnasium as gym
 from gymnasium.envs.registration import register
 
-from nasim.envs import NASimEnv
+from nasim.envs import NASimEnv, NASimVectorEnv
 from nasim.scenarios.benchmark import AVAIL_BENCHMARKS
 from nasim.scenarios import \
     make_benchmark_scenario, load_scenario, generate_scenario
 
 
-__all__ = ['make_benchmark', 'load', 'generate']
+__all__ = ['make_benchmark', 'make_vector_benchmark', 'load', 'generate']
 
 
 def make_benchmark(scenario_name,
@@ -15,7 +15,9 @@ def make_benchmark(scenario_name,
                    fully_obs=False,
                    flat_actions=True,
                    flat_obs=True,
-                   render_mode=None):
+                   render_mode=None,
+                   reuse_obs_buffer=False,
+                   packed_obs=False):
     """Make a new benchmark NASim environment.
 
     Parameters
@@ -35,6 +37,14 @@ def make_benchmark(scenario_name,
         will use a 2D observation space (default=True)
     render_mode : str, optional
             The render mode to use for the environment.
+    reuse_obs_buffer : bool, optional
+        if true then observations are written into a single buffer that is
+        overwritten by the next call to step or reset, so they must be
+        copied if they need to be kept (default=False)
+    packed_obs : bool, optional
+        if true then observations are the packed state key, a small uint8
+        array suited to tabular agents. Requires fully_obs=True
+        (default=False)
 
     Returns
     -------
@@ -49,17 +59,64 @@ def make_benchmark(scenario_name,
     env_kwargs = {"fully_obs": fully_obs,
                   "flat_actions": flat_actions,
                   "flat_obs": flat_obs,
-                  "render_mode": render_mode}
+                  "render_mode": render_mode,
+                  "reuse_obs_buffer": reuse_obs_buffer,
+                  "packed_obs": packed_obs}
     scenario = make_benchmark_scenario(scenario_name, seed)
     return NASimEnv(scenario, **env_kwargs)
 
 
+def make_vector_benchmark(scenario_name,
+                          num_envs,
+                          seed=None,
+                          fully_obs=False,
+                          flat_obs=True,
+                          autoreset=False):
+    """Make a new batched benchmark NASim environment.
+
+    Parameters
+    ----------
+    scenario_name : str
+        the name of the benchmark environment
+    num_envs : int
+        the number of episodes to run in parallel
+    seed : int, optional
+        random seed to use to generate environment (default=None)
+    fully_obs : bool, optional
+        the observability mode of environment, if True then uses fully
+        observable mode, otherwise partially observable (default=False)
+    flat_obs : bool, optional
+        if true then uses a 1D observation space. If False
+        will use a 2D observation space (default=True)
+    autoreset : bool, optional
+        if true then finished episodes are reset automatically at the end of
+        each step (default=False)
+
+    Returns
+    -------
+    NASimVectorEnv
+        a new batched environment instance
+
+    Raises
+    ------
+    NotImplementederror
+        if scenario_name does no match any implemented benchmark scenarios.
+    """
+    env_kwargs = {"fully_obs": fully_obs,
+                  "flat_obs": flat_obs,
+                  "autoreset": autoreset}
+    scenario = make_benchmark_scenario(scenario_name, seed)
+    return NASimVectorEnv(scenario, num_envs, **env_kwargs)
+
+
 def load(path,
          fully_obs=False,
          flat_actions=True,
          flat_obs=True,
          name=None,
-         render_mode=None):
+         render_mode=None,
+         reuse_obs_buffer=False,
+         packed_obs=False):
     """Load NASim Environment from a .yaml scenario file.
 
     Parameters
@@ -80,6 +137,14 @@ def load(path,
         (default=None)
     render_mode : str, optional
             The render mode to use for the environment.
+    reuse_obs_buffer : bool, optional
+        if true then observations are written into a single buffer that is
+        overwritten by the next call to step or reset, so they must be
+        copied if they need to be kept (default=False)
+    packed_obs : bool, optional
+        if true then observations are the packed state key, a small uint8
+        array suited to tabular agents. Requires fully_obs=True
+        (default=False)
 
     Returns
     -------
@@ -89,7 +154,9 @@ def load(path,
     env_kwargs = {"fully_obs": fully_obs,
                   "flat_actions": flat_actions,
                   "flat_obs": flat_obs,
-                  "render_mode": render_mode}
+                  "render_mode": render_mode,
+                  "reuse_obs_buffer": reuse_obs_buffer,
+                  "packed_obs": packed_obs}
     scenario = load_scenario(path, name=name)
     return NASimEnv(scenario, **env_kwargs)
 
@@ -100,6 +167,8 @@ def generate(num_hosts,
              flat_actions=True,
              flat_obs=True,
              render_mode=None,
+             reuse_obs_buffer=False,
+             packed_obs=False,
              **params):
     """Construct Environment from an auto generated network.
 
@@ -120,6 +189,14 @@ def generate(num_hosts,
         will use a 2D observation space (default=True)
     render_mode : str, optional
             The render mode to use for the environment.
+    reuse_obs_buffer : bool, optional
+        if true then observations are written into a single buffer that is
+        overwritten by the next call to step or reset, so they must be
+        copied if they need to be kept (default=False)
+    packed_obs : bool, optional
+        if true then observations are the packed state key, a small uint8
+        array suited to tabular agents. Requires fully_obs=True
+        (default=False)
     params : dict, optional
         generator params (see :class:`ScenarioGenertor` for full list)
 
@@ -131,7 +208,9 @@ def generate(num_hosts,
     env_kwargs = {"fully_obs": fully_obs,
                   "flat_actions": flat_actions,
                   "flat_obs": flat_obs,
-                  "render_mode": render_mode}
+                  "render_mode": render_mode,
+                  "reuse_obs_buffer": reuse_obs_buffer,
+                  "packed_obs": packed_obs}
     scenario = generate_scenario(num_hosts, num_services, **params)
     return NASimEnv(scenario, **env_kwargs)
 
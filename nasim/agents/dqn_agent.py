@@ -8,6 +8,11 @@ the nasim/agents dir:
 
 $ python dqn_agent.py tiny
 
+To collect training experience from several episodes at once using a
+NASimVectorEnv, e.g. 8 episodes:
+
+$ python dqn_agent.py tiny --num_envs 8
+
 To see detailed results using tensorboard:
 
 $ tensorboard --logdir runs/
@@ -65,6 +70,17 @@ class ReplayMemory:
         self.ptr = (self.ptr + 1) % self.capacity
         self.size = min(self.size+1, self.capacity)
 
+    def store_batch(self, s, a, next_s, r, done):
+        """Store a batch of transitions, e.g. from a NASimVectorEnv step """
+        idxs = (self.ptr + np.arange(len(s))) % self.capacity
+        self.s_buf[idxs] = s
+        self.a_buf[idxs] = np.reshape(a, (-1, 1))
+        self.next_s_buf[idxs] = next_s
+        self.r_buf[idxs] = r
+        self.done_buf[idxs] = done
+        self.ptr = (self.ptr + len(s)) % self.capacity
+        self.size = min(self.size+len(s), self.capacity)
+
     def sample_batch(self, batch_size):
         sample_idxs = np.random.choice(self.size, batch_size)
         batch = [self.s_buf[sample_idxs],
@@ -120,6 +136,7 @@ class DQNAgent:
                  hidden_sizes=[64, 64],
                  target_update_freq=1000,
                  verbose=True,
+                 vector_env=None,
                  **kwargs):
 
         # This DQN implementation only works for flat actions
@@ -134,8 +151,16 @@ class DQNAgent:
         if self.seed is not None:
             np.random.seed(self.seed)
 
-        # environment setup
+        # environment setup, if given vector_env is used for training and env
+        # for evaluation
         self.env = env
+        if vector_env is not None:
+            assert vector_env.autoreset, \
+                "Training vector env must reset finished episodes"
+            assert vector_env.single_observation_space.shape \
+                == env.observation_space.shape
+            assert vector_env.single_action_space.n == env.action_space.n
+        self.vector_env = vector_env
 
         self.num_actions = self.env.action_space.n
         self.obs_dim = self.env.observation_space.shape
@@ -196,6 +221,15 @@ class DQNAgent:
             return self.dqn.get_action(o).cpu().item()
         return random.randint(0, self.num_actions-1)
 
+    def get_egreedy_actions(self, o, epsilon):
+        """Get e-greedy action for each of a batch of observations """
+        actions = np.random.randint(self.num_actions, size=len(o))
+        greedy = np.random.random(len(o)) > epsilon
+        if greedy.any():
+            o = torch.from_numpy(o[greedy]).float().to(self.device)
+            actions[greedy] = self.dqn.get_action(o).cpu().numpy()
+        return actions
+
     def optimize(self):
         batch = self.replay.sample_batch(self.batch_size)
         s_batch, a_batch, next_s_batch, r_batch, d_batch = batch
@@ -229,6 +263,10 @@ class DQNAgent:
         if self.verbose:
             print("\nStarting training")
 
+        if self.vector_env is not None:
+            self.train_vector()
+            return
+
         num_episodes = 0
         training_steps_remaining = self.training_steps
 
@@ -267,6 +305,72 @@ class DQNAgent:
             print(f"\treturn = {ep_return}")
             print(f"\tgoal = {goal}")
 
+    def train_vector(self):
+        """Train using the episodes of the vector env.
+
+        Each step the transitions of every episode are stored, followed by
+        one optimization step per transition, so training steps count
+        transitions as with :func:`train`.
+        """
+        env = self.vector_env
+        num_episodes = 0
+        ep_returns = np.zeros(env.num_envs)
+        ep_steps = np.zeros(env.num_envs, dtype=np.int64)
+
+        o, _ = env.reset()
+        while self.steps_done < self.training_steps:
+            a = self.get_egreedy_actions(o, self.get_epsilon())
+            next_o, r, done, env_step_limit_reached, info = env.step(a)
+
+            # observations of finished episodes are of the reset episode
+            final_o = next_o
+            if "final_obs" in info:
+                final_o = next_o.copy()
+                final_o[info["final_env_idxs"]] = info["final_obs"]
+            self.replay.store_batch(o, a, final_o, r, done)
+
+            for _ in range(env.num_envs):
+                self.steps_done += 1
+                loss, mean_v = self.optimize()
+                self.logger.add_scalar("loss", loss, self.steps_done)
+                self.logger.add_scalar("mean_v", mean_v, self.steps_done)
+
+            ep_returns += r
+            ep_steps += 1
+            for i in np.flatnonzero(done | env_step_limit_reached):
+                num_episodes += 1
+                self.logger.add_scalar(
+                    "episode", num_episodes, self.steps_done
+                )
+                self.logger.add_scalar(
+                    "epsilon", self.get_epsilon(), self.steps_done
+                )
+                self.logger.add_scalar(
+                    "episode_return", ep_returns[i], self.steps_done
+                )
+                self.logger.add_scalar(
+                    "episode_steps", ep_steps[i], self.steps_done
+                )
+                self.logger.add_scalar(
+                    "episode_goal_reached", int(done[i]), self.steps_done
+                )
+                if num_episodes % 10 == 0 and self.verbose:
+                    print(f"\nEpisode {num_episodes}:")
+                    print(f"\tsteps done = {self.steps_done} / "
+                          f"{self.training_steps}")
+                    print(f"\treturn = {ep_returns[i]}")
+                    print(f"\tgoal = {bool(done[i])}")
+                ep_returns[i] = 0
+                ep_steps[i] = 0
+
+            o = next_o
+
+        self.logger.close()
+        if self.verbose:
+            print("Training complete")
+            print(f"\tepisodes = {num_episodes}")
+            print(f"\tsteps done = {self.steps_done} / {self.training_steps}")
+
     def run_train_episode(self, step_limit):
         o, _ = self.env.reset()
         self.env.render()
@@ -380,6 +484,9 @@ if __name__ == "__main__":
                         help="(default=0.99)")
     parser.add_argument("--quite", action="store_false",
                         help="Run in Quite mode")
+    parser.add_argument("--num_envs", type=int, default=1,
+                        help=("Number of episodes to train on at once using "
+                              "a NASimVectorEnv (default=1)"))
     args = parser.parse_args()
 
     env = nasim.make_benchmark(args.env_name,
@@ -387,6 +494,19 @@ if __name__ == "__main__":
                                fully_obs=not args.partially_obs,
                                flat_actions=True,
                                flat_obs=True)
-    dqn_agent = DQNAgent(env, verbose=args.quite, **vars(args))
+    vector_env = None
+    if args.num_envs > 1:
+        vector_env = nasim.make_vector_benchmark(
+            args.env_name,
+            args.num_envs,
+            args.seed,
+            fully_obs=not args.partially_obs,
+            flat_obs=True,
+            autoreset=True
+        )
+    dqn_agent = DQNAgent(env,
+                         verbose=args.quite,
+                         vector_env=vector_env,
+                         **vars(args))
     dqn_agent.train()
     dqn_agent.run_eval_episode(render=args.render_eval)
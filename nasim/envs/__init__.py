@@ -1,2 +1,3 @@
 from nasim.envs.gym_env import NASimGymEnv
 from nasim.envs.environment import NASimEnv
+from nasim.envs.vector_env import NASimVectorEnv
@@ -31,15 +31,31 @@ actions or not:
 - :class:`FlatActionSpace`
 - :class:`ParameterisedActionSpace`
 
+**Compiled actions:**
+
+For array based stepping and action masking, a list of actions can be
+compiled into a :class:`ActionTable`, which stores each action attribute
+as a NumPy array indexed by flat action index.
+
 """
 
 import math
+from collections.abc import Mapping
 import numpy as np
 from gymnasium import spaces
 
 from nasim.envs.utils import AccessLevel
 
 
+# Action type codes used by ActionTable
+EXPLOIT = 0
+PRIVILEGE_ESCALATION = 1
+SERVICE_SCAN = 2
+OS_SCAN = 3
+SUBNET_SCAN = 4
+PROCESS_SCAN = 5
+
+
 def load_action_list(scenario):
     """Load list of actions for environment for given scenario
 
@@ -538,6 +554,38 @@ class NoOp(Action):
                          req_access=AccessLevel.NONE)
 
 
+class HostMaskMap(Mapping):
+    """A read-only map from host address to whether the host is in a mask.
+
+    Used for the address keyed results of an ActionResult, so that the
+    per host dict is only built for callers that read it.
+    """
+
+    def __init__(self, host_num_map, mask):
+        """
+        Parameters
+        ----------
+        host_num_map : dict
+            map from host address to host number, ordered by host number
+        mask : numpy.Array
+            boolean mask over host numbers
+        """
+        self.host_num_map = host_num_map
+        self.mask = mask
+
+    def __getitem__(self, host_addr):
+        return bool(self.mask[self.host_num_map[host_addr]])
+
+    def __iter__(self):
+        return iter(self.host_num_map)
+
+    def __len__(self):
+        return len(self.host_num_map)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
 class ActionResult:
     """A dataclass for storing the results of an Action.
 
@@ -573,6 +621,12 @@ class ActionResult:
         failure)
     newly_discovered : dict
         host addresses discovered for the first time by action
+    discovered_mask : numpy.Array
+        boolean mask over host numbers of hosts discovered by action, or
+        None if action did not discover hosts
+    newly_discovered_mask : numpy.Array
+        boolean mask over host numbers of hosts discovered for the first
+        time by action, or None if action did not discover hosts
     """
 
     def __init__(self,
@@ -586,7 +640,10 @@ class ActionResult:
                  connection_error=False,
                  permission_error=False,
                  undefined_error=False,
-                 newly_discovered=None):
+                 newly_discovered=None,
+                 discovered_mask=None,
+                 newly_discovered_mask=None,
+                 host_num_map=None):
         """
         Parameters
         ----------
@@ -612,6 +669,17 @@ class ActionResult:
             True if action failed due to an undefined error (default=False)
         newly_discovered : dict, optional
             host addresses discovered for first time by action (default=None)
+        discovered_mask : numpy.Array, optional
+            boolean mask over host numbers of hosts discovered by action, if
+            given and discovered is None then discovered is a read-only view
+            of the mask keyed by host address (default=None)
+        newly_discovered_mask : numpy.Array, optional
+            boolean mask over host numbers of hosts discovered for first time
+            by action, used for newly_discovered in the same way as
+            discovered_mask (default=None)
+        host_num_map : dict, optional
+            map from host address to host number, required if either mask is
+            given (default=None)
         """
         self.success = success
         self.value = value
@@ -619,10 +687,18 @@ class ActionResult:
         self.os = {} if os is None else os
         self.processes = {} if processes is None else processes
         self.access = {} if access is None else access
+        self.discovered_mask = discovered_mask
+        self.newly_discovered_mask = newly_discovered_mask
+        if discovered is None and discovered_mask is not None:
+            discovered = HostMaskMap(host_num_map, discovered_mask)
         self.discovered = {} if discovered is None else discovered
         self.connection_error = connection_error
         self.permission_error = permission_error
         self.undefined_error = undefined_error
+        if newly_discovered is None and newly_discovered_mask is not None:
+            newly_discovered = HostMaskMap(
+                host_num_map, newly_discovered_mask
+            )
         if newly_discovered is not None:
             self.newly_discovered = newly_discovered
         else:
@@ -657,6 +733,92 @@ class ActionResult:
         return "\n".join(output)
 
 
+class ActionTable:
+    """A list of actions compiled into arrays.
+
+    Each attribute is a NumPy array with one entry per action, so the
+    attributes of a batch of actions can be looked up by indexing with
+    the action indices rather than by calling methods on Action objects.
+
+    ...
+
+    Attributes
+    ----------
+    type_code : numpy.Array
+        the action type code (e.g. EXPLOIT, SUBNET_SCAN, etc.)
+    target : numpy.Array
+        the host number (i.e. state tensor row) of the action target
+    service : numpy.Array
+        the index of the exploit service in the scenario services list, or
+        -1 if action has no service
+    os : numpy.Array
+        the index of the required OS in the scenario os list, or -1 if action
+        has no OS requirement
+    process : numpy.Array
+        the index of the privilege escalation process in the scenario
+        processes list, or -1 if action has no process
+    prob : numpy.Array
+        the success probability of the action
+    cost : numpy.Array
+        the cost of the action
+    req_access : numpy.Array
+        the access level required to perform the action
+    access : numpy.Array
+        the access level granted by the action if successful (0 for actions
+        that don't grant access)
+    """
+
+    type_codes = {
+        Exploit: EXPLOIT,
+        PrivilegeEscalation: PRIVILEGE_ESCALATION,
+        ServiceScan: SERVICE_SCAN,
+        OSScan: OS_SCAN,
+        SubnetScan: SUBNET_SCAN,
+        ProcessScan: PROCESS_SCAN
+    }
+
+    def __init__(self, scenario, actions):
+        """
+        Parameters
+        ----------
+        scenario : Scenario
+            scenario description
+        actions : list of Actions
+            the actions to compile
+        """
+        num_actions = len(actions)
+        self.type_code = np.zeros(num_actions, dtype=np.int8)
+        self.target = np.zeros(num_actions, dtype=np.int64)
+        self.service = np.full(num_actions, -1, dtype=np.int64)
+        self.os = np.full(num_actions, -1, dtype=np.int64)
+        self.process = np.full(num_actions, -1, dtype=np.int64)
+        self.prob = np.zeros(num_actions, dtype=np.float64)
+        self.cost = np.zeros(num_actions, dtype=np.float32)
+        self.req_access = np.zeros(num_actions, dtype=np.float32)
+        self.access = np.zeros(num_actions, dtype=np.float32)
+
+        service_idx = {srv: i for i, srv in enumerate(scenario.services)}
+        os_idx = {os: i for i, os in enumerate(scenario.os)}
+        process_idx = {proc: i for i, proc in enumerate(scenario.processes)}
+        for a_idx, a in enumerate(actions):
+            self.type_code[a_idx] = self.type_codes[type(a)]
+            self.target[a_idx] = scenario.host_num_map[a.target]
+            self.prob[a_idx] = a.prob
+            self.cost[a_idx] = a.cost
+            self.req_access[a_idx] = a.req_access
+            if getattr(a, "service", None) is not None:
+                self.service[a_idx] = service_idx[a.service]
+            if getattr(a, "os", None) is not None:
+                self.os[a_idx] = os_idx[a.os]
+            if getattr(a, "process", None) is not None:
+                self.process[a_idx] = process_idx[a.process]
+            if getattr(a, "access", None) is not None:
+                self.access[a_idx] = a.access
+
+    def __len__(self):
+        return len(self.type_code)
+
+
 class FlatActionSpace(spaces.Discrete):
     """Flat Action space for NASim environment.
 
@@ -670,6 +832,8 @@ class FlatActionSpace(spaces.Discrete):
         the number of actions in the action space
     actions : list of Actions
         the list of the Actions in the action space
+    table : ActionTable
+        the actions in the action space compiled into arrays
     """
 
     def __init__(self, scenario):
@@ -680,6 +844,7 @@ class FlatActionSpace(spaces.Discrete):
             scenario description
         """
         self.actions = load_action_list(scenario)
+        self.table = ActionTable(scenario, self.actions)
         super().__init__(len(self.actions))
 
     def get_action(self, action_idx):
@@ -695,7 +860,7 @@ class FlatActionSpace(spaces.Discrete):
         Action
             Corresponding Action object
         """
-        assert isinstance(action_idx, int), \
+        assert isinstance(action_idx, (int, np.integer)), \
             ("When using flat action space, action must be an integer"
              f" or an Action object: {action_idx} is invalid")
         return self.actions[action_idx]
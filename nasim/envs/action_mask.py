@@ -0,0 +1,178 @@
+"""Incrementally maintained action masks for NASim action spaces.
+
+An action is masked out (0) when the status of its target host means it is
+guaranteed to fail in the current state, and is valid (1) otherwise:
+
+- remote actions (exploits, service scans and OS scans) require the target
+  host to be discovered and reachable
+- on-host actions (subnet scans, process scans and privilege escalations)
+  require the target host to be compromised
+
+The validity of every action depends only on a few status bits of its target
+host, so the masks are only updated for hosts whose status has changed since
+the last call.
+"""
+import numpy as np
+
+from nasim.envs.action import (
+    FlatActionSpace,
+    ParameterisedActionSpace,
+    EXPLOIT,
+    SERVICE_SCAN,
+    OS_SCAN,
+    Exploit,
+    ServiceScan,
+    OSScan
+)
+
+# host status columns
+REMOTE_VALID = 0
+LOCAL_VALID = 1
+
+
+class ActionMask:
+    """Action mask for a NASim action space.
+
+    For a :class:`FlatActionSpace` the mask is a ``(n, )`` int8 array, one
+    entry per action. For a :class:`ParameterisedActionSpace` the mask is a
+    tuple with one int8 array per action parameter, where each entry is 1 if
+    there is at least one valid action using that parameter value. Both
+    forms can be passed directly to the ``sample`` method of the space.
+
+    The returned masks are read-only views of arrays owned by the
+    ActionMask and are updated in place, so they should be copied if they
+    need to be kept after the next call to :func:`get_mask`.
+
+    ...
+
+    Attributes
+    ----------
+    action_space : FlatActionSpace or ParameterisedActionSpace
+        the action space being masked
+    """
+
+    def __init__(self, scenario, action_space):
+        """
+        Parameters
+        ----------
+        scenario : Scenario
+            scenario description
+        action_space : FlatActionSpace or ParameterisedActionSpace
+            the action space to mask
+        """
+        self.action_space = action_space
+        self.num_hosts = len(scenario.host_num_map)
+        self._status = np.zeros((self.num_hosts, 2), dtype=bool)
+        self._last_state = None
+
+        if isinstance(action_space, FlatActionSpace):
+            self._init_flat(action_space.table)
+        elif isinstance(action_space, ParameterisedActionSpace):
+            self._init_parameterised(scenario)
+        else:
+            raise NotImplementedError(
+                f"Action mask not implemented for {type(action_space)}"
+            )
+
+    def _init_flat(self, table):
+        self._target = table.target
+        self._status_col = np.where(
+            np.isin(table.type_code, [EXPLOIT, SERVICE_SCAN, OS_SCAN]),
+            REMOTE_VALID,
+            LOCAL_VALID
+        )
+        # action indices grouped by target host
+        self._host_action_order = np.argsort(self._target, kind="stable")
+        self._host_action_bounds = np.searchsorted(
+            self._target[self._host_action_order],
+            np.arange(self.num_hosts + 1)
+        )
+        self._mask = np.zeros(len(table), dtype=np.int8)
+        self._masks = None
+        self._mask_view = _read_only_view(self._mask)
+
+    def _init_parameterised(self, scenario):
+        space = self.action_space
+        self._type_status_col = np.array([
+            REMOTE_VALID if a_class in (Exploit, ServiceScan, OSScan)
+            else LOCAL_VALID
+            for a_class in space.action_types
+        ])
+        # host number selected by each (subnet, host) parameter pair, see
+        # ParameterisedActionSpace.get_action
+        subnets = scenario.subnets
+        self._param_hosts = np.zeros(
+            (len(subnets)-1, max(subnets)), dtype=np.int64
+        )
+        for subnet in range(1, len(subnets)):
+            for host in range(max(subnets)):
+                addr = (subnet, host % subnets[subnet])
+                self._param_hosts[subnet-1, host] = scenario.host_num_map[addr]
+        self._masks = tuple(
+            np.ones(n, dtype=np.int8) for n in space.nvec
+        )
+        self._mask = None
+        self._mask_view = tuple(_read_only_view(m) for m in self._masks)
+
+    def get_mask(self, state):
+        """Get the action mask for given state.
+
+        Parameters
+        ----------
+        state : State
+            the state to get mask for
+
+        Returns
+        -------
+        numpy.Array or tuple of numpy.Array
+            the action mask (see class description)
+        """
+        if state is not self._last_state:
+            self._update(state)
+            self._last_state = state
+        return self._mask_view
+
+    def reset(self):
+        """Clear cached state so next call to get_mask updates every host """
+        self._last_state = None
+        self._status[:] = False
+        if self._mask is not None:
+            self._mask[:] = 0
+
+    def _update(self, state):
+        status = np.stack([
+            state.discovered_mask() & state.reachable_mask(),
+            state.compromised_mask()
+        ], axis=1)
+        changed = np.flatnonzero((status != self._status).any(axis=1))
+        if len(changed) == 0:
+            return
+        self._status = status
+
+        if self._mask is None:
+            self._update_parameterised()
+            return
+
+        order, bounds = self._host_action_order, self._host_action_bounds
+        a_idxs = np.concatenate(
+            [order[bounds[h]:bounds[h+1]] for h in changed]
+        )
+        self._mask[a_idxs] = status[
+            self._target[a_idxs], self._status_col[a_idxs]
+        ]
+
+    def _update_parameterised(self):
+        type_mask, subnet_mask, host_mask = self._masks[:3]
+        type_mask[:] = self._status.any(axis=0)[self._type_status_col]
+        # compromised hosts are always discovered and reachable, so a
+        # subnet or host parameter is valid if it selects a host that is
+        # valid for remote actions
+        param_valid = self._status[self._param_hosts, REMOTE_VALID]
+        subnet_mask[:] = param_valid.any(axis=1)
+        host_mask[:] = param_valid.any(axis=0)
+
+
+def _read_only_view(array):
+    view = array.view()
+    view.flags.writeable = False
+    return view
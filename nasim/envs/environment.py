@@ -7,9 +7,9 @@ from gymnasium import spaces
 import numpy as np
 
 from nasim.envs.state import State
-from nasim.envs.render import Viewer
 from nasim.envs.network import Network
 from nasim.envs.observation import Observation
+from nasim.envs.action_mask import ActionMask
 from nasim.envs.action import Action, FlatActionSpace, ParameterisedActionSpace
 
 
@@ -61,7 +61,9 @@ class NASimEnv(gym.Env):
                  fully_obs=False,
                  flat_actions=True,
                  flat_obs=True,
-                 render_mode=None):
+                 render_mode=None,
+                 reuse_obs_buffer=False,
+                 packed_obs=False):
         """
         Parameters
         ----------
@@ -78,6 +80,18 @@ class NASimEnv(gym.Env):
             observation space (default=True)
         render_mode : str, optional
             The render mode to use for the environment.
+        reuse_obs_buffer : bool, optional
+            If true then the environment writes every observation into the
+            same buffer, only updating the rows that changed, and returns a
+            view of it (so a flat observation is a reshape of the buffer
+            rather than a copy). Returned observations are then overwritten
+            by the next call to step or reset, so must be copied if they need
+            to be kept (default=False)
+        packed_obs : bool, optional
+            If true then observations are the packed state key (see
+            :func:`State.packed`), a small uint8 array that is suitable for
+            tabular agents. Requires fully_obs=True, and flat_obs is ignored
+            (default=False)
         """
         self.name = scenario.name
         self.scenario = scenario
@@ -85,9 +99,23 @@ class NASimEnv(gym.Env):
         self.flat_actions = flat_actions
         self.flat_obs = flat_obs
         self.render_mode = render_mode
+        self.reuse_obs_buffer = reuse_obs_buffer
+        self.packed_obs = packed_obs
+        assert fully_obs or not packed_obs, \
+            "Packed observations are only supported in fully observable mode"
 
-        self.network = Network(scenario)
+        self.network = Network(scenario, self.np_random)
         self.current_state = State.generate_initial_state(self.network)
+        if reuse_obs_buffer:
+            self._obs_buffer = Observation(self.current_state.shape())
+        else:
+            self._obs_buffer = None
+        # every episode starts from a copy of the initial state and
+        # observation, unless host configurations are randomized
+        self._initial_state = self.current_state
+        self._initial_obs = self._initial_state.get_initial_observation(
+            self.fully_obs
+        )
         self._renderer = None
         self.reset()
 
@@ -95,15 +123,24 @@ class NASimEnv(gym.Env):
             self.action_space = FlatActionSpace(self.scenario)
         else:
             self.action_space = ParameterisedActionSpace(self.scenario)
-
-        if self.flat_obs:
-            obs_shape = self.last_obs.shape_flat()
+        self._action_mask = ActionMask(self.scenario, self.action_space)
+
+        if self.packed_obs:
+            self.observation_space = spaces.Box(
+                low=0,
+                high=255,
+                shape=(State.packed_size(len(self.network.hosts)), ),
+                dtype=np.uint8
+            )
         else:
-            obs_shape = self.last_obs.shape()
-        obs_low, obs_high = Observation.get_space_bounds(self.scenario)
-        self.observation_space = spaces.Box(
-            low=obs_low, high=obs_high, shape=obs_shape
-        )
+            if self.flat_obs:
+                obs_shape = self.last_obs.shape_flat()
+            else:
+                obs_shape = self.last_obs.shape()
+            obs_low, obs_high = Observation.get_space_bounds(self.scenario)
+            self.observation_space = spaces.Box(
+                low=obs_low, high=obs_high, shape=obs_shape
+            )
 
         self.steps = 0
 
@@ -115,9 +152,19 @@ class NASimEnv(gym.Env):
         Parameters
         ----------
         seed : int, optional
-            the optional seed for the environments RNG
+            the optional seed for the environments RNG, which is used
+            for stochastic action outcomes
         options : dict, optional
-            optional environment options (does nothing in NASim at the moment)
+            optional reset options:
+
+            - randomize_hosts (bool): if True, the OS, services and
+              processes of every host are resampled uniformly at random for
+              this episode (see :func:`State.randomize_host_configs`),
+              otherwise hosts have their scenario configurations
+              (default=False)
+            - keep_sensitive_vulnerable (bool): if True, when randomizing
+              hosts every sensitive host is kept vulnerable to gaining root
+              access (default=True)
 
         Returns
         -------
@@ -127,14 +174,28 @@ class NASimEnv(gym.Env):
             auxiliary information regarding reset
         """
         super().reset(seed=seed, options=options)
+        if seed is not None:
+            # super().reset creates a new generator when seeded
+            self.network.seed(self.np_random)
         self.steps = 0
-        self.current_state = self.network.reset(self.current_state)
-        self.last_obs = self.current_state.get_initial_observation(
-            self.fully_obs
-        )
+        if options is not None and options.get("randomize_hosts", False):
+            self.current_state = self.network.reset(self._initial_state)
+            self.current_state.randomize_host_configs(
+                self.network,
+                self.np_random,
+                options.get("keep_sensitive_vulnerable", True)
+            )
+            self.last_obs = self.current_state.get_initial_observation(
+                self.fully_obs, obs=self._obs_buffer
+            )
+        else:
+            self.current_state = self._initial_state.copy()
+            self.last_obs = self._initial_obs.copy(out=self._obs_buffer)
 
-        if self.flat_obs:
-            obs = self.last_obs.numpy_flat()
+        if self.packed_obs:
+            obs = self.current_state.packed()
+        elif self.flat_obs:
+            obs = self.last_obs.numpy_flat(copy=self._obs_buffer is None)
         else:
             obs = self.last_obs.numpy()
 
@@ -167,15 +228,18 @@ class NASimEnv(gym.Env):
             auxiliary information regarding step
             (see :func:`nasim.env.action.ActionResult.info`)
         """
-        next_state, obs, reward, done, info = self.generative_step(
+        next_state, obs, reward, done, info = self._generative_step(
             self.current_state,
-            action
+            action,
+            obs=self._obs_buffer
         )
         self.current_state = next_state
         self.last_obs = obs
 
-        if self.flat_obs:
-            obs = obs.numpy_flat()
+        if self.packed_obs:
+            obs = next_state.packed()
+        elif self.flat_obs:
+            obs = obs.numpy_flat(copy=self._obs_buffer is None)
         else:
             obs = obs.numpy()
 
@@ -214,6 +278,9 @@ class NASimEnv(gym.Env):
             auxiliary information regarding step
             (see :func:`nasim.env.action.ActionResult.info`)
         """
+        return self._generative_step(state, action)
+
+    def _generative_step(self, state, action, obs=None):
         if not isinstance(action, Action):
             action = self.action_space.get_action(action)
 
@@ -221,7 +288,7 @@ class NASimEnv(gym.Env):
             state, action
         )
         obs = next_state.get_observation(
-            action, action_obs, self.fully_obs
+            action, action_obs, self.fully_obs, obs=obs
         )
         done = self.goal_reached(next_state)
         reward = action_obs.value - action.cost
@@ -291,11 +358,10 @@ class NASimEnv(gym.Env):
         if not isinstance(obs, Observation):
             obs = Observation.from_numpy(obs, self.current_state.shape())
 
-        if self._renderer is None:
-            self._renderer = Viewer(self.network)
+        renderer = self._get_renderer()
 
         if mode in ("human", "ansi"):
-            return self._renderer.render_readable(obs)
+            return renderer.render_readable(obs)
         else:
             raise NotImplementedError(
                 "Please choose correct render mode from :"
@@ -331,11 +397,10 @@ class NASimEnv(gym.Env):
                                      self.current_state.shape(),
                                      self.current_state.host_num_map)
 
-        if self._renderer is None:
-            self._renderer = Viewer(self.network)
+        renderer = self._get_renderer()
 
         if mode in ("human", "ansi"):
-            return self._renderer.render_readable_state(state)
+            return renderer.render_readable_state(state)
         else:
             raise NotImplementedError(
                 "Please choose correct render mode from : "
@@ -373,9 +438,8 @@ class NASimEnv(gym.Env):
         height : int
             height of GUI window
         """
-        if self._renderer is None:
-            self._renderer = Viewer(self.network)
-        self._renderer.render_episode(episode, width, height)
+        renderer = self._get_renderer()
+        renderer.render_episode(episode, width, height)
 
     def render_network_graph(self, ax=None, show=False):
         """Render a plot of network as a graph with hosts as nodes arranged
@@ -390,10 +454,9 @@ class NASimEnv(gym.Env):
             whether to display plot, or simply setup plot and showing plot
             can be handled elsewhere by user
         """
-        if self._renderer is None:
-            self._renderer = Viewer(self.network)
+        renderer = self._get_renderer()
         state = self.current_state
-        self._renderer.render_graph(state, ax, show)
+        renderer.render_graph(state, ax, show)
 
     def get_minimum_hops(self):
         """Get the minimum number of network hops required to reach targets.
@@ -410,23 +473,27 @@ class NASimEnv(gym.Env):
         return self.network.get_minimal_hops()
 
     def get_action_mask(self):
-        """Get a vector mask for valid actions.
+        """Get a mask for valid actions in the current state.
+
+        An action is valid unless the status of its target host means it is
+        guaranteed to fail. So remote actions (exploits, service and OS
+        scans) are valid if their target is discovered and reachable, and
+        on-host actions (subnet and process scans, privilege escalations)
+        are valid if their target is compromised.
+
+        The mask is maintained incrementally, only updating the actions of
+        hosts whose status changed since it was last requested.
 
         Returns
         -------
-        ndarray
-            numpy vector of 1's and 0's, one for each action. Where an
-            index will be 1 if action is valid given current state, or
-            0 if action is invalid.
+        ndarray or tuple of ndarray
+            if using flat action space, a read-only int8 numpy vector of 1's
+            and 0's, one for each action. Where an index will be 1 if action
+            is valid given current state, or 0 if action is invalid.
+            If using parameterised action space, a tuple with a mask for each
+            action parameter (see :class:`ActionMask`).
         """
-        assert isinstance(self.action_space, FlatActionSpace), \
-            "Can only use action mask function when using flat action space"
-        mask = np.zeros(self.action_space.n, dtype=np.int64)
-        for a_idx in range(self.action_space.n):
-            action = self.action_space.get_action(a_idx)
-            if self.network.host_discovered(action.target):
-                mask[a_idx] = 1
-        return mask
+        return self._action_mask.get_mask(self.current_state)
 
     def get_score_upper_bound(self):
         """Get the theoretical upper bound for total reward for scenario.
@@ -478,6 +545,14 @@ class NASimEnv(gym.Env):
         ]
         return "\n  ".join(output)
 
+    def _get_renderer(self):
+        if self._renderer is None:
+            # imported here so the rendering stack (tkinter, networkx,
+            # prettytable and matplotlib) is only loaded once it is used
+            from nasim.envs.render import Viewer
+            self._renderer = Viewer(self.network)
+        return self._renderer
+
     def close(self):
         if self._renderer is not None:
             self._renderer.close()
@@ -13,7 +13,9 @@ class NASimGymEnv(NASimEnv):
                  fully_obs=False,
                  flat_actions=True,
                  flat_obs=True,
-                 render_mode=None):
+                 render_mode=None,
+                 reuse_obs_buffer=False,
+                 packed_obs=False):
         """
         Parameters
         ----------
@@ -31,6 +33,14 @@ class NASimGymEnv(NASimEnv):
             will use a 2D observation space (default=True)
         render_mode : str, optional
             The render mode to use for the environment.
+        reuse_obs_buffer : bool, optional
+            if true then observations are written into a single buffer that
+            is overwritten by the next call to step or reset, so they must
+            be copied if they need to be kept (default=False)
+        packed_obs : bool, optional
+            if true then observations are the packed state key, a small uint8
+            array suited to tabular agents. Requires fully_obs=True
+            (default=False)
         """
         if not isinstance(scenario, Scenario):
             scenario = make_benchmark_scenario(scenario)
@@ -38,4 +48,6 @@ class NASimGymEnv(NASimEnv):
                          fully_obs=fully_obs,
                          flat_actions=flat_actions,
                          flat_obs=flat_obs,
-                         render_mode=render_mode)
+                         render_mode=render_mode,
+                         reuse_obs_buffer=reuse_obs_buffer,
+                         packed_obs=packed_obs)
@@ -112,19 +112,25 @@ class HostVector:
         return cls(vector)
 
     @classmethod
-    def vectorize_random(cls, host, address_space_bounds, vector=None):
-        hvec = cls.vectorize(host, vector)
+    def vectorize_random(cls,
+                         host,
+                         address_space_bounds,
+                         vector=None,
+                         np_random=None):
+        if np_random is None:
+            np_random = np.random.default_rng()
+        hvec = cls.vectorize(host, address_space_bounds, vector)
         # random variables
         for srv_num in cls.service_idx_map.values():
-            srv_val = np.random.randint(0, 2)
+            srv_val = np_random.integers(0, 2)
             hvec.vector[cls._get_service_idx(srv_num)] = srv_val
 
-        chosen_os = np.random.choice(list(cls.os_idx_map.values()))
+        chosen_os = np_random.choice(list(cls.os_idx_map.values()))
         for os_num in cls.os_idx_map.values():
             hvec.vector[cls._get_os_idx(os_num)] = int(os_num == chosen_os)
 
         for proc_num in cls.process_idx_map.values():
-            proc_val = np.random.randint(0, 2)
+            proc_val = np_random.integers(0, 2)
             hvec.vector[cls._get_process_idx(proc_num)] = proc_val
         return hvec
 
@@ -304,8 +310,14 @@ class HostVector:
                 discovery_value=False,
                 services=False,
                 processes=False,
-                os=False):
-        obs = np.zeros(self.state_size, dtype=np.float32)
+                os=False,
+                out=None):
+        if out is None:
+            obs = np.zeros(self.state_size, dtype=np.float32)
+        else:
+            # write observation in place, e.g. into row of Observation tensor
+            obs = out
+            obs[:] = 0
         if address:
             subnet_slice = self._subnet_address_idx_slice()
             host_slice = self._host_address_idx_slice()
@@ -335,6 +347,45 @@ class HostVector:
             obs[idxs] = self.vector[idxs]
         return obs
 
+    @classmethod
+    def observation_mask(cls,
+                         address=False,
+                         compromised=False,
+                         reachable=False,
+                         discovered=False,
+                         access=False,
+                         value=False,
+                         discovery_value=False,
+                         services=False,
+                         processes=False,
+                         os=False):
+        """Get boolean mask of the features that are observed by
+        :func:`observe` with the same arguments.
+        """
+        mask = np.zeros(cls.state_size, dtype=bool)
+        if address:
+            mask[cls._subnet_address_idx_slice()] = True
+            mask[cls._host_address_idx_slice()] = True
+        if compromised:
+            mask[cls._compromised_idx] = True
+        if reachable:
+            mask[cls._reachable_idx] = True
+        if discovered:
+            mask[cls._discovered_idx] = True
+        if value:
+            mask[cls._value_idx] = True
+        if discovery_value:
+            mask[cls._discovery_value_idx] = True
+        if access:
+            mask[cls._access_idx] = True
+        if os:
+            mask[cls._os_idx_slice()] = True
+        if services:
+            mask[cls._service_idx_slice()] = True
+        if processes:
+            mask[cls._process_idx_slice()] = True
+        return mask
+
     def readable(self):
         return self.get_readable(self.vector)
 
@@ -58,6 +58,8 @@ class Observation:
         self.obs_shape = (state_shape[0]+1, state_shape[1])
         self.aux_row = self.obs_shape[0]-1
         self.tensor = np.zeros(self.obs_shape, dtype=np.float32)
+        # host rows written since tensor was last cleared (None if all rows)
+        self._written_rows = []
 
     @staticmethod
     def get_space_bounds(scenario):
@@ -84,10 +86,12 @@ class Observation:
         if o_array.shape != (state_shape[0]+1, state_shape[1]):
             o_array = o_array.reshape(state_shape[0]+1, state_shape[1])
         obs.tensor = o_array
+        obs._written_rows = None
         return obs
 
     def from_state(self, state):
-        self.tensor[:self.aux_row] = state.tensor
+        state.numpy(out=self.tensor[:self.aux_row])
+        self._written_rows = None
 
     def from_action_result(self, action_result):
         success = int(action_result.success)
@@ -104,7 +108,70 @@ class Observation:
         self.from_action_result(action_result)
 
     def update_from_host(self, host_idx, host_obs_vector):
-        self.tensor[host_idx][:] = host_obs_vector
+        self.get_host_row(host_idx)[:] = host_obs_vector
+
+    def update_from_hosts(self, host_idxs, host_obs_tensor):
+        """Write the observation rows of multiple hosts at once.
+
+        Parameters
+        ----------
+        host_idxs : numpy.Array
+            host numbers of rows to write
+        host_obs_tensor : numpy.Array
+            (len(host_idxs), host vector size) observation of each host
+        """
+        if self._written_rows is not None:
+            self._written_rows.extend(host_idxs)
+        self.tensor[host_idxs] = host_obs_tensor
+
+    def get_host_row(self, host_idx):
+        """Get writable view of the observation row of a host.
+
+        The row is recorded as written, so it is zeroed by :func:`clear`.
+        """
+        if self._written_rows is not None:
+            self._written_rows.append(host_idx)
+        return self.tensor[host_idx]
+
+    def copy(self, out=None):
+        """Get a copy of this observation.
+
+        Parameters
+        ----------
+        out : Observation, optional
+            if not None, this observation is copied into out in place,
+            rather than allocating a new observation (default=None)
+
+        Returns
+        -------
+        Observation
+            the copy
+        """
+        if out is None:
+            out = Observation.__new__(Observation)
+            out.obs_shape = self.obs_shape
+            out.aux_row = self.aux_row
+            out.tensor = np.copy(self.tensor)
+        else:
+            np.copyto(out.tensor, self.tensor)
+        if self._written_rows is None:
+            out._written_rows = None
+        else:
+            out._written_rows = list(self._written_rows)
+        return out
+
+    def clear(self):
+        """Reset observation to all zeros in place.
+
+        Only the rows written since the observation was last cleared are
+        zeroed.
+        """
+        if self._written_rows is None:
+            self.tensor[:] = 0
+        else:
+            self.tensor[self._written_rows] = 0
+            self.tensor[self.aux_row] = 0
+        self._written_rows = []
 
     @property
     def success(self):
@@ -170,14 +237,22 @@ class Observation:
         """
         return self.obs_shape
 
-    def numpy_flat(self):
+    def numpy_flat(self, copy=True):
         """Get the flattened observation tensor
 
+        Parameters
+        ----------
+        copy : bool, optional
+            if False returns a view of the observation tensor, rather than
+            a copy (default=True)
+
         Returns
         -------
         numpy.ndarray
             the flattened (1D) observation tenser
         """
+        if not copy:
+            return self.tensor.reshape(-1)
         return self.tensor.flatten()
 
     def numpy(self):
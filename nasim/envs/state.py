@@ -13,27 +13,74 @@ class State:
 
     ...
 
+    Internally the state is split into two matrices. The static features of
+    each host (address, value, discovery value, OS, services and processes)
+    are stored in a read-only matrix that is built once from the scenario
+    and shared by every copy of the state. The dynamic features (compromised,
+    reachable, discovered and access) are stored in a small ``(num_hosts, 4)``
+    matrix owned by each state, so copying a state only copies the dynamic
+    matrix. The full state tensor is assembled on demand.
+
+    Any static host row that is written (e.g. by a defender action) is first
+    copied into a small per-state mapping of row overrides that is shared
+    between copies until written again. The overrides are merged into a new
+    shared static matrix once they grow beyond a quarter of the hosts.
+
+    ...
+
     Attributes
     ----------
     tensor : numpy.Array
-        tensor representation of the state of network
+        tensor representation of the state of network (assembled on each
+        access, so modifying it does not affect the state)
+    static_tensor : numpy.Array
+        read-only tensor of the static host features (the dynamic feature
+        columns of this tensor are not used)
     host_num_map : dict
         mapping from host address to host number (this is used
         to map host address to host row in the network tensor)
     """
 
+    # compromised, reachable, discovered and two access level bits
+    packed_bits_per_host = 5
+
+    # columns of dynamic host feature matrix
+    _compromised_col = 0
+    _reachable_col = 1
+    _discovered_col = 2
+    _access_col = 3
+
     def __init__(self, network_tensor, host_num_map):
         """
         Parameters
         ----------
-        state_tensor : np.Array
-            the tensor representation of the network state
+        network_tensor : np.Array
+            the tensor representation of the network state, with one row
+            per host. The dynamic columns (compromised, reachable,
+            discovered and access) are copied into a separate array, while
+            the remaining static columns are kept as a read-only view of
+            the tensor that is shared with copies of the state. The state
+            takes ownership of the tensor, so it should not be modified
+            after being passed in.
         host_num_map : dict
             mapping from host address to host number (this is used
             to map host address to host row in the network tensor)
         """
-        self.tensor = network_tensor
         self.host_num_map = host_num_map
+        self._dynamic_idxs = np.array([
+            HostVector._compromised_idx,
+            HostVector._reachable_idx,
+            HostVector._discovered_idx,
+            HostVector._access_idx
+        ])
+        self._dynamic = network_tensor[:, self._dynamic_idxs]
+        static = network_tensor.view()
+        static.flags.writeable = False
+        self._static = static
+        # static row overrides, and the subset of them that are not shared
+        # with any other state
+        self._static_rows = {}
+        self._owned_rows = set()
 
     @classmethod
     def tensorize(cls, network):
@@ -58,20 +105,10 @@ class State:
 
     @classmethod
     def generate_random_initial_state(cls, network):
-        h0 = network.hosts[(1, 0)]
-        h0_vector = HostVector.vectorize_random(
-            h0, network.address_space_bounds
-        )
-        tensor = np.zeros(
-            (len(network.hosts), h0_vector.state_size),
-            dtype=np.float32
+        state = cls.tensorize(network)
+        state.randomize_host_configs(
+            network, network.np_random, keep_sensitive_vulnerable=False
         )
-        for host_addr, host in network.hosts.items():
-            host_num = network.host_num_map[host_addr]
-            HostVector.vectorize_random(
-                host, network.address_space_bounds, tensor[host_num]
-            )
-        state = cls(tensor, network.host_num_map)
         # ensure host state set correctly
         return network.reset(state)
 
@@ -81,6 +118,41 @@ class State:
             s_array = s_array.reshape(state_shape)
         return State(s_array, host_num_map)
 
+    @classmethod
+    def from_key(cls, key, template_state):
+        """Construct state from a packed state key.
+
+        Parameters
+        ----------
+        key : bytes or numpy.Array
+            the packed key, as returned by :func:`key` or :func:`packed`
+        template_state : State
+            a state of the same scenario, which is used for the static host
+            features (address, value, OS, services, etc)
+
+        Returns
+        -------
+        State
+            a new state with the same static features as template_state and
+            the dynamic features encoded in key
+        """
+        num_hosts = len(template_state.host_num_map)
+        if isinstance(key, bytes):
+            key = np.frombuffer(key, dtype=np.uint8)
+        bits = np.unpackbits(
+            key, count=num_hosts*cls.packed_bits_per_host
+        ).reshape(num_hosts, cls.packed_bits_per_host)
+        dynamic = np.empty((num_hosts, 4), dtype=np.float32)
+        dynamic[:, :3] = bits[:, :3]
+        dynamic[:, cls._access_col] = bits[:, 3] + 2*bits[:, 4]
+        return template_state._with_dynamic(dynamic)
+
+    @classmethod
+    def packed_size(cls, num_hosts):
+        """Get number of bytes in packed state key for given number of hosts
+        """
+        return -(-num_hosts*cls.packed_bits_per_host // 8)
+
     @classmethod
     def reset(cls):
         """Reset any class attributes for state """
@@ -93,34 +165,95 @@ class State:
             hosts.append((host_addr, self.get_host(host_addr)))
         return hosts
 
-    def copy(self):
-        new_tensor = np.copy(self.tensor)
-        return State(new_tensor, self.host_num_map)
+    @property
+    def tensor(self):
+        return self.numpy()
 
-    def get_initial_observation(self, fully_obs):
+    @property
+    def static_tensor(self):
+        if self._static_rows:
+            self._merge_static_rows()
+        return self._static
+
+    def copy(self):
+        if len(self._static_rows) > len(self.host_num_map) // 4:
+            self._merge_static_rows()
+        return self._with_dynamic(np.copy(self._dynamic))
+
+    def _with_dynamic(self, dynamic):
+        new_state = State.__new__(State)
+        new_state.host_num_map = self.host_num_map
+        new_state._dynamic_idxs = self._dynamic_idxs
+        new_state._dynamic = dynamic
+        new_state._static = self._static
+        # static row overrides are now shared with the new state
+        self._owned_rows = set()
+        new_state._static_rows = dict(self._static_rows)
+        new_state._owned_rows = set()
+        return new_state
+
+    def _merge_static_rows(self):
+        static = np.copy(self._static)
+        for host_idx, row in self._static_rows.items():
+            static[host_idx] = row
+        static.flags.writeable = False
+        self._static = static
+        self._static_rows = {}
+        self._owned_rows = set()
+
+    def _get_static_row(self, host_idx):
+        row = self._static_rows.get(host_idx)
+        if row is None:
+            return self._static[host_idx]
+        return row
+
+    def _get_host_rows(self, host_idxs):
+        rows = self._static[host_idxs]
+        if self._static_rows:
+            for i, host_idx in enumerate(host_idxs):
+                if host_idx in self._static_rows:
+                    rows[i] = self._static_rows[host_idx]
+        rows[:, self._dynamic_idxs] = self._dynamic[host_idxs]
+        return rows
+
+    def _get_host_vector(self, host_idx):
+        vector = np.copy(self._get_static_row(host_idx))
+        vector[self._dynamic_idxs] = self._dynamic[host_idx]
+        return HostVector(vector)
+
+    def get_initial_observation(self, fully_obs, obs=None):
         """Get the initial observation of network.
 
+        Parameters
+        ----------
+        fully_obs : bool
+            whether problem is fully observable or not
+        obs : Observation, optional
+            if not None, the observation is cleared and written to in place
+            rather than allocating a new observation (default=None)
+
         Returns
         -------
         Observation
             an observation object
         """
-        obs = Observation(self.shape())
+        if obs is None:
+            obs = Observation(self.shape())
+        else:
+            obs.clear()
         if fully_obs:
             obs.from_state(self)
             return obs
 
-        for host_addr, host in self.hosts:
-            if not host.reachable:
-                continue
-            host_obs = host.observe(address=True,
-                                    reachable=True,
-                                    discovered=True)
-            host_idx = self.get_host_idx(host_addr)
-            obs.update_from_host(host_idx, host_obs)
+        for host_idx in np.flatnonzero(self.reachable_mask()):
+            host = self._get_host_vector(host_idx)
+            host.observe(address=True,
+                         reachable=True,
+                         discovered=True,
+                         out=obs.get_host_row(host_idx))
         return obs
 
-    def get_observation(self, action, action_result, fully_obs):
+    def get_observation(self, action, action_result, fully_obs, obs=None):
         """Get observation given last action and action result
 
         Parameters
@@ -131,13 +264,19 @@ class State:
             observation from performing action
         fully_obs : bool
             whether problem is fully observable or not
+        obs : Observation, optional
+            if not None, the observation is cleared and written to in place
+            rather than allocating a new observation (default=None)
 
         Returns
         -------
         Observation
             an observation object
         """
-        obs = Observation(self.shape())
+        if obs is None:
+            obs = Observation(self.shape())
+        else:
+            obs.clear()
         obs.from_action_result(action_result)
         if fully_obs:
             obs.from_state(self)
@@ -181,71 +320,208 @@ class State:
             obs_kwargs["processes"] = True
             obs_kwargs["access"] = True
         elif action.is_subnet_scan():
-            for host_addr in action_result.discovered:
-                discovered = action_result.discovered[host_addr]
-                if not discovered:
-                    continue
-                d_idx, d_host = self.get_host_and_idx(host_addr)
-                newly_discovered = action_result.newly_discovered[host_addr]
-                d_obs = d_host.observe(
-                    discovery_value=newly_discovered, **obs_kwargs
-                )
-                obs.update_from_host(d_idx, d_obs)
+            if action_result.discovered_mask is not None:
+                d_idxs = np.flatnonzero(action_result.discovered_mask)
+                newly_discovered = action_result.newly_discovered_mask[d_idxs]
+            else:
+                # result only has address keyed dicts
+                d_addrs = [
+                    a for a, d in action_result.discovered.items() if d
+                ]
+                d_idxs = [self.host_num_map[a] for a in d_addrs]
+                newly_discovered = [
+                    action_result.newly_discovered[a] for a in d_addrs
+                ]
+            d_rows = self._get_host_rows(d_idxs)
+            d_obs = np.where(
+                HostVector.observation_mask(**obs_kwargs), d_rows, 0
+            ).astype(np.float32, copy=False)
+            dv_idx = HostVector._discovery_value_idx
+            d_obs[newly_discovered, dv_idx] = d_rows[newly_discovered, dv_idx]
+            obs.update_from_hosts(d_idxs, d_obs)
             # this is for target host (where scan was performed on)
             obs_kwargs["compromised"] = True
         else:
             raise NotImplementedError(f"Action {action} not implemented")
-        target_obs = t_host.observe(**obs_kwargs)
-        obs.update_from_host(t_idx, target_obs)
+        t_host.observe(out=obs.get_host_row(t_idx), **obs_kwargs)
         return obs
 
     def shape_flat(self):
-        return self.numpy_flat().shape
+        return (self._static.size, )
 
     def shape(self):
-        return self.tensor.shape
+        return self._static.shape
 
     def numpy_flat(self):
-        return self.tensor.flatten()
+        return self.numpy().reshape(-1)
+
+    def numpy(self, out=None):
+        """Get the full state tensor.
 
-    def numpy(self):
-        return self.tensor
+        Parameters
+        ----------
+        out : numpy.Array, optional
+            if not None, the tensor is written into this array rather than
+            a new array (default=None)
+
+        Returns
+        -------
+        numpy.Array
+            the state tensor, assembled from the static and dynamic host
+            features
+        """
+        if out is None:
+            out = np.empty(self._static.shape, dtype=np.float32)
+        out[:] = self._static
+        for host_idx, row in self._static_rows.items():
+            out[host_idx] = row
+        out[:, self._dynamic_idxs] = self._dynamic
+        return out
 
     def update_host(self, host_addr, host_vector):
         host_idx = self.host_num_map[host_addr]
-        self.tensor[host_idx] = host_vector.vector
+        vector = host_vector.vector
+        self._dynamic[host_idx] = vector[self._dynamic_idxs]
+        static_row = self._get_static_row(host_idx)
+        static_changed = static_row != vector
+        static_changed[self._dynamic_idxs] = False
+        if static_changed.any():
+            self._get_writable_static_row(host_idx)[:] = vector
+
+    def _get_writable_static_row(self, host_idx):
+        if host_idx not in self._owned_rows:
+            self._static_rows[host_idx] = np.copy(
+                self._get_static_row(host_idx)
+            )
+            self._owned_rows.add(host_idx)
+        return self._static_rows[host_idx]
+
+    def randomize_host_configs(self,
+                               network,
+                               np_random,
+                               keep_sensitive_vulnerable=True):
+        """Resample the OS, services and processes of every host in place.
+
+        Every host gets an OS chosen uniformly at random, and each service
+        and process is running with probability 0.5, all drawn at once. Only
+        this state uses the new configurations, any copies of it are not
+        affected.
+
+        Parameters
+        ----------
+        network : Network
+            the network of the state
+        np_random : numpy.random.Generator
+            random number generator
+        keep_sensitive_vulnerable : bool, optional
+            whether to ensure that every sensitive host is vulnerable to an
+            exploit that gives root access, or to an exploit and a privilege
+            escalation. If False the goal may be unreachable (default=True)
+        """
+        start = HostVector._os_start_idx
+        stop = HostVector._process_start_idx + HostVector.num_processes
+        num_os = HostVector.num_os
+        static = np.copy(self.static_tensor)
+        configs = static[:, start:stop]
+
+        draws = np_random.random(configs.shape)
+        os_nums = draws[:, :num_os].argmax(axis=1)
+        configs[:] = draws < 0.5
+        configs[:, :num_os] = 0
+        configs[np.arange(len(configs)), os_nums] = 1
+
+        if keep_sensitive_vulnerable:
+            sensitive = network.sensitive_host_nums
+            vulnerable = network.root_vulnerable_hosts(configs[sensitive])
+            for host_num in sensitive[~vulnerable]:
+                network.make_root_vulnerable(configs[host_num], np_random)
+
+        static.flags.writeable = False
+        self._static = static
+        self._static_rows = {}
+        self._owned_rows = set()
+
+    def reset_dynamic_features(self, reachable):
+        """Reset the dynamic features of every host in place.
+
+        No host is compromised or accessed, and only the given hosts are
+        reachable and discovered.
+
+        Parameters
+        ----------
+        reachable : numpy.Array
+            boolean array of which hosts are reachable, by host number
+        """
+        self._dynamic[:] = 0
+        self._dynamic[:, self._reachable_col] = reachable
+        self._dynamic[:, self._discovered_col] = reachable
 
     def get_host(self, host_addr):
         host_idx = self.host_num_map[host_addr]
-        return HostVector(self.tensor[host_idx])
+        return self._get_host_vector(host_idx)
 
     def get_host_idx(self, host_addr):
         return self.host_num_map[host_addr]
 
     def get_host_and_idx(self, host_addr):
         host_idx = self.host_num_map[host_addr]
-        return host_idx, HostVector(self.tensor[host_idx])
+        return host_idx, self._get_host_vector(host_idx)
 
     def host_reachable(self, host_addr):
-        return self.get_host(host_addr).reachable
+        host_idx = self.host_num_map[host_addr]
+        return self._dynamic[host_idx, self._reachable_col]
 
     def host_compromised(self, host_addr):
-        return self.get_host(host_addr).compromised
+        host_idx = self.host_num_map[host_addr]
+        return self._dynamic[host_idx, self._compromised_col]
 
     def host_discovered(self, host_addr):
-        return self.get_host(host_addr).discovered
+        host_idx = self.host_num_map[host_addr]
+        return self._dynamic[host_idx, self._discovered_col]
 
     def host_has_access(self, host_addr, access_level):
-        return self.get_host(host_addr).access >= access_level
+        host_idx = self.host_num_map[host_addr]
+        return self._dynamic[host_idx, self._access_col] >= access_level
+
+    def compromised_mask(self):
+        """Get boolean array of which hosts are compromised, by host number """
+        return self._dynamic[:, self._compromised_col] > 0
+
+    def reachable_mask(self):
+        """Get boolean array of which hosts are reachable, by host number """
+        return self._dynamic[:, self._reachable_col] > 0
+
+    def discovered_mask(self):
+        """Get boolean array of which hosts are discovered, by host number """
+        return self._dynamic[:, self._discovered_col] > 0
+
+    def access_levels(self):
+        """Get array of access level on each host, by host number """
+        return self._dynamic[:, self._access_col].copy()
 
     def set_host_compromised(self, host_addr):
-        self.get_host(host_addr).compromised = True
+        host_idx = self.host_num_map[host_addr]
+        self._dynamic[host_idx, self._compromised_col] = 1
 
     def set_host_reachable(self, host_addr):
-        self.get_host(host_addr).reachable = True
+        host_idx = self.host_num_map[host_addr]
+        self._dynamic[host_idx, self._reachable_col] = 1
 
     def set_host_discovered(self, host_addr):
-        self.get_host(host_addr).discovered = True
+        host_idx = self.host_num_map[host_addr]
+        self._dynamic[host_idx, self._discovered_col] = 1
+
+    def set_hosts_reachable(self, mask):
+        """Set hosts reachable, given boolean array by host number """
+        self._dynamic[mask, self._reachable_col] = 1
+
+    def set_hosts_discovered(self, mask):
+        """Set hosts discovered, given boolean array by host number """
+        self._dynamic[mask, self._discovered_col] = 1
+
+    def discovery_values(self):
+        """Get array of discovery value of each host, by host number """
+        return self.static_tensor[:, HostVector._discovery_value_idx]
 
     def get_host_value(self, host_address):
         return self.hosts[host_address].get_value()
@@ -257,14 +533,11 @@ class State:
         return self.get_host(host_addr).is_running_os(os)
 
     def get_total_host_value(self):
-        total_value = 0
-        for host_addr in self.host_num_map:
-            host = self.get_host(host_addr)
-            total_value += host.value
-        return total_value
+        values = self.static_tensor[:, HostVector._value_idx]
+        return values.sum()
 
     def state_size(self):
-        return self.tensor.size
+        return self._static.size
 
     def get_readable(self):
         host_obs = []
@@ -281,8 +554,44 @@ class State:
             output += str(host) + "\n"
         return output
 
+    def packed(self):
+        """Get the dynamic host features packed into a bit array.
+
+        Packs the compromised, reachable and discovered flags and access
+        level of each host into 5 bits, which along with the scenario fully
+        determines the state (see :func:`from_key`).
+
+        Returns
+        -------
+        numpy.Array
+            1D uint8 array of packed bits
+        """
+        dynamic = self._dynamic.astype(np.uint8)
+        access = dynamic[:, self._access_col]
+        bits = np.concatenate([
+            dynamic[:, :self._access_col] > 0,
+            (access & 1)[:, None],
+            (access >> 1)[:, None]
+        ], axis=1)
+        return np.packbits(bits)
+
+    def key(self):
+        """Get compact hashable key of the state.
+
+        Returns
+        -------
+        bytes
+            the packed dynamic host features (see :func:`packed`)
+        """
+        return self.packed().tobytes()
+
     def __hash__(self):
-        return hash(str(self.tensor))
+        return hash(self.key())
 
     def __eq__(self, other):
-        return np.array_equal(self.tensor, other.tensor)
+        if not np.array_equal(self._dynamic, other._dynamic):
+            return False
+        if self._static is other._static \
+           and not self._static_rows and not other._static_rows:
+            return True
+        return np.array_equal(self.static_tensor, other.static_tensor)
@@ -1,7 +1,6 @@
 import enum
 import numpy as np
 from queue import deque
-from itertools import permutations
 
 INTERNET = 0
 
@@ -49,57 +48,199 @@ class AccessLevel(enum.IntEnum):
         return self.name
 
 
+class UniformBuffer:
+    """Uniform random numbers in [0, 1) drawn in blocks from a numpy random
+    Generator.
+
+    Drawing a single number then only indexes into the current block, rather
+    than making a numpy call for every number.
+    """
+
+    def __init__(self, np_random, block_size=1024):
+        """
+        Parameters
+        ----------
+        np_random : numpy.random.Generator
+            the random number generator to draw from
+        block_size : int, optional
+            number of random numbers drawn at a time (default=1024)
+        """
+        self.np_random = np_random
+        self.block_size = block_size
+        self._block = []
+        self._pos = 0
+
+    def random(self):
+        """Get the next uniform random number.
+
+        Returns
+        -------
+        float
+            random number in [0, 1)
+        """
+        if self._pos == len(self._block):
+            self._block = self.np_random.random(self.block_size).tolist()
+            self._pos = 0
+        value = self._block[self._pos]
+        self._pos += 1
+        return value
+
+
+# max number of subnets to visit for which minimal hops are computed exactly,
+# above this a lower bound is used
+MAX_EXACT_HOPS_SUBNETS = 15
+
+
 def get_minimal_hops_to_goal(topology, sensitive_addresses):
     """Get minimum network hops required to reach all sensitive hosts.
 
     Starting from outside the network (i.e. can only reach exposed subnets).
 
+    This is the length of the shortest path that visits the internet subnet
+    and every subnet containing a sensitive host, which is found using the
+    Held-Karp dynamic programming algorithm. If more than
+    ``MAX_EXACT_HOPS_SUBNETS`` subnets must be visited, the total length of
+    the minimum spanning tree of those subnets is returned instead, which is
+    a lower bound on (and at least half of) the exact value.
+
+    Parameters
+    ----------
+    topology : 2D matrix
+        An adjacency matrix representing the network, with first subnet
+        representing the internet (i.e. exposed)
+    sensitive_addresses : list[(int, int)]
+        addresses of sensitive hosts
+
     Returns
     -------
     int
         minimum number of network hops to reach all sensitive hosts
     """
-    num_subnets = len(topology)
-    max_value = np.iinfo(np.int16).max
-    distance = np.full((num_subnets, num_subnets),
-                       max_value,
-                       dtype=np.int16)
-
-    # set distances for each edge to 1
-    for s1 in range(num_subnets):
-        for s2 in range(num_subnets):
-            if s1 == s2:
-                distance[s1][s2] = 0
-            elif topology[s1][s2] == 1:
-                distance[s1][s2] = 1
-    # find all pair minimum shortest path distance
-    for k in range(num_subnets):
-        for i in range(num_subnets):
-            for j in range(num_subnets):
-                if distance[i][k] == max_value \
-                   or distance[k][j] == max_value:
-                    dis = max_value
-                else:
-                    dis = distance[i][k] + distance[k][j]
-                if distance[i][j] > dis:
-                    distance[i][j] = distance[i][k] + distance[k][j]
-
     # get list of all subnets we need to visit
     subnets_to_visit = [INTERNET]
     for subnet, host in sensitive_addresses:
         if subnet not in subnets_to_visit:
             subnets_to_visit.append(subnet)
 
-    # find minimum shortest path that visits internet subnet and all
-    # sensitive subnets by checking all possible permutations
-    shortest = max_value
-    for pm in permutations(subnets_to_visit):
-        pm_sum = 0
-        for i in range(len(pm) - 1):
-            pm_sum += distance[pm[i]][pm[i+1]]
-        shortest = min(shortest, pm_sum)
+    distance = shortest_path_lengths(topology, subnets_to_visit)
+    distance = distance[:, subnets_to_visit]
+    if len(subnets_to_visit) > MAX_EXACT_HOPS_SUBNETS:
+        return min_spanning_tree_length(distance)
+    return min_path_length(distance)
+
+
+def shortest_path_lengths(topology, sources):
+    """Get minimum number of hops from each source subnet to every subnet.
+
+    Uses a breadth first search from all the sources at once, over the edges
+    of the network graph.
+
+    Parameters
+    ----------
+    topology : 2D matrix
+        An adjacency matrix representing the network
+    sources : list[int]
+        the source subnets
+
+    Returns
+    -------
+    numpy.ndarray
+        (len(sources), num_subnets) array of minimum number of hops, with
+        max int16 value for subnets that are not reachable from a source
+    """
+    adjacency = np.asarray(topology) == 1
+    num_subnets = len(adjacency)
+    edge_src, edge_dest = np.nonzero(adjacency)
+
+    distance = np.full(
+        (len(sources), num_subnets), np.iinfo(np.int16).max, dtype=np.int64
+    )
+    frontier = np.zeros((len(sources), num_subnets), dtype=bool)
+    frontier[np.arange(len(sources)), sources] = True
+    visited = frontier.copy()
+    depth = 0
+    while frontier.any():
+        distance[frontier] = depth
+        source_idxs, edge_idxs = np.nonzero(frontier[:, edge_src])
+        frontier = np.zeros_like(frontier)
+        frontier[source_idxs, edge_dest[edge_idxs]] = True
+        frontier &= ~visited
+        visited |= frontier
+        depth += 1
+    return distance
+
+
+def min_path_length(distance):
+    """Get length of shortest path that visits every node exactly once,
+    starting and ending at any node, using Held-Karp dynamic programming.
+
+    Takes O(2^n n^2) time, for n nodes.
+
+    Parameters
+    ----------
+    distance : numpy.ndarray
+        (n, n) array of distances between each pair of nodes
+
+    Returns
+    -------
+    int
+        length of the shortest path
+    """
+    num_nodes = len(distance)
+    nodes = np.arange(num_nodes)
+    subsets = np.arange(1 << num_nodes)
+    in_subset = (subsets[:, np.newaxis] >> nodes) & 1 == 1
+    subset_sizes = in_subset.sum(axis=1)
+
+    # cost[s, j] = length of shortest path visiting subset s and ending at j
+    cost = np.full((len(subsets), num_nodes), np.iinfo(np.int64).max // 2)
+    cost[1 << nodes, nodes] = 0
+    for size in range(1, num_nodes):
+        layer = subsets[subset_sizes == size]
+        # length of shortest path visiting each subset then each node
+        extended = (
+            cost[layer][:, :, np.newaxis] + distance[np.newaxis]
+        ).min(axis=1)
+        layer_idxs, next_nodes = np.nonzero(~in_subset[layer])
+        np.minimum.at(
+            cost,
+            (layer[layer_idxs] | (1 << next_nodes), next_nodes),
+            extended[layer_idxs, next_nodes]
+        )
+    return int(cost[-1].min())
+
 
-    return shortest
+def min_spanning_tree_length(distance):
+    """Get total length of minimum spanning tree of nodes, using Prim's
+    algorithm.
+
+    The distance between each pair of nodes is taken as the minimum distance
+    in either direction.
+
+    Parameters
+    ----------
+    distance : numpy.ndarray
+        (n, n) array of distances between each pair of nodes
+
+    Returns
+    -------
+    int
+        total length of the minimum spanning tree
+    """
+    distance = np.minimum(distance, distance.T)
+    in_tree = np.zeros(len(distance), dtype=bool)
+    in_tree[0] = True
+    # min distance from tree to each node
+    min_distance = distance[0].copy()
+    total = 0
+    for _ in range(len(distance) - 1):
+        node = np.argmin(
+            np.where(in_tree, np.iinfo(np.int64).max, min_distance)
+        )
+        total += int(min_distance[node])
+        in_tree[node] = True
+        min_distance = np.minimum(min_distance, distance[node])
+    return total
 
 
 def min_subnet_depth(topology):
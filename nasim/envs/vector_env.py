@@ -0,0 +1,602 @@
+"""A batched Environment class for NASim: NASimVectorEnv.
+
+The NASimVectorEnv class runs many independent episodes of the same scenario
+at once. The state of every episode is stored in a single
+``(num_envs, num_hosts, host_vector_size)`` tensor and each step applies a
+batch of flat action indices using NumPy array operations, rather than
+walking the Network, State and HostVector objects one action at a time.
+"""
+import numpy as np
+from gymnasium import spaces
+
+from nasim.envs.state import State
+from nasim.envs.network import Network
+from nasim.envs.host_vector import HostVector
+from nasim.envs.observation import Observation
+from nasim.envs.utils import AccessLevel, INTERNET, UniformBuffer
+from nasim.envs.action import (
+    ActionTable,
+    FlatActionSpace,
+    EXPLOIT,
+    PRIVILEGE_ESCALATION,
+    SERVICE_SCAN,
+    OS_SCAN,
+    SUBNET_SCAN,
+    PROCESS_SCAN
+)
+
+
+class NASimVectorEnv:
+    """A batch of simulated computer network environments for pen-testing.
+
+    Runs ``num_envs`` independent episodes of a single scenario, using a flat
+    action space. Each call to :func:`step` takes one flat action index per
+    episode and returns the stacked observations, rewards, done and step
+    limit flags, which match those returned by ``num_envs`` independent
+    :class:`NASimEnv` instances.
+
+    ...
+
+    Attributes
+    ----------
+    name : str
+        the environment scenario name
+    scenario : Scenario
+        Scenario object, defining the properties of the environment
+    num_envs : int
+        the number of episodes run in parallel
+    single_action_space : FlatActionSpace
+        the action space of a single episode
+    single_observation_space : gymnasium.spaces.Box
+        the observation space of a single episode
+    action_space : gymnasium.spaces.MultiDiscrete
+        the batched action space, one flat action per episode
+    observation_space : gymnasium.spaces.Box
+        the batched observation space, with a leading num_envs dimension
+    current_states : numpy.ndarray
+        the ``(num_envs, num_hosts, host_vector_size)`` state tensor
+    steps : numpy.ndarray
+        the number of steps performed in each episode since it was last reset
+    np_randoms : list[numpy.random.Generator]
+        random number generator used for the stochastic action outcomes of
+        each episode
+
+    Notes
+    -----
+    Each episode draws its stochastic action outcomes from its own random
+    number generator, in the same way as a NASimEnv. After
+    ``reset(seed=seed)`` episode i uses a generator seeded with seed + i, so
+    it produces the same trajectory as a NASimEnv reset with
+    ``reset(seed=seed + i)`` and given the same actions.
+    """
+
+    def __init__(self,
+                 scenario,
+                 num_envs,
+                 fully_obs=False,
+                 flat_obs=True,
+                 autoreset=False):
+        """
+        Parameters
+        ----------
+        scenario : Scenario
+            Scenario object, defining the properties of the environment
+        num_envs : int
+            the number of episodes to run in parallel
+        fully_obs : bool, optional
+            The observability mode of environment, if True then uses fully
+            observable mode, otherwise is partially observable (default=False)
+        flat_obs : bool, optional
+            If true then uses a 1D observation space for each episode,
+            otherwise uses a 2D observation space (default=True)
+        autoreset : bool, optional
+            If true then episodes that reach a terminal state or the step
+            limit are reset at the end of the step in which this happened,
+            with the final observation stored in the returned info dict under
+            "final_obs" (default=False)
+        """
+        assert num_envs > 0
+        self.name = scenario.name
+        self.scenario = scenario
+        self.num_envs = num_envs
+        self.fully_obs = fully_obs
+        self.flat_obs = flat_obs
+        self.autoreset = autoreset
+
+        self.network = Network(scenario)
+        initial_state = State.generate_initial_state(self.network)
+        self.single_action_space = FlatActionSpace(scenario)
+        self.action_space = spaces.MultiDiscrete(
+            [self.single_action_space.n] * num_envs
+        )
+
+        self._init_host_vector_idxs()
+        self._compile_network()
+        self._compile_actions(self.single_action_space.table)
+
+        self._initial_state = initial_state.tensor.copy()
+        self._initial_obs = initial_state.get_initial_observation(
+            fully_obs
+        ).numpy().copy()
+
+        self.num_hosts, self.host_vector_size = self._initial_state.shape
+        self.obs_shape = self._initial_obs.shape
+        if self.flat_obs:
+            single_obs_shape = (self._initial_obs.size, )
+        else:
+            single_obs_shape = self.obs_shape
+        obs_low, obs_high = Observation.get_space_bounds(self.scenario)
+        self.single_observation_space = spaces.Box(
+            low=obs_low, high=obs_high, shape=single_obs_shape
+        )
+        self.observation_space = spaces.Box(
+            low=obs_low, high=obs_high, shape=(num_envs, *single_obs_shape)
+        )
+
+        self._env_idxs = np.arange(num_envs)
+        self.current_states = np.repeat(
+            self._initial_state[None], num_envs, axis=0
+        )
+        self.steps = np.zeros(num_envs, dtype=np.int64)
+        self.seed()
+
+    def _init_host_vector_idxs(self):
+        self._compromised_idx = HostVector._compromised_idx
+        self._reachable_idx = HostVector._reachable_idx
+        self._discovered_idx = HostVector._discovered_idx
+        self._value_idx = HostVector._value_idx
+        self._discovery_value_idx = HostVector._discovery_value_idx
+        self._access_idx = HostVector._access_idx
+
+        # columns revealed in the target host observation for each action type
+        # (see State.get_observation)
+        base = np.zeros(HostVector.state_size, dtype=bool)
+        base[HostVector._subnet_address_idx_slice()] = True
+        base[HostVector._host_address_idx_slice()] = True
+        base[self._reachable_idx] = True
+        base[self._discovered_idx] = True
+        self._discovery_obs_mask = base
+
+        masks = np.repeat(base[None], len(ActionTable.type_codes), axis=0)
+        for col in (self._compromised_idx, self._access_idx, self._value_idx):
+            masks[EXPLOIT, col] = True
+        masks[EXPLOIT, HostVector._service_idx_slice()] = True
+        masks[EXPLOIT, HostVector._os_idx_slice()] = True
+        masks[PRIVILEGE_ESCALATION, self._compromised_idx] = True
+        masks[PRIVILEGE_ESCALATION, self._access_idx] = True
+        masks[SERVICE_SCAN, HostVector._service_idx_slice()] = True
+        masks[OS_SCAN, HostVector._os_idx_slice()] = True
+        masks[PROCESS_SCAN, HostVector._process_idx_slice()] = True
+        masks[PROCESS_SCAN, self._access_idx] = True
+        masks[SUBNET_SCAN, self._compromised_idx] = True
+        self._target_obs_masks = masks
+
+    def _compile_network(self):
+        """Get topology and firewall arrays from Network """
+        network = self.network
+        topology = np.asarray(network.topology) == 1
+        self._host_subnet = network.host_subnets
+        self._host_public = network.host_public
+        self._subnet_public = topology[:, INTERNET]
+        # [h, s] = True if host h's subnet is connected to subnet s
+        self._host_topology = network.host_topology
+        # [s, h] = True if subnet s is connected to host h's subnet
+        self._subnet_hosts = network.subnet_hosts
+        self._host_subnet_perm = network.host_permissions
+        self._host_fw_row = network.host_firewall_idx
+        self._host_fw = network.host_firewall_masks
+        self._sensitive_idxs = np.asarray(
+            [network.host_num_map[a] for a in network.sensitive_addresses],
+            dtype=np.int64
+        )
+
+    def _compile_actions(self, table):
+        """Get per action arrays from ActionTable, using state columns """
+        self._a_type = table.type_code
+        self._a_target = table.target
+        self._a_service = table.service
+        self._a_prob = table.prob
+        self._a_cost = table.cost
+        self._a_req_access = table.req_access
+        self._a_access = table.access
+        self._a_service_col = np.where(
+            table.service >= 0, HostVector._get_service_idx(table.service), -1
+        )
+        self._a_os_col = np.where(
+            table.os >= 0, HostVector._get_os_idx(table.os), -1
+        )
+        self._a_process_col = np.where(
+            table.process >= 0,
+            HostVector._get_process_idx(table.process),
+            -1
+        )
+
+    def seed(self, seed=None):
+        """Set the random number generator of each episode.
+
+        Parameters
+        ----------
+        seed : int, optional
+            if not None, episode i uses a generator seeded with seed + i,
+            otherwise each episode uses a new unseeded generator
+            (default=None)
+        """
+        if seed is None:
+            self.np_randoms = [
+                np.random.default_rng() for _ in range(self.num_envs)
+            ]
+        else:
+            self.np_randoms = [
+                np.random.default_rng(seed + i) for i in range(self.num_envs)
+            ]
+        self._uniforms = [
+            UniformBuffer(np_random) for np_random in self.np_randoms
+        ]
+
+    def reset(self, *, seed=None, options=None):
+        """Reset every episode and return the initial observations.
+
+        Parameters
+        ----------
+        seed : int, optional
+            if not None, used to seed the random number generator of each
+            episode, which is used for stochastic action outcomes. Episode i
+            is seeded with seed + i (default=None)
+        options : dict, optional
+            optional environment options (does nothing at the moment)
+
+        Returns
+        -------
+        numpy.Array
+            the stacked initial observations of each episode
+        dict
+            auxiliary information regarding reset
+        """
+        if seed is not None:
+            self.seed(seed)
+        self.current_states[:] = self._initial_state
+        self.steps[:] = 0
+        obs = np.repeat(self._initial_obs[None], self.num_envs, axis=0)
+        return self._format_obs(obs), {}
+
+    def reset_envs(self, env_idxs):
+        """Reset a subset of the episodes.
+
+        Parameters
+        ----------
+        env_idxs : array-like of int or bool
+            indices (or boolean mask) of the episodes to reset
+
+        Returns
+        -------
+        numpy.Array
+            the stacked initial observations of the reset episodes
+        """
+        env_idxs = self._env_idxs[env_idxs]
+        self.current_states[env_idxs] = self._initial_state
+        self.steps[env_idxs] = 0
+        obs = np.repeat(self._initial_obs[None], len(env_idxs), axis=0)
+        return self._format_obs(obs)
+
+    def step(self, actions):
+        """Run one step of every episode using the given flat actions.
+
+        Parameters
+        ----------
+        actions : array-like of int
+            one flat action index for each episode
+
+        Returns
+        -------
+        numpy.Array
+            the stacked observations from performing actions
+        numpy.Array
+            the reward for each episode
+        numpy.Array
+            whether each episode reached a terminal state or not (i.e. all
+            target machines have been successfully compromised)
+        numpy.Array
+            whether each episode has reached the step limit (if one exists)
+        dict
+            auxiliary information regarding step, as arrays with one entry
+            per episode (see :func:`nasim.env.action.ActionResult.info`)
+        """
+        actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+        result = self._perform_actions(actions)
+        obs = self._get_observations(actions, result)
+
+        rewards = result["value"] - self._a_cost[actions]
+        sensitive_access = self.current_states[
+            :, self._sensitive_idxs, self._access_idx
+        ]
+        dones = (sensitive_access >= AccessLevel.ROOT).all(axis=1)
+
+        self.steps += 1
+        if self.scenario.step_limit is not None:
+            step_limit_reached = self.steps >= self.scenario.step_limit
+        else:
+            step_limit_reached = np.zeros(self.num_envs, dtype=bool)
+
+        info = {
+            k: result[k] for k in (
+                "success",
+                "value",
+                "connection_error",
+                "permission_error",
+                "undefined_error"
+            )
+        }
+
+        obs = self._format_obs(obs)
+        if self.autoreset:
+            finished = np.flatnonzero(dones | step_limit_reached)
+            if len(finished) > 0:
+                info["final_obs"] = obs[finished].copy()
+                info["final_env_idxs"] = finished
+                obs[finished] = self.reset_envs(finished)
+
+        return obs, rewards, dones, step_limit_reached, info
+
+    def _perform_actions(self, actions):
+        """Perform batch of actions, updating current_states in place.
+
+        Follows the same sequence of checks as Network.perform_action and
+        HostVector.perform_action, but for all episodes at once.
+        """
+        n = self.num_envs
+        states = self.current_states
+        env_idxs = self._env_idxs
+
+        a_type = self._a_type[actions]
+        target = self._a_target[actions]
+        req_access = self._a_req_access[actions]
+        tgt_subnet = self._host_subnet[target]
+        tgt_rows = states[env_idxs, target]
+        tgt_compromised = tgt_rows[:, self._compromised_idx] > 0
+        tgt_access = tgt_rows[:, self._access_idx]
+
+        success = np.zeros(n, dtype=bool)
+        conn_error = np.zeros(n, dtype=bool)
+        perm_error = np.zeros(n, dtype=bool)
+        undef_error = np.zeros(n, dtype=bool)
+        value = np.zeros(n, dtype=np.float32)
+
+        # target must be reachable and discovered
+        pending = (tgt_rows[:, self._reachable_idx] > 0) \
+            & (tgt_rows[:, self._discovered_idx] > 0)
+        conn_error |= ~pending
+
+        is_exploit = a_type == EXPLOIT
+        is_remote = is_exploit \
+            | (a_type == SERVICE_SCAN) \
+            | (a_type == OS_SCAN)
+        service = np.maximum(self._a_service[actions], 0)
+
+        # remote actions need a compromised pivot host with required access
+        check = np.flatnonzero(
+            pending & is_remote & ~self._subnet_public[tgt_subnet]
+        )
+        if len(check) > 0:
+            compromised = states[check, :, self._compromised_idx] > 0
+            has_access = states[check, :, self._access_idx] \
+                >= req_access[check, None]
+            connected = np.where(
+                is_exploit[check, None],
+                self._host_subnet_perm[
+                    :, tgt_subnet[check], service[check]
+                ].T,
+                self._host_topology[:, tgt_subnet[check]].T
+            )
+            permitted = (compromised & has_access & connected).any(axis=1)
+            denied = check[~permitted]
+            perm_error[denied] = True
+            pending[denied] = False
+
+        # exploits need traffic to be permitted by subnet and host firewalls
+        check = np.flatnonzero(pending & is_exploit)
+        if len(check) > 0:
+            src_ok = (states[check, :, self._compromised_idx] > 0) \
+                | self._host_public[None, :]
+            subnet_ok = self._host_subnet_perm[
+                :, tgt_subnet[check], service[check]
+            ].T
+            host_ok = self._host_firewall_permitted(
+                target[check], service[check]
+            )
+            permitted = (src_ok & subnet_ok & host_ok).any(axis=1)
+            blocked = check[~permitted]
+            conn_error[blocked] = True
+            pending[blocked] = False
+
+        blocked = pending & (a_type == PRIVILEGE_ESCALATION) & ~tgt_compromised
+        conn_error |= blocked
+        pending &= ~blocked
+
+        # exploits against already compromised hosts don't fail randomly
+        draw = np.flatnonzero(pending & ~(is_exploit & tgt_compromised))
+        if len(draw) > 0:
+            rand = np.array([self._uniforms[i].random() for i in draw])
+            failed = draw[rand > self._a_prob[actions[draw]]]
+            undef_error[failed] = True
+            pending[failed] = False
+
+        # on host actions require compromised target with sufficient access
+        has_access = tgt_compromised & (tgt_access >= req_access)
+
+        scan = pending & (a_type == SUBNET_SCAN)
+        conn_error |= scan & ~tgt_compromised
+        perm_error |= scan & tgt_compromised & ~has_access
+        scan_idxs = np.flatnonzero(scan & has_access)
+        discovered = self._subnet_hosts[tgt_subnet[scan_idxs]]
+        newly_discovered = discovered & (
+            states[scan_idxs, :, self._discovered_idx] == 0
+        )
+        if len(scan_idxs) > 0:
+            states[scan_idxs, :, self._discovered_idx] = np.where(
+                discovered, 1, states[scan_idxs, :, self._discovered_idx]
+            )
+            value[scan_idxs] = np.where(
+                newly_discovered,
+                states[scan_idxs, :, self._discovery_value_idx],
+                0
+            ).sum(axis=1)
+            success[scan_idxs] = True
+
+        success |= pending & (
+            (a_type == SERVICE_SCAN) | (a_type == OS_SCAN)
+        )
+
+        os_col = self._a_os_col[actions]
+        os_ok = (os_col < 0) \
+            | (tgt_rows[env_idxs, np.maximum(os_col, 0)] > 0)
+
+        srv_col = self._a_service_col[actions]
+        exploit = pending & is_exploit
+        exploited = exploit \
+            & (tgt_rows[env_idxs, np.maximum(srv_col, 0)] > 0) \
+            & os_ok
+        exploit_idxs = np.flatnonzero(exploited)
+        if len(exploit_idxs) > 0:
+            states[exploit_idxs, target[exploit_idxs],
+                   self._compromised_idx] = 1
+            # reachable status of hosts in subnets connected to target
+            states[exploit_idxs, :, self._reachable_idx] = np.where(
+                self._subnet_hosts[tgt_subnet[exploit_idxs]],
+                1,
+                states[exploit_idxs, :, self._reachable_idx]
+            )
+        failed_exploit = exploit & ~exploited
+        perm_error |= failed_exploit & ~has_access
+
+        process_scan = pending & (a_type == PROCESS_SCAN)
+        perm_error |= process_scan & ~has_access
+        success |= process_scan & has_access
+
+        proc_col = self._a_process_col[actions]
+        proc_ok = (proc_col < 0) \
+            | (tgt_rows[env_idxs, np.maximum(proc_col, 0)] > 0)
+        privesc = pending & (a_type == PRIVILEGE_ESCALATION)
+        perm_error |= privesc & ~has_access
+        escalated = privesc & has_access & proc_ok & os_ok
+
+        # successful exploits and privescs update access of target, and
+        # give the host value when ROOT access is gained for the first time
+        gained = np.flatnonzero(exploited | escalated)
+        if len(gained) > 0:
+            not_root = tgt_access[gained] != AccessLevel.ROOT
+            new_access = self._a_access[actions[gained]]
+            states[gained, target[gained], self._access_idx] = np.where(
+                not_root, new_access, tgt_access[gained]
+            )
+            value[gained] = np.where(
+                not_root & (new_access == AccessLevel.ROOT),
+                tgt_rows[gained, self._value_idx],
+                0
+            )
+            success[gained] = True
+
+        return {
+            "success": success,
+            "value": value,
+            "connection_error": conn_error,
+            "permission_error": perm_error,
+            "undefined_error": undef_error,
+            "scan_idxs": scan_idxs,
+            "discovered": discovered,
+            "newly_discovered": newly_discovered
+        }
+
+    def _host_firewall_permitted(self, target, service):
+        """Get mask of source hosts permitted by each target's firewall """
+        permitted = np.ones((len(target), self.num_hosts), dtype=bool)
+        fw_rows = self._host_fw_row[target]
+        has_fw = np.flatnonzero(fw_rows >= 0)
+        if len(has_fw) > 0:
+            permitted[has_fw] = self._host_fw[
+                fw_rows[has_fw], :, service[has_fw]
+            ]
+        return permitted
+
+    def _get_observations(self, actions, result):
+        states = self.current_states
+        obs = np.zeros((self.num_envs, *self.obs_shape), dtype=np.float32)
+        aux_row = self.num_hosts
+        obs[:, aux_row, Observation._success_idx] = result["success"]
+        obs[:, aux_row, Observation._conn_error_idx] = \
+            result["connection_error"]
+        obs[:, aux_row, Observation._perm_error_idx] = \
+            result["permission_error"]
+        obs[:, aux_row, Observation._undef_error_idx] = \
+            result["undefined_error"]
+
+        if self.fully_obs:
+            obs[:, :aux_row] = states
+            return obs
+
+        scan_idxs = result["scan_idxs"]
+        if len(scan_idxs) > 0:
+            scan_states = states[scan_idxs]
+            row_mask = result["discovered"][:, :, None] \
+                & self._discovery_obs_mask
+            scan_obs = np.where(row_mask, scan_states, 0)
+            scan_obs[:, :, self._discovery_value_idx] = np.where(
+                result["newly_discovered"],
+                scan_states[:, :, self._discovery_value_idx],
+                0
+            )
+            obs[scan_idxs, :aux_row] = scan_obs
+
+        succ_idxs = np.flatnonzero(result["success"])
+        if len(succ_idxs) > 0:
+            target = self._a_target[actions[succ_idxs]]
+            masks = self._target_obs_masks[self._a_type[actions[succ_idxs]]]
+            obs[succ_idxs, target] = np.where(
+                masks, states[succ_idxs, target], 0
+            )
+        return obs
+
+    def _format_obs(self, obs):
+        if self.flat_obs:
+            return obs.reshape(len(obs), -1)
+        return obs
+
+    def goal_reached(self):
+        """Check which episodes are in a goal state.
+
+        Returns
+        -------
+        numpy.Array
+            boolean array, True for each episode where all sensitive hosts
+            have been compromised
+        """
+        sensitive_access = self.current_states[
+            :, self._sensitive_idxs, self._access_idx
+        ]
+        return (sensitive_access >= AccessLevel.ROOT).all(axis=1)
+
+    def get_state(self, env_idx):
+        """Get the current state of a single episode.
+
+        Parameters
+        ----------
+        env_idx : int
+            index of the episode
+
+        Returns
+        -------
+        State
+            a copy of the current state of the episode
+        """
+        return State(
+            self.current_states[env_idx].copy(), self.network.host_num_map
+        )
+
+    def __str__(self):
+        output = [
+            "NASimVectorEnv:",
+            f"name={self.name}",
+            f"num_envs={self.num_envs}",
+            f"fully_obs={self.fully_obs}",
+            f"flat_obs={self.flat_obs}"
+        ]
+        return "\n  ".join(output)
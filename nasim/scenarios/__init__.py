@@ -2,6 +2,8 @@ from nasim.scenarios.utils import INTERNET
 from nasim.scenarios.scenario import Scenario
 from nasim.scenarios.loader import ScenarioLoader
 from nasim.scenarios.generator import ScenarioGenerator
+import nasim.scenarios.cache as cache
+import nasim.scenarios.corpus as corpus
 import nasim.scenarios.benchmark as benchmark
 
 
@@ -54,10 +56,21 @@ def generate_scenario(num_hosts, num_services, **params):
     Returns
     -------
     Scenario
-        a new scenario object
+        a new scenario object, or the cached scenario if the scenario cache
+        is enabled and the scenario is seeded (see
+        :mod:`nasim.scenarios.cache`)
     """
+    key = None
+    if cache.get_cache_dir() is not None:
+        key = cache.generator_key(num_hosts, num_services, **params)
+        scenario = cache.load(key)
+        if scenario is not None:
+            return scenario
+
     generator = ScenarioGenerator()
-    return generator.generate(num_hosts, num_services, **params)
+    scenario = generator.generate(num_hosts, num_services, **params)
+    cache.save(key, scenario)
+    return scenario
 
 
 def load_scenario(path, name=None):
@@ -74,10 +87,20 @@ def load_scenario(path, name=None):
     Returns
     -------
     Scenario
-        a new scenario object
+        a new scenario object, or the cached scenario if the scenario cache
+        is enabled (see :mod:`nasim.scenarios.cache`)
     """
+    key = None
+    if cache.get_cache_dir() is not None:
+        key = cache.yaml_key(path, name)
+        scenario = cache.load(key)
+        if scenario is not None:
+            return scenario
+
     loader = ScenarioLoader()
-    return loader.load(path, name=name)
+    scenario = loader.load(path, name=name)
+    cache.save(key, scenario)
+    return scenario
 
 
 def get_scenario_max(scenario_name):
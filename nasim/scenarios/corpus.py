@@ -0,0 +1,332 @@
+"""This module contains functionality for building and sampling from a corpus
+of generated scenarios.
+
+Training on a distribution of networks, rather than a single scenario,
+requires many generated scenarios. A corpus is built once, with scenarios
+generated in parallel across a process pool, and saved to disk, after which
+scenarios can be sampled from it without regenerating anything.
+
+A corpus is a directory containing:
+
+- shard files (``shard_00000.pkl``, ...), each containing a number of
+  scenarios pickled one after another, along with the arrays precomputed
+  from them when the first environment is created (see
+  ``Scenario.compiled``)
+- an index file (``index.json``) with the generator params used and, for
+  each scenario, its shard, byte offset within the shard, seed, number of
+  hosts, number of services, minimal hops to goal, score upper bound and
+  size bucket
+
+Each scenario is generated using its own seed, drawn from an independent
+random stream spawned from the corpus seed (see
+:class:`numpy.random.SeedSequence`), so a corpus is reproducible
+independent of the number of workers used to build it, and any scenario in
+it can be regenerated using :func:`nasim.scenarios.generate_scenario` with
+the seed and params in the index.
+
+Scenarios are grouped into size buckets by number of hosts, where the bucket
+of a scenario is the largest power of two that is <= its number of hosts.
+"""
+import os
+import json
+import pickle
+import tempfile
+import numpy as np
+import multiprocessing as mp
+
+from nasim.scenarios.generator import ScenarioGenerator
+from nasim.envs.utils import get_minimal_hops_to_goal
+
+INDEX_FILE = "index.json"
+
+# increment when the format of the corpus changes
+CORPUS_FORMAT_VERSION = 1
+
+
+def size_bucket(num_hosts):
+    """Get the size bucket for a scenario with given number of hosts.
+
+    Parameters
+    ----------
+    num_hosts : int
+        number of hosts in scenario
+
+    Returns
+    -------
+    int
+        the size bucket, which is the largest power of two <= num_hosts
+    """
+    return 1 << (int(num_hosts).bit_length() - 1)
+
+
+def _shard_name(shard):
+    return f"shard_{shard:05d}.pkl"
+
+
+def _atomic_write(path, write_fn, mode="wb"):
+    dir_name = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=dir_name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as fout:
+            write_fn(fout)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _index_entry(scenario, num_services, seed):
+    minimal_hops = get_minimal_hops_to_goal(
+        scenario.topology, scenario.sensitive_addresses
+    )
+    upper_bound = sum(scenario.sensitive_hosts.values())
+    upper_bound += sum(h.discovery_value for h in scenario.hosts.values())
+    upper_bound -= minimal_hops
+    num_hosts = len(scenario.hosts)
+    return {
+        "seed": seed,
+        "num_hosts": num_hosts,
+        "num_services": num_services,
+        "minimal_hops": minimal_hops,
+        "upper_bound": float(upper_bound),
+        "size_bucket": size_bucket(num_hosts)
+    }
+
+
+def _build_shard(args):
+    """Generate scenarios and write them to a single shard file.
+
+    Returns the index entries of the scenarios in the shard.
+    """
+    from nasim.envs.network import Network
+    corpus_dir, shard, specs, params = args
+    generator = ScenarioGenerator()
+    entries = []
+
+    def write_scenarios(fout):
+        for num_hosts, num_services, seed in specs:
+            scenario = generator.generate(
+                num_hosts, num_services, seed=seed, **params
+            )
+            Network.compile(scenario)
+            entry = _index_entry(scenario, num_services, seed)
+            entry["shard"] = shard
+            entry["offset"] = fout.tell()
+            pickle.dump(scenario, fout, protocol=pickle.HIGHEST_PROTOCOL)
+            entries.append(entry)
+
+    _atomic_write(
+        os.path.join(corpus_dir, _shard_name(shard)), write_scenarios
+    )
+    return entries
+
+
+def build_corpus(corpus_dir,
+                 num_scenarios,
+                 num_hosts,
+                 num_services,
+                 seed=None,
+                 num_workers=1,
+                 shard_size=100,
+                 verbose=False,
+                 **params):
+    """Generate a corpus of scenarios and save it to disk.
+
+    Parameters
+    ----------
+    corpus_dir : str
+        directory to save corpus to, which is created if it does not exist
+    num_scenarios : int
+        number of scenarios to generate
+    num_hosts : int or list[int]
+        number of hosts in each scenario. If a list, the number of hosts of
+        each scenario is chosen uniformly at random from the list.
+    num_services : int or list[int]
+        number of services in each scenario. If a list, the number of
+        services of each scenario is chosen uniformly at random from the
+        list.
+    seed : int, optional
+        seed of corpus, from which the seed of every scenario is drawn. If
+        None the corpus is not reproducible (default=None)
+    num_workers : int, optional
+        number of processes to generate scenarios in parallel
+        (default=1)
+    shard_size : int, optional
+        max number of scenarios per shard file (default=100)
+    verbose : bool, optional
+        whether to print progress (default=False)
+    params : dict, optional
+        other generator params used for every scenario (see
+        :class:`ScenarioGenerator` for full list)
+
+    Returns
+    -------
+    ScenarioCorpus
+        the built corpus
+    """
+    assert 0 < num_scenarios
+    assert 0 < num_workers
+    assert 0 < shard_size
+    assert "seed" not in params and "name" not in params, \
+        "Scenario seeds and names are set by the corpus builder"
+
+    num_hosts_options = np.atleast_1d(num_hosts)
+    num_services_options = np.atleast_1d(num_services)
+    specs = []
+    for seed_seq in np.random.SeedSequence(seed).spawn(num_scenarios):
+        rng = np.random.default_rng(seed_seq)
+        specs.append((
+            int(rng.choice(num_hosts_options)),
+            int(rng.choice(num_services_options)),
+            int(rng.integers(2**32))
+        ))
+
+    os.makedirs(corpus_dir, exist_ok=True)
+    shard_args = []
+    for shard, start in enumerate(range(0, num_scenarios, shard_size)):
+        shard_args.append(
+            (corpus_dir, shard, specs[start:start+shard_size], params)
+        )
+
+    shard_entries = [None] * len(shard_args)
+    if num_workers == 1:
+        results = map(_build_shard, shard_args)
+    else:
+        pool = mp.Pool(num_workers)
+        results = pool.imap_unordered(_build_shard, shard_args)
+    try:
+        for i, entries in enumerate(results):
+            shard_entries[entries[0]["shard"]] = entries
+            if verbose:
+                print(f"Built shard {i+1}/{len(shard_args)}")
+    finally:
+        if num_workers != 1:
+            pool.close()
+            pool.join()
+
+    index = {
+        "version": CORPUS_FORMAT_VERSION,
+        "seed": seed,
+        "params": params,
+        "scenarios": [e for entries in shard_entries for e in entries]
+    }
+    _atomic_write(
+        os.path.join(corpus_dir, INDEX_FILE),
+        lambda fout: json.dump(index, fout),
+        mode="w"
+    )
+    return ScenarioCorpus(corpus_dir)
+
+
+class ScenarioCorpus:
+    """A corpus of generated scenarios saved on disk (see
+    :func:`build_corpus`).
+
+    Scenarios are loaded individually from their shard when they are
+    requested, so sampling a scenario takes constant time independent of the
+    size of the corpus.
+
+    Attributes
+    ----------
+    corpus_dir : str
+        directory of corpus
+    params : dict
+        generator params used for every scenario
+    entries : list[dict]
+        index entry of each scenario in corpus
+    np_random : numpy.random.Generator
+        random number generator used for sampling scenarios
+    """
+
+    def __init__(self, corpus_dir, seed=None):
+        """
+        Parameters
+        ----------
+        corpus_dir : str
+            directory of corpus
+        seed : int, optional
+            seed for random number generator used for sampling scenarios
+            (default=None)
+        """
+        self.corpus_dir = corpus_dir
+        with open(os.path.join(corpus_dir, INDEX_FILE), "r") as fin:
+            index = json.load(fin)
+        assert index["version"] == CORPUS_FORMAT_VERSION, \
+            (f"Corpus format version {index['version']} is not supported,"
+             f" expected {CORPUS_FORMAT_VERSION}")
+        self.params = index["params"]
+        self.entries = index["scenarios"]
+        self._buckets = {}
+        for scenario_idx, entry in enumerate(self.entries):
+            self._buckets.setdefault(entry["size_bucket"], []).append(
+                scenario_idx
+            )
+        self.np_random = np.random.default_rng(seed)
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def buckets(self):
+        """The size buckets containing at least one scenario, in increasing
+        order
+        """
+        return sorted(self._buckets)
+
+    def bucket_size(self, bucket):
+        """Get the number of scenarios in a size bucket """
+        return len(self._buckets.get(bucket, []))
+
+    def get(self, scenario_idx):
+        """Load scenario from corpus.
+
+        Parameters
+        ----------
+        scenario_idx : int
+            index of scenario in corpus
+
+        Returns
+        -------
+        Scenario
+            the scenario
+        """
+        entry = self.entries[scenario_idx]
+        shard_path = os.path.join(self.corpus_dir, _shard_name(entry["shard"]))
+        with open(shard_path, "rb") as fin:
+            fin.seek(entry["offset"])
+            return pickle.load(fin)
+
+    def sample(self, num_hosts=None, bucket=None):
+        """Sample a scenario uniformly at random from corpus.
+
+        Parameters
+        ----------
+        num_hosts : int, optional
+            if not None, sample from the size bucket of this number of hosts
+            (default=None)
+        bucket : int, optional
+            if not None, sample from this size bucket (default=None)
+
+        Returns
+        -------
+        Scenario
+            the sampled scenario
+        dict
+            the index entry of the sampled scenario
+        """
+        assert num_hosts is None or bucket is None, \
+            "Only one of num_hosts and bucket can be specified"
+        if num_hosts is not None:
+            bucket = size_bucket(num_hosts)
+        if bucket is None:
+            scenario_idx = self.np_random.integers(len(self.entries))
+        else:
+            assert bucket in self._buckets, \
+                (f"No scenarios in size bucket {bucket}. Available buckets"
+                 f" are: {self.buckets}")
+            bucket_idxs = self._buckets[bucket]
+            scenario_idx = bucket_idxs[
+                self.np_random.integers(len(bucket_idxs))
+            ]
+        return self.get(scenario_idx), self.entries[scenario_idx]
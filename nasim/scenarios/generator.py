@@ -60,6 +60,12 @@ class ScenarioGenerator:
     2. if ``uniform=False`` host configurations are chosen to be correlated
        (see :ref:`correlated_configurations` for explanation)
 
+    Enumerating all possible configurations for ``uniform=True`` requires
+    memory exponential in the number of services and processes, and sampling
+    correlated configurations one host at a time is slow for large numbers of
+    hosts. Setting ``scalable=True`` samples configurations from the same
+    distributions directly, for all hosts at once, which allows generating
+    networks with thousands of hosts and tens of services.
 
     """
 
@@ -81,6 +87,7 @@ class ScenarioGenerator:
                  subnet_scan_cost=1,
                  process_scan_cost=1,
                  uniform=False,
+                 scalable=False,
                  alpha_H=2.0,
                  alpha_V=2.0,
                  lambda_V=1.0,
@@ -135,6 +142,13 @@ class ScenarioGenerator:
         uniform : bool, optional
             whether to use uniform distribution or correlated host configs
             (default=False)
+        scalable : bool, optional
+            whether to sample host configurations directly and in bulk,
+            rather than enumerating all possible configurations, for
+            generating large networks quickly. Configurations are drawn from
+            the same distribution as when scalable=False, but using a
+            different sequence of random numbers, so the scenario generated
+            for a given seed differs (default=False)
         alpha_H : float, optional
             (only used when uniform=False) Scaling/concentration parameter for
             controlling corelation between host configurations (must be > 0)
@@ -184,8 +198,9 @@ class ScenarioGenerator:
         assert 0 < alpha_H and 0 < alpha_V and 0 < lambda_V
         assert 0 < restrictiveness
 
-        if seed is not None:
-            np.random.seed(seed)
+        # generator specific random state, so generating a scenario neither
+        # depends on nor changes the global numpy random state
+        self.rng = np.random.RandomState(seed)
 
         if num_exploits is None:
             num_exploits = num_services
@@ -204,7 +219,9 @@ class ScenarioGenerator:
         self._generate_sensitive_hosts(r_sensitive, r_user, random_goal)
         self.base_host_value = base_host_value
         self.host_discovery_value = host_discovery_value
-        if uniform:
+        if scalable:
+            self._generate_hosts_in_bulk(uniform, alpha_H, alpha_V, lambda_V)
+        elif uniform:
             self._generate_uniform_hosts()
         else:
             self._generate_correlated_hosts(alpha_H, alpha_V, lambda_V)
@@ -339,9 +356,9 @@ class ScenarioGenerator:
         # we create one exploit per service
         exploits_added = 0
         while exploits_added < num_exploits:
-            srv = np.random.choice(self.services)
-            os = np.random.choice(possible_os)
-            al = np.random.randint(u.USER_ACCESS, u.ROOT_ACCESS+1)
+            srv = self.rng.choice(self.services)
+            os = self.rng.choice(possible_os)
+            al = self.rng.randint(u.USER_ACCESS, u.ROOT_ACCESS+1)
             e_name = f"e_{srv}"
             if os is not None:
                 e_name += f"_{os}"
@@ -369,12 +386,12 @@ class ScenarioGenerator:
         if num_privesc < len(self.os):
             os_choices = [None]
             os_choices.extend(
-                list(np.random.choice(possible_os, num_privesc-1))
+                list(self.rng.choice(possible_os, num_privesc-1))
             )
         else:
             while True:
                 os_choices = list(
-                    np.random.choice(possible_os, num_privesc)
+                    self.rng.choice(possible_os, num_privesc)
                 )
                 if None in os_choices \
                    or all([os in os_choices for os in self.os]):
@@ -383,7 +400,7 @@ class ScenarioGenerator:
         # we create one exploit per service
         privescs_added = 0
         while privescs_added < num_privesc:
-            proc = np.random.choice(self.processes)
+            proc = self.rng.choice(self.processes)
             os = os_choices[privescs_added]
             pe_name = f"pe_{proc}"
             if os is not None:
@@ -401,7 +418,7 @@ class ScenarioGenerator:
 
     def _get_action_probs(self, num_actions, action_probs):
         if action_probs is None:
-            action_probs = np.random.random_sample(num_actions)
+            action_probs = self.rng.random_sample(num_actions)
         elif action_probs == 'mixed':
             # success probability of low, med, high attack complexity
             if num_actions == 1:
@@ -412,7 +429,7 @@ class ScenarioGenerator:
             else:
                 levels = [0.3, 0.6, 0.9]
                 probs = [0.2, 0.4, 0.4]
-            action_probs = np.random.choice(levels, num_actions, p=probs)
+            action_probs = self.rng.choice(levels, num_actions, p=probs)
         elif type(action_probs) is list:
             assert len(action_probs) == num_actions, \
                 ("Length of action probability list must equal number of"
@@ -438,8 +455,8 @@ class ScenarioGenerator:
         # second sensitive host in USER network
         if random_goal and len(self.subnets) > SENSITIVE:
             # randomly choose user host to be goal
-            subnet_id = np.random.randint(USER, len(self.subnets))
-            host_id = np.random.randint(0, self.subnets[subnet_id])
+            subnet_id = self.rng.randint(USER, len(self.subnets))
+            host_id = self.rng.randint(0, self.subnets[subnet_id])
             sensitive_hosts[(subnet_id, host_id)] = r_user
         else:
             # second last host in USER network is goal
@@ -456,13 +473,13 @@ class ScenarioGenerator:
             if subnet == u.INTERNET:
                 continue
             for h in range(size):
-                srv_cfg = srv_config_set[np.random.choice(num_srv_configs)]
+                srv_cfg = srv_config_set[self.rng.choice(num_srv_configs)]
                 srv_cfg = self._convert_to_service_map(srv_cfg)
 
-                proc_cfg = proc_config_set[np.random.choice(num_proc_configs)]
+                proc_cfg = proc_config_set[self.rng.choice(num_proc_configs)]
                 proc_cfg = self._convert_to_process_map(proc_cfg)
 
-                os = np.random.choice(self.os)
+                os = self.rng.choice(self.os)
                 os_cfg = self._convert_to_os_map(os)
 
                 address = (subnet, h)
@@ -585,7 +602,7 @@ class ScenarioGenerator:
         using a Nested Dirichlet Process
         """
         if host_num == 0 \
-           or np.random.rand() < (alpha_H / (alpha_H + host_num - 1)):
+           or self.rng.rand() < (alpha_H / (alpha_H + host_num - 1)):
             # if first host or with prob proportional to alpha_H
             # choose new config
             new_config = self._sample_config(
@@ -593,7 +610,7 @@ class ScenarioGenerator:
             )
         else:
             # sample uniformly from previous sampled configs
-            new_config = prev_configs[np.random.choice(len(prev_configs))]
+            new_config = prev_configs[self.rng.choice(len(prev_configs))]
         prev_configs.append(new_config)
         return new_config
 
@@ -631,17 +648,17 @@ class ScenarioGenerator:
 
         # randomly get number of times to sample using poission dist with
         # minimum 1 option choice
-        n = max(np.random.poisson(lambda_V), 1)
+        n = max(self.rng.poisson(lambda_V), 1)
 
         # draw n samples from Dirichlet Process
         # (alpha_V, uniform dist of services)
         for i in range(n):
-            if i == 0 or np.random.rand() < (alpha_V / (alpha_V + i - 1)):
+            if i == 0 or self.rng.rand() < (alpha_V / (alpha_V + i - 1)):
                 # draw randomly from uniform dist over services
-                x = np.random.randint(0, num_options)
+                x = self.rng.randint(0, num_options)
             else:
                 # draw uniformly at random from previous choices
-                x = np.random.choice(prev_vals)
+                x = self.rng.choice(prev_vals)
             new_cfg[x] = True
             prev_vals.append(x)
         return new_cfg
@@ -650,15 +667,205 @@ class ScenarioGenerator:
         """Sample single choice using dirichlet process """
         # sample an os from Dirichlet Process (alpha_V, uniform dist of OSs)
         if len(prev_vals) == 0 \
-           or np.random.rand() < (alpha_V / (alpha_V - 1)):
+           or self.rng.rand() < (alpha_V / (alpha_V - 1)):
             # draw randomly from uniform dist over services
-            choice = np.random.choice(choices)
+            choice = self.rng.choice(choices)
         else:
             # draw uniformly at random from previous choices
-            choice = np.random.choice(prev_vals)
+            choice = self.rng.choice(prev_vals)
         prev_vals.append(choice)
         return choice
 
+    def _generate_hosts_in_bulk(self, uniform, alpha_H, alpha_V, lambda_V):
+        """Generate hosts from configurations sampled for all hosts at once,
+        using either the uniform or correlated host configuration
+        distribution.
+        """
+        num_hosts = sum(self.subnets[u.INTERNET+1:])
+        if uniform:
+            os_idxs, srv_cfgs, proc_cfgs = self._sample_uniform_configs(
+                num_hosts
+            )
+        else:
+            os_idxs, srv_cfgs, proc_cfgs = self._sample_correlated_configs(
+                num_hosts, alpha_H, alpha_V, lambda_V
+            )
+        os_idxs = os_idxs.tolist()
+        srv_cfgs = srv_cfgs.tolist()
+        proc_cfgs = proc_cfgs.tolist()
+
+        hosts = dict()
+        host_num = 0
+        for subnet, size in enumerate(self.subnets):
+            if subnet == u.INTERNET:
+                continue
+            for h in range(size):
+                address = (subnet, h)
+                host = Host(
+                    address=address,
+                    os=self._convert_to_os_map(self.os[os_idxs[host_num]]),
+                    services=self._convert_to_service_map(srv_cfgs[host_num]),
+                    processes=self._convert_to_process_map(
+                        proc_cfgs[host_num]
+                    ),
+                    firewall={},
+                    value=self._get_host_value(address),
+                    discovery_value=self.host_discovery_value
+                )
+                hosts[address] = host
+                host_num += 1
+        self.hosts = hosts
+
+    def _sample_uniform_configs(self, num_hosts):
+        """Sample host configurations uniformly at random from the set of all
+        valid configurations, without enumerating the set.
+
+        Parameters
+        ----------
+        num_hosts : int
+            number of host configurations to sample
+
+        Returns
+        -------
+        numpy.ndarray
+            index of OS of each host
+        numpy.ndarray
+            (num_hosts, num_services) bool array of host service configurations
+        numpy.ndarray
+            (num_hosts, num_processes) bool array of host process
+            configurations
+        """
+        os_idxs = self.rng.randint(len(self.os), size=num_hosts)
+        srv_cfgs = self._sample_nonempty_configs(num_hosts, len(self.services))
+        proc_cfgs = self._sample_nonempty_configs(
+            num_hosts, len(self.processes)
+        )
+        return os_idxs, srv_cfgs, proc_cfgs
+
+    def _sample_nonempty_configs(self, num_configs, num_options):
+        """Sample configurations uniformly from all configurations of
+        num_options bools, excluding the all False configuration.
+
+        Each option is present independently with probability 0.5, and any
+        all False configurations are resampled, which gives a uniform
+        distribution over the remaining configurations.
+        """
+        cfgs = self.rng.randint(2, size=(num_configs, num_options)) == 1
+        empty = np.flatnonzero(~cfgs.any(axis=1))
+        while len(empty) > 0:
+            cfgs[empty] = self.rng.randint(
+                2, size=(len(empty), num_options)
+            ) == 1
+            empty = empty[~cfgs[empty].any(axis=1)]
+        return cfgs
+
+    def _sample_correlated_configs(self,
+                                   num_hosts,
+                                   alpha_H,
+                                   alpha_V,
+                                   lambda_V):
+        """Sample correlated host configurations using a Nested Dirichlet
+        Process, as for :meth:`_get_host_config`.
+
+        Each host either gets a new configuration, with probability
+        proportional to alpha_H, or the configuration of a previous host
+        chosen uniformly at random. Rather than sampling hosts one at a time,
+        the choice for every host is drawn at once and the configuration each
+        host copies is found by following the chain of copied hosts back to
+        the host that got a new configuration.
+
+        Parameters
+        ----------
+        num_hosts : int
+            number of host configurations to sample
+        alpha_H : float
+            concentration parameter for host configurations
+        alpha_V : float
+            concentration parameter for OS, services and processes
+        lambda_V : float
+            mean number of services and processes sampled per configuration
+
+        Returns
+        -------
+        numpy.ndarray
+            index of OS of each host
+        numpy.ndarray
+            (num_hosts, num_services) bool array of host service configurations
+        numpy.ndarray
+            (num_hosts, num_processes) bool array of host process
+            configurations
+        """
+        host_nums = np.arange(num_hosts)
+        new_config = self.rng.random_sample(num_hosts) \
+            < alpha_H / (alpha_H + np.maximum(host_nums - 1, 0))
+        new_config[0] = True
+        # host copied from, for hosts that do not get a new config
+        copied = np.floor(
+            self.rng.random_sample(num_hosts) * host_nums
+        ).astype(np.int64)
+        source = np.where(new_config, host_nums, copied)
+        while True:
+            next_source = source[source]
+            if np.array_equal(next_source, source):
+                break
+            source = next_source
+
+        config_hosts = np.flatnonzero(new_config)
+        num_configs = len(config_hosts)
+        config_os = np.empty(num_configs, dtype=np.int64)
+        config_srvs = np.zeros((num_configs, len(self.services)), dtype=bool)
+        config_procs = np.zeros((num_configs, len(self.processes)), dtype=bool)
+        os_counts = np.zeros(len(self.os), dtype=np.int64)
+        srv_counts = np.zeros(len(self.services), dtype=np.int64)
+        proc_counts = np.zeros(len(self.processes), dtype=np.int64)
+        for c in range(num_configs):
+            config_os[c] = self._crp_sample(alpha_V, os_counts)
+            self._crp_config(alpha_V, lambda_V, srv_counts, config_srvs[c])
+            self._crp_config(alpha_V, lambda_V, proc_counts, config_procs[c])
+
+        host_configs = np.searchsorted(config_hosts, source)
+        return (
+            config_os[host_configs],
+            config_srvs[host_configs],
+            config_procs[host_configs]
+        )
+
+    def _crp_config(self, alpha_V, lambda_V, counts, cfg):
+        """Sample a configuration using a Dirichlet Process, as for
+        :meth:`_dirichlet_process`, with the number of times each option was
+        previously chosen stored in counts.
+
+        Both counts and cfg are updated in place.
+        """
+        num_options = len(counts)
+        n = max(self.rng.poisson(lambda_V), 1)
+        for i in range(n):
+            if i == 0 or self.rng.rand() < (alpha_V / (alpha_V + i - 1)):
+                x = self.rng.randint(0, num_options)
+            else:
+                x = self._sample_from_counts(counts)
+            cfg[x] = True
+            counts[x] += 1
+
+    def _crp_sample(self, alpha_V, counts):
+        """Sample a single option using a Dirichlet Process, as for
+        :meth:`_dirichlet_sample`, with the number of times each option was
+        previously chosen stored in counts (which is updated in place).
+        """
+        if counts.sum() == 0 or self.rng.rand() < (alpha_V / (alpha_V - 1)):
+            x = self.rng.randint(0, len(counts))
+        else:
+            x = self._sample_from_counts(counts)
+        counts[x] += 1
+        return x
+
+    def _sample_from_counts(self, counts):
+        """Sample an option with probability proportional to its count """
+        cum_counts = np.cumsum(counts)
+        return int(np.searchsorted(
+            cum_counts, self.rng.rand() * cum_counts[-1], side="right"
+        ))
+
     def _is_sensitive_host(self, addr):
         return addr in self.sensitive_hosts
 
@@ -692,68 +899,145 @@ class ScenarioGenerator:
         """Ensures each subnet has at least one vulnerable host and all sensitive hosts
         are vulnerable
         """
-        vulnerable_subnets = set()
-        for host_addr, host in self.hosts.items():
-            if not self._is_sensitive_host(host_addr) \
-               and host_addr[0] in vulnerable_subnets:
-                continue
+        self._init_vulnerability_arrays()
+        host_subnets = self._host_subnets
 
-            if self._is_sensitive_host(host_addr):
-                if not self._host_is_vulnerable(host, u.ROOT_ACCESS):
-                    self._update_host_to_vulnerable(host, u.ROOT_ACCESS)
-                vulnerable_subnets.add(host_addr[0])
-            elif self._host_is_vulnerable(host):
-                vulnerable_subnets.add(host_addr[0])
+        root_vulnerable = self._vulnerable_hosts(u.ROOT_ACCESS)
+        vulnerable = self._vulnerable_hosts(u.USER_ACCESS)
+        vulnerable_subnets = set(host_subnets[vulnerable].tolist())
 
+        updated_hosts = []
+        for host_idx, host_addr in enumerate(self._host_addrs):
+            if not self._is_sensitive_host(host_addr):
+                continue
+            if not root_vulnerable[host_idx]:
+                self._update_host_to_vulnerable(host_idx, u.ROOT_ACCESS)
+                updated_hosts.append(host_idx)
+            vulnerable_subnets.add(host_addr[0])
+
+        # index of first host in each subnet
+        subnet_offsets = np.searchsorted(
+            host_subnets, np.arange(len(self.subnets))
+        )
         for subnet, size in enumerate(self.subnets):
             if subnet in vulnerable_subnets or subnet == u.INTERNET:
                 continue
-            host_num = np.random.randint(size)
-            host = self.hosts[(subnet, host_num)]
-            self._update_host_to_vulnerable(host)
+            host_idx = subnet_offsets[subnet] + self.rng.randint(size)
+            self._update_host_to_vulnerable(host_idx)
+            updated_hosts.append(host_idx)
             vulnerable_subnets.add(subnet)
 
-    def _host_is_vulnerable(self, host, access_level=u.USER_ACCESS):
-        for e_def in self.exploits.values():
-            if self._host_is_vulnerable_to_exploit(host, e_def):
-                if e_def[u.EXPLOIT_ACCESS] >= access_level:
-                    return True
-                for pe_def in self.privescs.values():
-                    if self._host_is_vulnerable_to_privesc(host, pe_def):
-                        return True
-        return False
-
-    def _host_is_vulnerable_to_exploit(self, host, exploit_def):
-        e_srv = exploit_def[u.EXPLOIT_SERVICE]
-        e_os = exploit_def[u.EXPLOIT_OS]
-        if not host.services[e_srv]:
-            return False
-        return e_os is None or host.os[e_os]
-
-    def _host_is_vulnerable_to_privesc(self, host, privesc_def):
-        pe_proc = privesc_def[u.PRIVESC_PROCESS]
-        pe_os = privesc_def[u.PRIVESC_OS]
-        if not host.processes[pe_proc]:
-            return False
-        return pe_os is None or host.os[pe_os]
-
-    def _update_host_to_vulnerable(self, host, access_level=u.USER_ACCESS):
+        for host_idx in updated_hosts:
+            self._update_host_config(host_idx)
+
+    def _init_vulnerability_arrays(self):
+        """Initialize arrays of the configuration of each host and of the
+        services, processes and OS targeted by each exploit and privesc.
+
+        OS are stored as indices into self.os, with -1 for exploits and
+        privescs that work on any OS. Hosts are stored in the same order as
+        self.hosts, which is ordered by address.
+        """
+        os_idxs = {os: i for i, os in enumerate(self.os)}
+        os_idxs[None] = -1
+        srv_idxs = {srv: i for i, srv in enumerate(self.services)}
+        proc_idxs = {proc: i for i, proc in enumerate(self.processes)}
+
+        e_defs = list(self.exploits.values())
+        self._exploit_srvs = np.array(
+            [srv_idxs[e_def[u.EXPLOIT_SERVICE]] for e_def in e_defs]
+        )
+        self._exploit_os = np.array(
+            [os_idxs[e_def[u.EXPLOIT_OS]] for e_def in e_defs]
+        )
+        self._exploit_access = np.array(
+            [e_def[u.EXPLOIT_ACCESS] for e_def in e_defs]
+        )
+
+        pe_defs = list(self.privescs.values())
+        self._privesc_procs = np.array(
+            [proc_idxs[pe_def[u.PRIVESC_PROCESS]] for pe_def in pe_defs]
+        )
+        self._privesc_os = np.array(
+            [os_idxs[pe_def[u.PRIVESC_OS]] for pe_def in pe_defs]
+        )
+
+        hosts = list(self.hosts.values())
+        self._host_addrs = list(self.hosts)
+        self._host_subnets = np.array([addr[0] for addr in self._host_addrs])
+        self._host_os = np.array([
+            os_idxs[os] for host in hosts
+            for os, present in host.os.items() if present
+        ])
+        assert len(self._host_os) == len(hosts), \
+            "Each host must be running exactly one OS"
+        self._host_srvs = np.array(
+            [[host.services[srv] for srv in self.services] for host in hosts],
+            dtype=bool
+        ).reshape(len(hosts), len(self.services))
+        self._host_procs = np.array(
+            [[host.processes[p] for p in self.processes] for host in hosts],
+            dtype=bool
+        ).reshape(len(hosts), len(self.processes))
+
+    def _update_host_config(self, host_idx):
+        """Update host config dictionaries from the host config arrays """
+        host = self.hosts[self._host_addrs[host_idx]]
+        host_os = self.os[self._host_os[host_idx]]
+        for os_name in host.os.keys():
+            host.os[os_name] = os_name == host_os
+        for srv, present in zip(
+                self.services, self._host_srvs[host_idx].tolist()
+        ):
+            host.services[srv] = present
+        for proc, present in zip(
+                self.processes, self._host_procs[host_idx].tolist()
+        ):
+            host.processes[proc] = present
+
+    def _exploit_vulnerabilities(self):
+        """Get (num_hosts, num_exploits) bool matrix of whether each host is
+        vulnerable to each exploit
+        """
+        os_match = (self._exploit_os < 0) \
+            | (self._exploit_os == self._host_os[:, np.newaxis])
+        return self._host_srvs[:, self._exploit_srvs] & os_match
+
+    def _privesc_vulnerabilities(self):
+        """Get (num_hosts, num_privescs) bool matrix of whether each host is
+        vulnerable to each privilege escalation
+        """
+        os_match = (self._privesc_os < 0) \
+            | (self._privesc_os == self._host_os[:, np.newaxis])
+        return self._host_procs[:, self._privesc_procs] & os_match
+
+    def _vulnerable_hosts(self, access_level=u.USER_ACCESS):
+        """Get bool array of whether each host is vulnerable to an exploit
+        that gives at least access_level, or to any exploit and any privilege
+        escalation
+        """
+        exploit_vuln = self._exploit_vulnerabilities()
+        privesc_vuln = self._privesc_vulnerabilities()
+        return (exploit_vuln & (self._exploit_access >= access_level)).any(1) \
+            | (exploit_vuln.any(1) & privesc_vuln.any(1))
+
+    def _update_host_to_vulnerable(self, host_idx, access_level=u.USER_ACCESS):
         """Update host config so it's vulnerable to at least one exploit """
         # choose an exploit randomly and make host vulnerable to it
         # will retry X times before giving up
         # If vulnerable config is not found in X tries then the scenario
         # probably needs more options (processes, privesc actions)
         for i in range(VUL_RETRIES):
-            success, e_def = self._update_host_exploit_vulnerability(
-                host, False
+            success, e_idx = self._update_host_exploit_vulnerability(
+                host_idx, False
             )
             # don't need to check success since should always succeed
             # in finding exploit, when there is no contraint on OS
-            if e_def[u.EXPLOIT_ACCESS] >= access_level:
+            if self._exploit_access[e_idx] >= access_level:
                 return
             # Need to ensure host is now vulnerable to >= 1 privesc action
-            success, pe_def = self._update_host_privesc_vulnerability(
-                host, True
+            success, pe_idx = self._update_host_privesc_vulnerability(
+                host_idx, True
             )
             if success:
                 return
@@ -764,57 +1048,47 @@ class ScenarioGenerator:
             " try again using more privilege escalation actions or processes"
         )
 
-    def _update_host_exploit_vulnerability(self, host, os_constraint):
+    def _update_host_exploit_vulnerability(self, host_idx, os_constraint):
         # choose an exploit randomly and make host vulnerable to it
         if not os_constraint:
             # can change host OS, so all exploits valid
-            valid_e = list(self.exploits.values())
+            valid_e = np.arange(len(self._exploit_srvs))
         else:
             # exploits must match OS of host, or be OS agnostic
             # since cannot change host OS
-            valid_e = []
-            for e_def in self.exploits.values():
-                e_os = e_def[u.EXPLOIT_OS]
-                if e_os is None or host.os[e_os]:
-                    valid_e.append(e_def)
-
+            valid_e = np.flatnonzero(
+                (self._exploit_os < 0)
+                | (self._exploit_os == self._host_os[host_idx])
+            )
             if len(valid_e) == 0:
                 return False, None
 
-        e_def = np.random.choice(valid_e)
-        host.services[e_def[u.EXPLOIT_SERVICE]] = True
-        if e_def[u.EXPLOIT_OS] is not None and not os_constraint:
-            self._update_host_os(host, e_def[u.EXPLOIT_OS])
+        e_idx = self.rng.choice(valid_e)
+        self._host_srvs[host_idx, self._exploit_srvs[e_idx]] = True
+        if self._exploit_os[e_idx] >= 0 and not os_constraint:
+            self._host_os[host_idx] = self._exploit_os[e_idx]
 
-        return True, e_def
+        return True, e_idx
 
-    def _update_host_privesc_vulnerability(self, host, os_constraint):
+    def _update_host_privesc_vulnerability(self, host_idx, os_constraint):
         # choose an exploit randomly and make host vulnerable to it
         if not os_constraint:
             # no OS constraint
-            valid_pe = list(self.privescs.values())
+            valid_pe = np.arange(len(self._privesc_procs))
         else:
-            valid_pe = []
-            for pe_def in self.privescs.values():
-                pe_os = pe_def[u.PRIVESC_OS]
-                if pe_os is None or host.os[pe_os]:
-                    valid_pe.append(pe_def)
-
+            valid_pe = np.flatnonzero(
+                (self._privesc_os < 0)
+                | (self._privesc_os == self._host_os[host_idx])
+            )
             if len(valid_pe) == 0:
                 return False, None
 
-        pe_def = np.random.choice(valid_pe)
-        host.processes[pe_def[u.PRIVESC_PROCESS]] = True
-        if pe_def[u.PRIVESC_OS] is not None and not os_constraint:
-            self._update_host_os(host, pe_def[u.PRIVESC_OS])
+        pe_idx = self.rng.choice(valid_pe)
+        self._host_procs[host_idx, self._privesc_procs[pe_idx]] = True
+        if self._privesc_os[pe_idx] >= 0 and not os_constraint:
+            self._host_os[host_idx] = self._privesc_os[pe_idx]
 
-        return True, pe_def
-
-    def _update_host_os(self, host, os):
-        # must set all to false first, so only one host OS is true
-        for os_name in host.os.keys():
-            host.os[os_name] = False
-        host.os[os] = True
+        return True, pe_idx
 
     def _get_host_value(self, address):
         return float(self.sensitive_hosts.get(address, self.base_host_value))
@@ -846,45 +1120,37 @@ class ScenarioGenerator:
         firewall = {}
 
         # find services running on each subnet that are vulnerable
-        subnet_services = {}
-        subnet_services[u.INTERNET] = set()
-        for host_addr, host in self.hosts.items():
-            subnet = host_addr[0]
-            if subnet not in subnet_services:
-                subnet_services[subnet] = set()
-            for e_def in self.exploits.values():
-                if self._host_is_vulnerable_to_exploit(host, e_def):
-                    subnet_services[subnet].add(e_def[u.EXPLOIT_SERVICE])
-
-        for src in range(num_subnets):
-            for dest in range(num_subnets):
-                if src == dest or not self.topology[src][dest]:
-                    # no inter subnet connection so no firewall
-                    continue
-                elif src > SENSITIVE and dest > SENSITIVE:
-                    # all services allowed between user subnets
-                    allowed = set(self.services)
-                    firewall[(src, dest)] = allowed
-                    continue
-                # else src and dest in different zones => block services based
-                # on restrictiveness
-                dest_avail = subnet_services[dest].copy()
-                if len(dest_avail) < restrictiveness:
-                    # restrictiveness not limiting allowed traffic, all
-                    # services allowed
-                    firewall[(src, dest)] = dest_avail.copy()
-                    continue
-                # add at least one service to allowed service
-                dest_allowed = np.random.choice(list(dest_avail))
-                # for dest subnet choose available services upto
-                # restrictiveness limit or all services
-                dest_avail.remove(dest_allowed)
-                allowed = set()
-                allowed.add(dest_allowed)
-                while len(allowed) < restrictiveness:
-                    dest_allowed = np.random.choice(list(dest_avail))
-                    if dest_allowed not in allowed:
-                        allowed.add(dest_allowed)
-                        dest_avail.remove(dest_allowed)
+        exploit_vuln = self._exploit_vulnerabilities()
+        vuln_srvs = np.zeros(
+            (len(self._host_addrs), len(self.services)), dtype=bool
+        )
+        host_idxs, e_idxs = np.nonzero(exploit_vuln)
+        vuln_srvs[host_idxs, self._exploit_srvs[e_idxs]] = True
+        subnet_services = np.zeros(
+            (num_subnets, len(self.services)), dtype=bool
+        )
+        np.logical_or.at(subnet_services, self._host_subnets, vuln_srvs)
+
+        connected = np.array(self.topology, dtype=bool)
+        np.fill_diagonal(connected, False)
+        for src, dest in np.argwhere(connected).tolist():
+            if src > SENSITIVE and dest > SENSITIVE:
+                # all services allowed between user subnets
+                allowed = set(self.services)
                 firewall[(src, dest)] = allowed
+                continue
+            # else src and dest in different zones => block services based
+            # on restrictiveness
+            dest_avail = np.flatnonzero(subnet_services[dest])
+            if len(dest_avail) >= restrictiveness:
+                # choose available services for dest subnet upto
+                # restrictiveness limit
+                dest_avail = self.rng.choice(
+                    dest_avail, restrictiveness, replace=False
+                )
+            # if restrictiveness not limiting allowed traffic, all
+            # services allowed
+            firewall[(src, dest)] = set(
+                self.services[srv] for srv in dest_avail.tolist()
+            )
         self.firewall = firewall
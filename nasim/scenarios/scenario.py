@@ -12,6 +12,9 @@ class Scenario:
         self.generated = generated
         self._e_map = None
         self._pe_map = None
+        # data precomputed from the scenario by the environment, e.g. the
+        # network permission arrays (see Network.compile)
+        self.compiled = {}
 
         # this is used for consistent positioning of
         # host state and obs in state and obs matrices
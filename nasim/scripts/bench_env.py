@@ -0,0 +1,379 @@
+"""This script benchmarks the throughput of the environment core.
+
+For every benchmark scenario (including generated ones) and every
+combination of fully/partially observable and flat/parameterised action
+modes it measures:
+
+- Steps/sec : calls to env.step per second
+- Resets/sec : calls to env.reset per second
+- Gen steps/sec : calls to env.generative_step per second, always from the
+  initial state
+- Alloc/step : peak memory allocated during a single call to env.step, in
+  bytes (averaged over steps, measured with tracemalloc in a separate pass
+  so it does not affect the timings)
+
+It also measures the time taken to import each package in a fresh Python
+process (the best of --repeats runs), and reports if importing the package
+loads any of the rendering stack, which should only be loaded on first
+render.
+
+Actions are sampled uniformly at random from the action space, with a fixed
+seed, before any timing starts. Both the `nasim` and `nasim_with_defender`
+packages can be benchmarked.
+
+The results are printed as a table and can be saved as a JSON report. If a
+baseline report is given, any measurement that is worse than the baseline by
+more than the regression threshold is reported and the script exits with
+status 1.
+
+Usage
+-----
+$ python bench_env.py [-p --packages PACKAGE [PACKAGE ...]]
+     [--scenarios SCENARIO [SCENARIO ...]] [-s --num_steps NUM_STEPS]
+     [-r --num_resets NUM_RESETS] [--repeats REPEATS]
+     [-o --output REPORT.json] [-b --baseline BASELINE.json]
+     [-t --threshold THRESHOLD]
+
+"""
+import sys
+import json
+import time
+import subprocess
+import platform
+import importlib
+import tracemalloc
+import numpy as np
+from prettytable import PrettyTable
+
+PACKAGES = ["nasim", "nasim_with_defender"]
+
+MODES = [
+    # (fully_obs, flat_actions)
+    (True, True),
+    (True, False),
+    (False, True),
+    (False, False)
+]
+
+# metric name and whether higher is better
+METRICS = {
+    "steps_per_sec": True,
+    "resets_per_sec": True,
+    "generative_steps_per_sec": True,
+    "alloc_bytes_per_step": False,
+    "import_sec": False
+}
+
+ENV_METRICS = [
+    "steps_per_sec",
+    "resets_per_sec",
+    "generative_steps_per_sec",
+    "alloc_bytes_per_step"
+]
+
+# modules that should not be loaded until rendering is used
+RENDER_MODULES = ["tkinter", "networkx", "prettytable", "matplotlib"]
+
+IMPORT_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import {package}
+import_time = time.perf_counter() - start
+loaded = [m for m in {render_modules} if m in sys.modules]
+print(import_time, ",".join(loaded))
+"""
+
+
+def mode_name(fully_obs, flat_actions):
+    obs = "FO" if fully_obs else "PO"
+    actions = "flat" if flat_actions else "param"
+    return f"{obs}/{actions}"
+
+
+def sample_actions(env, num_actions, seed):
+    env.action_space.seed(seed)
+    return [env.action_space.sample() for _ in range(num_actions)]
+
+
+def time_steps(env, actions):
+    env.reset(seed=0)
+    step_time = 0.0
+    for a in actions:
+        start = time.perf_counter()
+        _, _, done, step_limit_reached, _ = env.step(a)
+        step_time += time.perf_counter() - start
+        if done or step_limit_reached:
+            env.reset()
+    return len(actions) / step_time
+
+
+def time_resets(env, num_resets):
+    start = time.perf_counter()
+    for _ in range(num_resets):
+        env.reset()
+    return num_resets / (time.perf_counter() - start)
+
+
+def time_generative_steps(env, actions):
+    env.reset(seed=0)
+    state = env.current_state
+    start = time.perf_counter()
+    for a in actions:
+        env.generative_step(state, a)
+    return len(actions) / (time.perf_counter() - start)
+
+
+def measure_step_allocations(env, actions):
+    env.reset(seed=0)
+    total = 0
+    tracemalloc.start()
+    try:
+        for a in actions:
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            _, _, done, step_limit_reached, _ = env.step(a)
+            total += tracemalloc.get_traced_memory()[1] - current
+            if done or step_limit_reached:
+                env.reset()
+    finally:
+        tracemalloc.stop()
+    return total / len(actions)
+
+
+def bench_env(env, num_steps, num_resets, repeats, seed=0):
+    actions = sample_actions(env, num_steps, seed)
+    result = {
+        "steps_per_sec": max(
+            time_steps(env, actions) for _ in range(repeats)
+        ),
+        "resets_per_sec": max(
+            time_resets(env, num_resets) for _ in range(repeats)
+        ),
+        "generative_steps_per_sec": max(
+            time_generative_steps(env, actions) for _ in range(repeats)
+        ),
+        "alloc_bytes_per_step": measure_step_allocations(
+            env, actions[:min(num_steps, 500)]
+        )
+    }
+    return result
+
+
+def measure_import(package_name, repeats):
+    """Measure import time of package in fresh Python processes.
+
+    Returns
+    -------
+    float
+        the best import time in seconds
+    list[str]
+        the rendering modules loaded by importing package
+    """
+    script = IMPORT_SCRIPT.format(
+        package=package_name, render_modules=RENDER_MODULES
+    )
+    import_times = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", script],
+            check=True,
+            capture_output=True,
+            text=True
+        ).stdout.split()
+        import_times.append(float(output[0]))
+        loaded = output[1].split(",") if len(output) > 1 else []
+    return min(import_times), loaded
+
+
+def run_benchmarks(packages=None,
+                   scenarios=None,
+                   num_steps=2000,
+                   num_resets=200,
+                   repeats=3,
+                   verbose=True):
+    """Run benchmarks, returning results keyed by
+    'package/scenario/observability/actions'.
+    """
+    if packages is None:
+        packages = PACKAGES
+
+    results = {}
+    for package_name in packages:
+        if verbose:
+            print(f"Running {package_name}/import", file=sys.stderr)
+        import_sec, loaded = measure_import(package_name, repeats)
+        results[f"{package_name}/import"] = {
+            "import_sec": import_sec,
+            "render_modules_loaded": loaded
+        }
+
+        package = importlib.import_module(package_name)
+        avail_benchmarks = importlib.import_module(
+            f"{package_name}.scenarios.benchmark"
+        ).AVAIL_BENCHMARKS
+        for name in avail_benchmarks:
+            if scenarios is not None and name not in scenarios:
+                continue
+            for fully_obs, flat_actions in MODES:
+                key = "/".join([
+                    package_name, name, mode_name(fully_obs, flat_actions)
+                ])
+                if verbose:
+                    print(f"Running {key}", file=sys.stderr)
+                env = package.make_benchmark(
+                    name,
+                    seed=0,
+                    fully_obs=fully_obs,
+                    flat_actions=flat_actions,
+                    flat_obs=True
+                )
+                results[key] = bench_env(env, num_steps, num_resets, repeats)
+    return results
+
+
+def make_report(results, args):
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "settings": args,
+        "results": results
+    }
+
+
+def compare_to_baseline(results, baseline_results, threshold):
+    """Get list of (key, metric, value, baseline value) for every
+    measurement that is worse than baseline by more than threshold.
+    """
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline_results:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            value = result.get(metric)
+            base_value = baseline_results[key].get(metric)
+            if value is None or base_value is None:
+                continue
+            if higher_is_better:
+                worse = value < base_value * (1 - threshold)
+            else:
+                worse = value > base_value * (1 + threshold)
+            if worse:
+                regressions.append((key, metric, value, base_value))
+    return regressions
+
+
+def format_change(value, base_value):
+    if base_value == 0:
+        return ""
+    return f" ({100 * (value - base_value) / base_value:+.1f}%)"
+
+
+def output_results(results, baseline_results=None):
+    headers = [
+        "Benchmark", "Steps/sec", "Resets/sec", "Gen steps/sec", "Alloc/step"
+    ]
+    table = PrettyTable(headers)
+    table.align["Benchmark"] = "l"
+    import_table = PrettyTable(["Package", "Import (ms)", "Render modules"])
+    import_table.align["Package"] = "l"
+    for key, result in results.items():
+        base_result = None
+        if baseline_results is not None:
+            base_result = baseline_results.get(key)
+
+        if "import_sec" in result:
+            cell = f"{1000 * result['import_sec']:.1f}"
+            if base_result is not None:
+                cell += format_change(
+                    result["import_sec"], base_result["import_sec"]
+                )
+            loaded = ", ".join(result["render_modules_loaded"])
+            import_table.add_row([key.split("/")[0], cell, loaded or "-"])
+            continue
+
+        row = [key]
+        for metric in ENV_METRICS:
+            value = result[metric]
+            cell = f"{value:.1f}"
+            if base_result is not None:
+                cell += format_change(value, base_result[metric])
+            row.append(cell)
+        table.add_row(row)
+    print(import_table)
+    print(table)
+
+
+def main(packages=None,
+         scenarios=None,
+         num_steps=2000,
+         num_resets=200,
+         repeats=3,
+         output=None,
+         baseline=None,
+         threshold=0.1):
+    settings = dict(
+        packages=packages,
+        scenarios=scenarios,
+        num_steps=num_steps,
+        num_resets=num_resets,
+        repeats=repeats
+    )
+    results = run_benchmarks(
+        packages, scenarios, num_steps, num_resets, repeats
+    )
+
+    baseline_results = None
+    if baseline is not None:
+        with open(baseline, "r") as fin:
+            baseline_results = json.load(fin)["results"]
+
+    output_results(results, baseline_results)
+
+    if output is not None:
+        print(f"\nSaving report to {output}")
+        with open(output, "w") as fout:
+            json.dump(make_report(results, settings), fout, indent=2)
+
+    if baseline_results is None:
+        return 0
+
+    regressions = compare_to_baseline(results, baseline_results, threshold)
+    if not regressions:
+        print(f"\nNo regressions beyond {threshold:.0%} of baseline")
+        return 0
+
+    print(f"\n{len(regressions)} regressions beyond {threshold:.0%} "
+          "of baseline:")
+    for key, metric, value, base_value in regressions:
+        print(f"  {key} {metric}: {value:.1f} vs {base_value:.1f}"
+              f"{format_change(value, base_value)}")
+    return 1
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-p", "--packages", type=str, nargs="+",
+                        default=PACKAGES, choices=PACKAGES,
+                        help="Packages to benchmark (default=both)")
+    parser.add_argument("--scenarios", type=str, nargs="+", default=None,
+                        help="Scenarios to run (default=all benchmarks)")
+    parser.add_argument("-s", "--num_steps", type=int, default=2000,
+                        help=("Number of steps and generative steps to time"
+                              " (default=2000)"))
+    parser.add_argument("-r", "--num_resets", type=int, default=200,
+                        help="Number of resets to time (default=200)")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help=("Number of times to repeat each timing, the"
+                              " best is reported (default=3)"))
+    parser.add_argument("-o", "--output", type=str, default=None,
+                        help="File name to save JSON report to")
+    parser.add_argument("-b", "--baseline", type=str, default=None,
+                        help="JSON report to compare results against")
+    parser.add_argument("-t", "--threshold", type=float, default=0.1,
+                        help=("Relative change from baseline that counts as"
+                              " a regression (default=0.1)"))
+    args = parser.parse_args()
+
+    sys.exit(main(**vars(args)))
@@ -0,0 +1,75 @@
+"""This script builds a corpus of generated scenarios for training on a
+distribution of networks (see :mod:`nasim.scenarios.corpus`).
+
+The number of hosts and services of each scenario are chosen uniformly at
+random from the given values. A summary of the number of scenarios in each
+size bucket is printed once the corpus is built.
+
+Usage
+-----
+$ python build_scenario_corpus.py corpus_dir
+     [-n --num_scenarios NUM_SCENARIOS]
+     [--num_hosts NUM_HOSTS [NUM_HOSTS ...]]
+     [--num_services NUM_SERVICES [NUM_SERVICES ...]]
+     [-s --seed SEED] [-w --num_workers NUM_WORKERS]
+     [--shard_size SHARD_SIZE] [--uniform] [--scalable]
+
+"""
+import time
+from prettytable import PrettyTable
+
+from nasim.scenarios.corpus import build_corpus
+
+
+def output_summary(corpus):
+    table = PrettyTable(["Size bucket", "Scenarios", "Mean minimal hops"])
+    for bucket in corpus.buckets:
+        hops = [
+            e["minimal_hops"] for e in corpus.entries
+            if e["size_bucket"] == bucket
+        ]
+        table.add_row(
+            [bucket, corpus.bucket_size(bucket), f"{sum(hops)/len(hops):.2f}"]
+        )
+    print(table)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("corpus_dir", type=str,
+                        help="Directory to save corpus to")
+    parser.add_argument("-n", "--num_scenarios", type=int, default=1000,
+                        help="Number of scenarios to generate (default=1000)")
+    parser.add_argument("--num_hosts", type=int, nargs="+", default=[40],
+                        help="Number of hosts to choose from (default=40)")
+    parser.add_argument("--num_services", type=int, nargs="+", default=[5],
+                        help="Number of services to choose from (default=5)")
+    parser.add_argument("-s", "--seed", type=int, default=None,
+                        help="Corpus seed (default=None)")
+    parser.add_argument("-w", "--num_workers", type=int, default=1,
+                        help="Number of processes to use (default=1)")
+    parser.add_argument("--shard_size", type=int, default=100,
+                        help="Max scenarios per shard file (default=100)")
+    parser.add_argument("--uniform", action="store_true",
+                        help="Use uniform host configurations")
+    parser.add_argument("--scalable", action="store_true",
+                        help="Sample host configurations in bulk")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    corpus = build_corpus(
+        args.corpus_dir,
+        args.num_scenarios,
+        args.num_hosts,
+        args.num_services,
+        seed=args.seed,
+        num_workers=args.num_workers,
+        shard_size=args.shard_size,
+        verbose=True,
+        uniform=args.uniform,
+        scalable=args.scalable
+    )
+    print(f"Built {len(corpus)} scenarios in "
+          f"{time.perf_counter() - start_time:.2f} sec")
+    output_summary(corpus)
@@ -1,22 +1,50 @@
 """This script runs the random agent for all benchmarks scenarios
 
-The mean (+/- stdev) steps and reward are reported in table to stdout
-(and to optional CSV file)
+The mean (+/- stdev) steps, reward and steps per second are reported in table
+to stdout (and to optional CSV file).
+
+Runs are distributed over a process pool and the result of each run is
+streamed to an optional results file as soon as it completes. The results
+file is written as JSON lines if its name ends with '.jsonl', otherwise as
+CSV. With the --resume flag any runs already in the results file are skipped
+and included in the reported summary, so an interrupted benchmark can be
+continued.
+
+Each run uses the random agent with the run seed for the action sampling and
+environment randomness, so runs are reproducible.
 
 Usage
 -----
 $ python run_random_benchmarks.py [-n --num_cpus NUM_CPUS]
      [-o --output OUTPUT_FILENAME] [-s --num_seeds NUM_SEEDS]
+     [-r --results_file RESULTS_FILENAME] [--resume]
+     [--scenarios SCENARIO [SCENARIO ...]]
 
 """
 import os
+import csv
+import json
+import time
 import numpy as np
 import multiprocessing as mp
 from prettytable import PrettyTable
 
-import nasim
+from nasim.envs import NASimEnv
 from nasim.agents.random_agent import run_random_agent
-from nasim.scenarios.benchmark import AVAIL_BENCHMARKS
+from nasim.scenarios import make_benchmark_scenario
+from nasim.scenarios.benchmark import (
+    AVAIL_BENCHMARKS,
+    AVAIL_STATIC_BENCHMARKS
+)
+
+RESULT_FIELDS = [
+    "Name", "Seed", "Steps", "Total reward", "Goal", "Time", "Steps/sec"
+]
+
+# per-worker cache of loaded static scenarios, and of the last environment
+# used (which can only be reused for runs of the same scenario)
+_scenario_cache = {}
+_last_env = (None, None)
 
 
 def print_msg(msg):
@@ -29,10 +57,14 @@ class Result:
         self.name = name
         self.run_steps = []
         self.run_rewards = []
+        self.run_goals = []
+        self.run_times = []
 
-    def add(self, steps, reward):
+    def add(self, steps, reward, goal=False, run_time=0.0):
         self.run_steps.append(steps)
         self.run_rewards.append(reward)
+        self.run_goals.append(goal)
+        self.run_times.append(run_time)
 
     def summarize(self):
         steps_mean = np.mean(self.run_steps)
@@ -41,41 +73,183 @@ class Result:
         reward_std = np.std(self.run_rewards)
         return steps_mean, steps_std, reward_mean, reward_std
 
+    def steps_per_sec(self):
+        total_time = np.sum(self.run_times)
+        if total_time == 0:
+            return 0.0
+        return np.sum(self.run_steps) / total_time
+
     def get_formatted_summary(self):
         steps_mean, steps_std, reward_mean, reward_std = self.summarize()
         return (
+            str(len(self.run_steps)),
             f"{steps_mean:.2f} +/- {steps_std:.2f}",
-            f"{reward_mean:.2f} +/- {reward_std:.2f}"
+            f"{reward_mean:.2f} +/- {reward_std:.2f}",
+            f"{int(np.sum(self.run_goals))}",
+            f"{self.steps_per_sec():.1f}"
+        )
+
+
+def get_scenario(scenario_name, seed):
+    """Get benchmark scenario, loading static scenarios only once per process
+    """
+    if scenario_name not in AVAIL_STATIC_BENCHMARKS:
+        # generated scenarios depend on the seed, so are never reused
+        return make_benchmark_scenario(scenario_name, seed)
+    if scenario_name not in _scenario_cache:
+        _scenario_cache[scenario_name] = make_benchmark_scenario(
+            scenario_name, seed
+        )
+    return _scenario_cache[scenario_name]
+
+
+def get_env(scenario_name, seed):
+    """Get environment for a run, reusing the last environment of this
+    process when it was for the same scenario.
+
+    Host vector indices are class level attributes set when an environment
+    is created, so only the most recently created environment can be safely
+    reused.
+    """
+    global _last_env
+    env_key = scenario_name
+    if scenario_name not in AVAIL_STATIC_BENCHMARKS:
+        env_key = (scenario_name, seed)
+    last_key, env = _last_env
+    if last_key != env_key:
+        scenario = get_scenario(scenario_name, seed)
+        env = NASimEnv(
+            scenario, fully_obs=False, flat_actions=True, flat_obs=True
         )
+        _last_env = (env_key, env)
+    return env
 
 
 def run_scenario(args):
     scenario_name, seed = args
     print_msg(f"Running '{scenario_name}' scenario with seed={seed}")
-    env = nasim.make_benchmark(scenario_name, seed, False, True, True)
-    steps, total_reward, done = run_random_agent(env, verbose=False)
+    env = get_env(scenario_name, seed)
+    # seeds the environment random number generator, which is kept by the
+    # unseeded reset at the start of run_random_agent
+    env.reset(seed=seed)
+    env.action_space.seed(seed)
+    start_time = time.perf_counter()
+    steps, total_reward, goal = run_random_agent(env, verbose=False)
+    run_time = time.perf_counter() - start_time
     return {
         "Name": scenario_name,
         "Seed": seed,
         "Steps": steps,
-        "Total reward": total_reward
+        "Total reward": float(total_reward),
+        "Goal": bool(goal),
+        "Time": run_time,
+        "Steps/sec": steps / run_time if run_time > 0 else 0.0
     }
 
 
+def is_jsonl(filename):
+    return filename.endswith(".jsonl")
+
+
+def load_results(filename):
+    """Load completed run results from results file.
+
+    Incomplete or malformed lines (e.g. from a crash mid-write) are ignored.
+    """
+    results = []
+    if not os.path.exists(filename):
+        return results
+
+    with open(filename, "r", newline="") as fin:
+        # a final line without a newline was not completely written
+        lines = [line for line in fin if line.endswith("\n")]
+
+    if is_jsonl(filename):
+        rows = []
+        for line in lines:
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    else:
+        rows = csv.DictReader(lines)
+
+    for row in rows:
+        try:
+            res = {
+                "Name": row["Name"],
+                "Seed": int(row["Seed"]),
+                "Steps": int(row["Steps"]),
+                "Total reward": float(row["Total reward"]),
+                "Goal": str(row["Goal"]) in ("True", "true"),
+                "Time": float(row["Time"]),
+                "Steps/sec": float(row["Steps/sec"])
+            }
+        except (KeyError, TypeError, ValueError):
+            continue
+        results.append(res)
+    return results
+
+
+def truncate_partial_line(filename):
+    """Remove final line of file if it was not completely written """
+    with open(filename, "rb") as fin:
+        content = fin.read()
+    if content and not content.endswith(b"\n"):
+        os.truncate(filename, content.rfind(b"\n") + 1)
+
+
+class ResultWriter:
+    """Appends run results to a CSV or JSON lines file as they complete """
+
+    def __init__(self, filename):
+        self.jsonl = is_jsonl(filename)
+        if os.path.exists(filename):
+            truncate_partial_line(filename)
+        write_header = not (
+            os.path.exists(filename) and os.path.getsize(filename) > 0
+        )
+        self.fout = open(filename, "a", newline="")
+        self.writer = None
+        if not self.jsonl:
+            self.writer = csv.DictWriter(self.fout, fieldnames=RESULT_FIELDS)
+            if write_header:
+                self.writer.writeheader()
+
+    def write(self, result):
+        if self.jsonl:
+            self.fout.write(json.dumps(result) + "\n")
+        else:
+            self.writer.writerow(result)
+        self.fout.flush()
+
+    def close(self):
+        self.fout.close()
+
+
 def collate_results(results):
     scenario_results = {}
     for res in results:
         name = res["Name"]
         if name not in scenario_results:
             scenario_results[name] = Result(name)
-        scenario_results[name].add(res["Steps"], res["Total reward"])
+        scenario_results[name].add(
+            res["Steps"],
+            res["Total reward"],
+            res.get("Goal", False),
+            res.get("Time", 0.0)
+        )
     return scenario_results
 
 
 def output_results(results, output=None):
-    headers = ["Scenario Name", "Steps", "Total Reward"]
+    headers = [
+        "Scenario Name", "Runs", "Steps", "Total Reward", "Goals", "Steps/sec"
+    ]
     rows = []
     for name in AVAIL_BENCHMARKS:
+        if name not in results:
+            continue
         rows.append([
             name, *results[name].get_formatted_summary()
         ])
@@ -84,21 +258,61 @@ def output_results(results, output=None):
     for row in rows:
         table.add_row(row)
 
+    print(table)
+
     if output is not None:
+        print(f"\nSaving to {output}")
         with open(output, "w") as fout:
             fout.write(",".join(headers) + "\n")
             for row in rows:
                 fout.write(",".join(row) + "\n")
 
 
-def run_random_benchmark(num_cpus=1, num_seeds=10, output=None):
+def run_random_benchmark(num_cpus=1,
+                         num_seeds=10,
+                         output=None,
+                         results_file=None,
+                         resume=False,
+                         scenarios=None):
+    if scenarios is None:
+        scenarios = AVAIL_BENCHMARKS
+
+    results = []
+    if results_file is not None:
+        if resume:
+            results = load_results(results_file)
+        elif os.path.exists(results_file):
+            os.remove(results_file)
+    completed = set((res["Name"], res["Seed"]) for res in results)
+
+    # runs are ordered by scenario so consecutive runs in a worker can reuse
+    # the same environment
     run_args_list = []
-    for name in AVAIL_BENCHMARKS:
+    for name in scenarios:
         for seed in range(num_seeds):
-            run_args_list.append((name, seed))
+            if (name, seed) not in completed:
+                run_args_list.append((name, seed))
+
+    if completed:
+        print(f"Resuming: {len(completed)} runs already completed, "
+              f"{len(run_args_list)} remaining")
+
+    writer = None
+    if results_file is not None:
+        writer = ResultWriter(results_file)
 
-    with mp.Pool(num_cpus) as p:
-        results = p.map(run_scenario, run_args_list)
+    chunksize = max(1, min(num_seeds, len(run_args_list) // (4*num_cpus)))
+    try:
+        with mp.Pool(num_cpus) as p:
+            for res in p.imap_unordered(
+                    run_scenario, run_args_list, chunksize=chunksize
+            ):
+                results.append(res)
+                if writer is not None:
+                    writer.write(res)
+    finally:
+        if writer is not None:
+            writer.close()
 
     results = collate_results(results)
     output_results(results, output)
@@ -110,10 +324,19 @@ if __name__ == "__main__":
     parser.add_argument("-n", "--num_cpus", type=int, default=1,
                         help="Number of CPUS to use in parallel (default=1)")
     parser.add_argument("-o", "--output", type=str, default=None,
-                        help="File name to output as CSV too")
+                        help="File name to output summary as CSV too")
     parser.add_argument("-s", "--num_seeds", type=int, default=10,
                         help=("Number of seeds to run for each scenario"
                               " (default=10)"))
+    parser.add_argument("-r", "--results_file", type=str, default=None,
+                        help=("File name to stream result of each run to, as"
+                              " JSON lines if name ends with '.jsonl',"
+                              " otherwise as CSV"))
+    parser.add_argument("--resume", action="store_true",
+                        help=("Skip runs already in results file and include"
+                              " them in summary"))
+    parser.add_argument("--scenarios", type=str, nargs="+", default=None,
+                        help="Scenarios to run (default=all benchmarks)")
     args = parser.parse_args()
 
     run_random_benchmark(**vars(args))
@@ -15,7 +15,11 @@ def make_benchmark(scenario_name,
                    fully_obs=False,
                    flat_actions=True,
                    flat_obs=True,
-                   render_mode=None):
+                   render_mode=None,
+                   reuse_obs_buffer=False,
+                   packed_obs=False,
+                   defender_fully_obs=True,
+                   obs_features=None):
     """Make a new benchmark NASim environment.
 
     Parameters
@@ -35,6 +39,21 @@ def make_benchmark(scenario_name,
         will use a 2D observation space (default=True)
     render_mode : str, optional
             The render mode to use for the environment.
+    reuse_obs_buffer : bool, optional
+        if true then observations are written into a single buffer that is
+        overwritten by the next call to step or reset, so they must be
+        copied if they need to be kept (default=False)
+    packed_obs : bool, optional
+        if true then observations are the packed state key, a small uint8
+        array suited to tabular agents. Requires fully_obs=True and a
+        scenario without defender actions (default=False)
+    defender_fully_obs : bool, optional
+        if true then the defender observes every host, otherwise it only
+        observes the hosts that changed in the last step (default=True)
+    obs_features : dict, optional
+        map from agent name to the host features observed by that agent,
+        given as keyword arguments of :func:`HostVector.observation_mask`.
+        Agents not in the map observe every feature (default=None)
 
     Returns
     -------
@@ -49,7 +68,11 @@ def make_benchmark(scenario_name,
     env_kwargs = {"fully_obs": fully_obs,
                   "flat_actions": flat_actions,
                   "flat_obs": flat_obs,
-                  "render_mode": render_mode}
+                  "render_mode": render_mode,
+                  "reuse_obs_buffer": reuse_obs_buffer,
+                  "packed_obs": packed_obs,
+                  "defender_fully_obs": defender_fully_obs,
+                  "obs_features": obs_features}
     scenario = make_benchmark_scenario(scenario_name, seed)
     return NASimEnv(scenario, **env_kwargs)
 
@@ -59,7 +82,11 @@ def load(path,
          flat_actions=True,
          flat_obs=True,
          name=None,
-         render_mode=None):
+         render_mode=None,
+         reuse_obs_buffer=False,
+         packed_obs=False,
+         defender_fully_obs=True,
+         obs_features=None):
     """Load NASim Environment from a .yaml scenario file.
 
     Parameters
@@ -80,6 +107,21 @@ def load(path,
         (default=None)
     render_mode : str, optional
             The render mode to use for the environment.
+    reuse_obs_buffer : bool, optional
+        if true then observations are written into a single buffer that is
+        overwritten by the next call to step or reset, so they must be
+        copied if they need to be kept (default=False)
+    packed_obs : bool, optional
+        if true then observations are the packed state key, a small uint8
+        array suited to tabular agents. Requires fully_obs=True and a
+        scenario without defender actions (default=False)
+    defender_fully_obs : bool, optional
+        if true then the defender observes every host, otherwise it only
+        observes the hosts that changed in the last step (default=True)
+    obs_features : dict, optional
+        map from agent name to the host features observed by that agent,
+        given as keyword arguments of :func:`HostVector.observation_mask`.
+        Agents not in the map observe every feature (default=None)
 
     Returns
     -------
@@ -89,7 +131,11 @@ def load(path,
     env_kwargs = {"fully_obs": fully_obs,
                   "flat_actions": flat_actions,
                   "flat_obs": flat_obs,
-                  "render_mode": render_mode}
+                  "render_mode": render_mode,
+                  "reuse_obs_buffer": reuse_obs_buffer,
+                  "packed_obs": packed_obs,
+                  "defender_fully_obs": defender_fully_obs,
+                  "obs_features": obs_features}
     scenario = load_scenario(path, name=name)
     return NASimEnv(scenario, **env_kwargs)
 
@@ -100,6 +146,10 @@ def generate(num_hosts,
              flat_actions=True,
              flat_obs=True,
              render_mode=None,
+             reuse_obs_buffer=False,
+             packed_obs=False,
+             defender_fully_obs=True,
+             obs_features=None,
              **params):
     """Construct Environment from an auto generated network.
 
@@ -120,6 +170,21 @@ def generate(num_hosts,
         will use a 2D observation space (default=True)
     render_mode : str, optional
             The render mode to use for the environment.
+    reuse_obs_buffer : bool, optional
+        if true then observations are written into a single buffer that is
+        overwritten by the next call to step or reset, so they must be
+        copied if they need to be kept (default=False)
+    packed_obs : bool, optional
+        if true then observations are the packed state key, a small uint8
+        array suited to tabular agents. Requires fully_obs=True and a
+        scenario without defender actions (default=False)
+    defender_fully_obs : bool, optional
+        if true then the defender observes every host, otherwise it only
+        observes the hosts that changed in the last step (default=True)
+    obs_features : dict, optional
+        map from agent name to the host features observed by that agent,
+        given as keyword arguments of :func:`HostVector.observation_mask`.
+        Agents not in the map observe every feature (default=None)
     params : dict, optional
         generator params (see :class:`ScenarioGenertor` for full list)
 
@@ -131,7 +196,11 @@ def generate(num_hosts,
     env_kwargs = {"fully_obs": fully_obs,
                   "flat_actions": flat_actions,
                   "flat_obs": flat_obs,
-                  "render_mode": render_mode}
+                  "render_mode": render_mode,
+                  "reuse_obs_buffer": reuse_obs_buffer,
+                  "packed_obs": packed_obs,
+                  "defender_fully_obs": defender_fully_obs,
+                  "obs_features": obs_features}
     scenario = generate_scenario(num_hosts, num_services, **params)
     return NASimEnv(scenario, **env_kwargs)
 
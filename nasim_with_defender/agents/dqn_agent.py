@@ -120,6 +120,7 @@ class DQNAgent:
                  hidden_sizes=[64, 64],
                  target_update_freq=1000,
                  verbose=True,
+                 replay=None,
                  **kwargs):
 
         # This DQN implementation only works for flat actions
@@ -174,10 +175,13 @@ class DQNAgent:
         self.optimizer = optim.Adam(self.dqn.parameters(), lr=self.lr)
         self.loss_fn = nn.SmoothL1Loss()
 
-        # replay setup
-        self.replay = ReplayMemory(replay_size,
-                                   self.obs_dim,
-                                   self.device)
+        # replay setup, replay can be given to share a memory between agents
+        # (e.g. see JointReplayMemory)
+        if replay is None:
+            replay = ReplayMemory(replay_size,
+                                  self.obs_dim,
+                                  self.device)
+        self.replay = replay
 
     def save(self, save_path):
         self.dqn.save_DQN(save_path)
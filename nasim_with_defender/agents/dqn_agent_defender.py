@@ -5,6 +5,7 @@ from gymnasium import error
 import numpy as np
 
 import nasim_with_defender
+from nasim_with_defender.envs.environment import DEFENDER
 
 try:
     import torch
@@ -95,6 +96,7 @@ class DQNAgent_Defender:
                  hidden_sizes=[64, 64],
                  target_update_freq=1000,
                  verbose=True,
+                 replay=None,
                  **kwargs):
 
         # This DQN implementation only works for flat actions
@@ -112,7 +114,7 @@ class DQNAgent_Defender:
         # environment setup
         self.env = env
 
-        self.num_actions = self.env.action_space.n
+        self.num_actions = self.env.defender_action_space.n
         self.obs_dim = self.env.observation_space.shape
 
         # logger setup
@@ -149,10 +151,13 @@ class DQNAgent_Defender:
         self.optimizer = optim.Adam(self.dqn.parameters(), lr=self.lr)
         self.loss_fn = nn.SmoothL1Loss()
 
-        # replay setup
-        self.replay = ReplayMemory(replay_size,
-                                   self.obs_dim,
-                                   self.device)
+        # replay setup, replay can be given to share a memory between agents
+        # (e.g. see JointReplayMemory)
+        if replay is None:
+            replay = ReplayMemory(replay_size,
+                                  self.obs_dim,
+                                  self.device)
+        self.replay = replay
 
     def save(self, save_path):
         self.dqn.save_DQN(save_path)
@@ -243,7 +248,8 @@ class DQNAgent_Defender:
             print(f"\tgoal = {goal}")
 
     def run_train_episode(self, step_limit):
-        o, _ = self.env.reset()
+        obs, _ = self.env.reset_joint()
+        o = obs[DEFENDER]
         done = False
         env_step_limit_reached = False
 
@@ -277,7 +283,8 @@ class DQNAgent_Defender:
         original_render_mode = env.render_mode
         env.render_mode = render_mode
 
-        o, _ = env.reset()
+        obs, _ = env.reset_joint()
+        o = obs[DEFENDER]
         done = False
         env_step_limit_reached = False
 
@@ -294,7 +301,8 @@ class DQNAgent_Defender:
 
         while not done and not env_step_limit_reached:
             a = self.get_egreedy_action(o, eval_epsilon)
-            next_o, r, done, env_step_limit_reached, _ = env.step(a)
+            next_o, r, done, env_step_limit_reached, _ = \
+                env.step_defender(a)
             o = next_o
             episode_return += r
             steps += 1
@@ -302,7 +310,8 @@ class DQNAgent_Defender:
                 print("\n" + line_break)
                 print(f"Step {steps}")
                 print(line_break)
-                print(f"Action Performed = {env.action_space.get_action(a)}")
+                d_action = env.defender_action_space.get_defender_action(a)
+                print(f"Action Performed = {d_action}")
                 env.render()
                 print(f"Reward = {r}")
                 print(f"Done = {done}")
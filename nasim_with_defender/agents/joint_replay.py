@@ -0,0 +1,260 @@
+"""A replay memory shared by the attacker and defender during co-training.
+
+Each observation is stored once in a circular frame store, and the
+transitions of each agent reference their observations by frame id, so
+agents that see the same observation at the same step share one frame
+instead of each storing it twice (as state and as next state).
+
+The trailing aux_size features of an observation (e.g. the auxiliary row with
+the result of the agents last action) may differ between agents without
+preventing them from sharing a frame, and are stored per agent alongside it.
+
+Frame ids increase monotonically and frame id i is kept in slot
+i % frame_capacity, so once a frame has been overwritten the transitions
+that reference it are no longer sampled.
+
+It uses pytorch 1.5+ (HINT: these dependencies can be installed by running
+pip install nasim_with_defender[dqn])
+"""
+from gymnasium import error
+import numpy as np
+
+try:
+    import torch
+except ImportError as e:
+    raise error.DependencyNotInstalled(
+        f"{e}. (HINT: you can install dqn_agent dependencies by running "
+        "'pip install nasim_with_defender[dqn]'.)"
+    )
+
+
+class JointReplayMemory:
+    """Replay memory for multiple agents with shared observation frames.
+
+    Attributes
+    ----------
+    capacity : int
+        max number of transitions stored for each agent
+    frame_capacity : int
+        max number of observation frames stored
+    agents : list[str]
+        names of the agents
+    num_frames : int
+        number of frames added so far, i.e. the id of the next frame
+    """
+
+    def __init__(self,
+                 capacity,
+                 s_dims,
+                 agents,
+                 aux_size=0,
+                 frame_capacity=None,
+                 device="cpu"):
+        """
+        Parameters
+        ----------
+        capacity : int
+            max number of transitions stored for each agent
+        s_dims : tuple
+            observation shape
+        agents : list[str]
+            names of the agents
+        aux_size : int, optional
+            number of trailing features of the flattened observation that
+            are stored per agent (default=0)
+        frame_capacity : int, optional
+            max number of observation frames stored. If None, enough frames
+            for capacity transitions of agents that share their frames, plus
+            a frame for each reset in episodes averaging at least four steps.
+            Should be increased if agents rarely share frames (default=None)
+        device : str or torch.device, optional
+            device sampled batches are moved to (default="cpu")
+        """
+        self.capacity = capacity
+        self.device = device
+        self.agents = list(agents)
+        self._agent_idx = {agent: i for i, agent in enumerate(self.agents)}
+        if frame_capacity is None:
+            frame_capacity = capacity + capacity // 4 + 1
+        self.frame_capacity = frame_capacity
+        self.s_dims = tuple(s_dims)
+        obs_size = int(np.prod(self.s_dims))
+        assert 0 <= aux_size <= obs_size
+        self._shared_size = obs_size - aux_size
+
+        num_agents = len(self.agents)
+        self.frame_buf = np.zeros(
+            (frame_capacity, self._shared_size), dtype=np.float32
+        )
+        self.aux_buf = np.zeros(
+            (num_agents, frame_capacity, aux_size), dtype=np.float32
+        )
+        self.num_frames = 0
+
+        self.s_id_buf = np.zeros((num_agents, capacity), dtype=np.int64)
+        self.a_buf = np.zeros((num_agents, capacity, 1), dtype=np.int64)
+        self.next_s_id_buf = np.zeros((num_agents, capacity), dtype=np.int64)
+        self.r_buf = np.zeros((num_agents, capacity), dtype=np.float32)
+        self.done_buf = np.zeros((num_agents, capacity), dtype=np.float32)
+        self.ptr = np.zeros(num_agents, dtype=np.int64)
+        self.size = np.zeros(num_agents, dtype=np.int64)
+
+    def add_frame(self, agent, o, reuse_last=False):
+        """Add the observation of an agent to the frame store.
+
+        Parameters
+        ----------
+        agent : str
+            the agent name
+        o : numpy.Array
+            the observation
+        reuse_last : bool, optional
+            whether to return the id of the last frame added, without adding
+            a new frame, if it holds o for this agent (default=False)
+
+        Returns
+        -------
+        int
+            the frame id of the observation
+        """
+        o = np.asarray(o).reshape(-1)
+        i = self._agent_idx[agent]
+        if reuse_last and self.num_frames > 0:
+            last_id = self.num_frames - 1
+            slot = last_id % self.frame_capacity
+            if np.array_equal(self.frame_buf[slot], o[:self._shared_size]) \
+               and np.array_equal(self.aux_buf[i, slot],
+                                  o[self._shared_size:]):
+                return last_id
+        frame_id = self._add_shared(o[:self._shared_size])
+        self.aux_buf[i, frame_id % self.frame_capacity] = \
+            o[self._shared_size:]
+        return frame_id
+
+    def add_frames(self, obs):
+        """Add the observations of agents from the same step, storing the
+        shared features of equal observations once.
+
+        Parameters
+        ----------
+        obs : dict
+            map from agent name to observation
+
+        Returns
+        -------
+        dict
+            map from agent name to the frame id of its observation
+        """
+        frame_ids = {}
+        added = []
+        for agent, o in obs.items():
+            o = np.asarray(o).reshape(-1)
+            shared = o[:self._shared_size]
+            for frame_id, other in added:
+                if np.array_equal(shared, other):
+                    break
+            else:
+                frame_id = self._add_shared(shared)
+                added.append((frame_id, shared))
+            slot = frame_id % self.frame_capacity
+            self.aux_buf[self._agent_idx[agent], slot] = \
+                o[self._shared_size:]
+            frame_ids[agent] = frame_id
+        return frame_ids
+
+    def _add_shared(self, shared):
+        self.frame_buf[self.num_frames % self.frame_capacity] = shared
+        self.num_frames += 1
+        return self.num_frames - 1
+
+    def store(self, agent, s_id, a, next_s_id, r, done):
+        """Store a transition of an agent, with observations given by the
+        frame ids returned by :func:`add_frame` or :func:`add_frames`.
+        """
+        i = self._agent_idx[agent]
+        ptr = self.ptr[i]
+        self.s_id_buf[i, ptr] = s_id
+        self.a_buf[i, ptr] = a
+        self.next_s_id_buf[i, ptr] = next_s_id
+        self.r_buf[i, ptr] = r
+        self.done_buf[i, ptr] = done
+        self.ptr[i] = (ptr + 1) % self.capacity
+        self.size[i] = min(self.size[i]+1, self.capacity)
+
+    def sample_batch(self, agent, batch_size):
+        """Sample a batch of transitions of an agent.
+
+        Only transitions whose frames are still in the frame store are
+        sampled.
+
+        Returns
+        -------
+        list[torch.Tensor]
+            the state, action, next state, reward and done batches, as with
+            :func:`ReplayMemory.sample_batch`
+        """
+        i = self._agent_idx[agent]
+        size = self.size[i]
+        min_frame_id = self.num_frames - self.frame_capacity
+        # transitions are stored in order, so if the oldest is valid they
+        # all are
+        oldest = self.ptr[i] if size == self.capacity else 0
+        if self.s_id_buf[i, oldest] >= min_frame_id:
+            sample_idxs = np.random.choice(size, batch_size)
+        else:
+            valid = np.flatnonzero(self.s_id_buf[i, :size] >= min_frame_id)
+            assert len(valid) > 0, \
+                f"No transitions of {agent} left in frame store"
+            sample_idxs = np.random.choice(valid, batch_size)
+
+        s_slots = self.s_id_buf[i, sample_idxs] % self.frame_capacity
+        next_s_slots = self.next_s_id_buf[i, sample_idxs] % self.frame_capacity
+        batch = [self._get_frames(i, s_slots),
+                 self.a_buf[i, sample_idxs],
+                 self._get_frames(i, next_s_slots),
+                 self.r_buf[i, sample_idxs],
+                 self.done_buf[i, sample_idxs]]
+        return [torch.from_numpy(buf).to(self.device) for buf in batch]
+
+    def _get_frames(self, agent_idx, slots):
+        frames = np.concatenate(
+            [self.frame_buf[slots], self.aux_buf[agent_idx, slots]], axis=1
+        )
+        return frames.reshape(len(slots), *self.s_dims)
+
+    def agent_memory(self, agent):
+        """Get the replay memory of a single agent, which can be used in place
+        of a :class:`ReplayMemory` by the DQN agents.
+        """
+        return AgentReplayMemory(self, agent)
+
+
+class AgentReplayMemory:
+    """The replay memory of one agent in a JointReplayMemory.
+
+    Has the same interface as :class:`ReplayMemory`.
+    """
+
+    def __init__(self, memory, agent):
+        assert agent in memory.agents
+        self.memory = memory
+        self.agent = agent
+
+    @property
+    def capacity(self):
+        return self.memory.capacity
+
+    @property
+    def size(self):
+        return int(self.memory.size[self.memory._agent_idx[self.agent]])
+
+    def store(self, s, a, next_s, r, done):
+        """Store a transition with observations, reusing the last frame for s
+        when it holds the previous transitions next state.
+        """
+        s_id = self.memory.add_frame(self.agent, s, reuse_last=True)
+        next_s_id = self.memory.add_frame(self.agent, next_s)
+        self.memory.store(self.agent, s_id, a, next_s_id, r, done)
+
+    def sample_batch(self, batch_size):
+        return self.memory.sample_batch(self.agent, batch_size)
@@ -1,2 +1,4 @@
 from nasim_with_defender.envs.gym_env import NASimGymEnv
 from nasim_with_defender.envs.environment import NASimEnv
+from nasim_with_defender.envs.parallel_env import NASimParallelEnv
+from nasim_with_defender.envs.scheduler import AgentScheduler
@@ -1,10 +1,26 @@
 import math
+from collections.abc import Mapping
 import numpy as np
 from gymnasium import spaces
 
+import nasim_with_defender.scenarios.utils as u
 from nasim_with_defender.envs.utils import AccessLevel
 
 
+# Action type codes used by ActionTable
+EXPLOIT = 0
+PRIVILEGE_ESCALATION = 1
+SERVICE_SCAN = 2
+OS_SCAN = 3
+SUBNET_SCAN = 4
+PROCESS_SCAN = 5
+# defender
+CHANGE_OS = 6
+CHANGE_FIREWALL = 7
+STOP_SERVICE = 8
+STOP_PROCESS = 9
+
+
 def load_action_list(scenario):
     action_list = []
     for address in scenario.address_space:
@@ -29,20 +45,17 @@ def load_action_list(scenario):
     return action_list
 
 def load_defender_action_list(scenario):        # defender
+    defender_action_classes = [
+        (u.CHANGE_OS, scenario.change, Change_Os),
+        (u.CHANGE_FIREWALL, scenario.change, Change_Firewall),
+        (u.STOP_SERVICE, scenario.stop, Stop_Service),
+        (u.STOP_PROC, scenario.stop, Stop_Process)
+    ]
     action_list = []
-    for address in scenario.defender:
-        action_list.append(
-            Change_Os(address, scenario.change_os_cost)
-        )
-        action_list.append(
-            Change_Firewall(address, scenario.chagne_firewall_cost)
-        )
-        action_list.append(
-            Stop_Service(address, scenario.stop_service_cost)
-        )
-        action_list.append(
-            Stop_Process(address, scenario.stop_processes_cost)
-        )
+    for address in scenario.address_space:
+        for d_name, d_defs, d_class in defender_action_classes:
+            if d_name in d_defs:
+                action_list.append(d_class(address, **d_defs[d_name]))
     return action_list
 
 class Action:
@@ -87,6 +100,9 @@ class Action:
     def is_noop(self):
         return isinstance(self, NoOp)
 
+    def is_defender(self):
+        return isinstance(self, Action_Defender)
+
     def __str__(self):
         return (f"{self.__class__.__name__}: "
                 f"target={self.target}, "
@@ -109,20 +125,21 @@ class Action:
             return False
         return self.req_access == other.req_access
 
-class Action_Defender:      # defender
+class Action_Defender(Action):      # defender
     def __init__(self,
                  name,
                  target,
                  cost,
                  prob=1.0,
                  req_access=AccessLevel.USER,
+                 access=AccessLevel.ROOT,
                  **kwargs):
-        assert 0 <= prob <= 1.0
-        self.name = name
-        self.target = target
-        self.cost = cost
-        self.prob = prob
-        self.req_access = req_access
+        super().__init__(name=name,
+                         target=target,
+                         cost=cost,
+                         prob=prob,
+                         req_access=req_access)
+        self.access = access
 
     def is_change_os(self):
         return isinstance(self, Change_Os)
@@ -136,27 +153,6 @@ class Action_Defender:      # defender
     def is_stop_service(self):
         return isinstance(self, Stop_Service)
 
-    def __str__(self):
-        return (f"{self.__class__.__name__}: "
-                f"target={self.target}, "
-                f"cost={self.cost:.2f}, "
-                f"prob={self.prob:.2f}, "
-                f"req_access={self.req_access}")
-
-    def __hash__(self):
-        return hash(self.__str__())
-
-    def __eq__(self, other):
-        if self is other:
-            return True
-        if not isinstance(other, type(self)):
-            return False
-        if self.target != other.target:
-            return False
-        if not (math.isclose(self.cost, other.cost)
-                and math.isclose(self.prob, other.prob)):
-            return False
-        return self.req_access == other.req_access
 
 class Exploit(Action):
     def __init__(self,
@@ -293,7 +289,7 @@ class NoOp(Action):
 
 
 #defender action
-class Change_Os:
+class Change_Os(Action_Defender):
     def __init__(self,
                  target,
                  cost,
@@ -302,11 +298,12 @@ class Change_Os:
                  **kwargs):
         super().__init__(name="change_os",
                          target=target,
-                         cost=0,
-                         prob=1.0,
-                         req_access=AccessLevel.NONE)
+                         cost=cost,
+                         prob=prob,
+                         req_access=req_access,
+                         **kwargs)
 
-class Change_Firewall:
+class Change_Firewall(Action_Defender):
     def __init__(self,
                  target,
                  cost,
@@ -315,34 +312,58 @@ class Change_Firewall:
                  **kwargs):
         super().__init__(name="change_firewall",
                          target=target,
-                         cost=0,
-                         prob=1.0,
-                         req_access=AccessLevel.NONE)
+                         cost=cost,
+                         prob=prob,
+                         req_access=req_access,
+                         **kwargs)
 
-class Stop_Service:
+class Stop_Service(Action_Defender):
     def __init__(self,
                  target,
                  cost,
                  prob=1.0,
                  req_access=AccessLevel.USER,
                  **kwargs):
-        super().__init__(name="stop_processes",
+        super().__init__(name="stop_service",
                          target=target,
-                         cost=0,
-                         prob=1.0,
-                         req_access=AccessLevel.NONE)
-class Stop_Process:
+                         cost=cost,
+                         prob=prob,
+                         req_access=req_access,
+                         **kwargs)
+
+class Stop_Process(Action_Defender):
     def __init__(self,
                  target,
                  cost,
                  prob=1.0,
                  req_access=AccessLevel.USER,
                  **kwargs):
-        super().__init__(name="stop_service",
+        super().__init__(name="stop_processes",
                          target=target,
-                         cost=0,
-                         prob=1.0,
-                         req_access=AccessLevel.NONE)
+                         cost=cost,
+                         prob=prob,
+                         req_access=req_access,
+                         **kwargs)
+
+class HostMaskMap(Mapping):
+    """A read-only map from host address to whether the host is in a mask """
+
+    def __init__(self, host_num_map, mask):
+        self.host_num_map = host_num_map
+        self.mask = mask
+
+    def __getitem__(self, host_addr):
+        return bool(self.mask[self.host_num_map[host_addr]])
+
+    def __iter__(self):
+        return iter(self.host_num_map)
+
+    def __len__(self):
+        return len(self.host_num_map)
+
+    def __repr__(self):
+        return repr(dict(self))
+
 
 class ActionResult:
     def __init__(self,
@@ -356,7 +377,10 @@ class ActionResult:
                  connection_error=False,
                  permission_error=False,
                  undefined_error=False,
-                 newly_discovered=None):
+                 newly_discovered=None,
+                 discovered_mask=None,
+                 newly_discovered_mask=None,
+                 host_num_map=None):
 
         self.success = success
         self.value = value
@@ -364,10 +388,18 @@ class ActionResult:
         self.os = {} if os is None else os
         self.processes = {} if processes is None else processes
         self.access = {} if access is None else access
+        self.discovered_mask = discovered_mask
+        self.newly_discovered_mask = newly_discovered_mask
+        if discovered is None and discovered_mask is not None:
+            discovered = HostMaskMap(host_num_map, discovered_mask)
         self.discovered = {} if discovered is None else discovered
         self.connection_error = connection_error
         self.permission_error = permission_error
         self.undefined_error = undefined_error
+        if newly_discovered is None and newly_discovered_mask is not None:
+            newly_discovered = HostMaskMap(
+                host_num_map, newly_discovered_mask
+            )
         if newly_discovered is not None:
             self.newly_discovered = newly_discovered
         else:
@@ -395,14 +427,71 @@ class ActionResult:
         return "\n".join(output)
 
 
+class ActionTable:
+    """A list of actions compiled into arrays, with one entry per action.
+
+    Attributes are type_code, target (host number), service, os and process
+    (indices into the scenario lists, -1 if not used by the action), prob,
+    cost, req_access and access (access level granted, or for defender
+    actions the access level the action is performed with).
+    """
+
+    type_codes = {
+        Exploit: EXPLOIT,
+        PrivilegeEscalation: PRIVILEGE_ESCALATION,
+        ServiceScan: SERVICE_SCAN,
+        OSScan: OS_SCAN,
+        SubnetScan: SUBNET_SCAN,
+        ProcessScan: PROCESS_SCAN,
+        Change_Os: CHANGE_OS,
+        Change_Firewall: CHANGE_FIREWALL,
+        Stop_Service: STOP_SERVICE,
+        Stop_Process: STOP_PROCESS
+    }
+
+    def __init__(self, scenario, actions):
+        num_actions = len(actions)
+        self.type_code = np.zeros(num_actions, dtype=np.int8)
+        self.target = np.zeros(num_actions, dtype=np.int64)
+        self.service = np.full(num_actions, -1, dtype=np.int64)
+        self.os = np.full(num_actions, -1, dtype=np.int64)
+        self.process = np.full(num_actions, -1, dtype=np.int64)
+        self.prob = np.zeros(num_actions, dtype=np.float64)
+        self.cost = np.zeros(num_actions, dtype=np.float32)
+        self.req_access = np.zeros(num_actions, dtype=np.float32)
+        self.access = np.zeros(num_actions, dtype=np.float32)
+
+        service_idx = {srv: i for i, srv in enumerate(scenario.services)}
+        os_idx = {os: i for i, os in enumerate(scenario.os)}
+        process_idx = {proc: i for i, proc in enumerate(scenario.processes)}
+        for a_idx, a in enumerate(actions):
+            self.type_code[a_idx] = self.type_codes[type(a)]
+            self.target[a_idx] = scenario.host_num_map[a.target]
+            self.prob[a_idx] = a.prob
+            self.cost[a_idx] = a.cost
+            self.req_access[a_idx] = a.req_access
+            if getattr(a, "service", None) is not None:
+                self.service[a_idx] = service_idx[a.service]
+            if getattr(a, "os", None) is not None:
+                self.os[a_idx] = os_idx[a.os]
+            if getattr(a, "process", None) is not None:
+                self.process[a_idx] = process_idx[a.process]
+            if getattr(a, "access", None) is not None:
+                self.access[a_idx] = a.access
+
+    def __len__(self):
+        return len(self.type_code)
+
+
 class FlatActionSpace(spaces.Discrete):
 
     def __init__(self, scenario):
         self.actions = load_action_list(scenario)
+        self.table = ActionTable(scenario, self.actions)
         super().__init__(len(self.actions))
 
     def get_action(self, action_idx):
-        assert isinstance(action_idx, int), \
+        assert isinstance(action_idx, (int, np.integer)), \
             ("When using flat action space, action must be an integer"
              f" or an Action object: {action_idx} is invalid")
         return self.actions[action_idx]
@@ -411,10 +500,11 @@ class FlatActionSpace(spaces.Discrete):
 class FlatDefenderActionSpace(spaces.Discrete):     # defender
     def __init__(self, scenario):
         self.defender_actions = load_defender_action_list(scenario)
+        self.table = ActionTable(scenario, self.defender_actions)
         super().__init__(len(self.defender_actions))
 
     def get_defender_action(self, action_idx):
-        assert isinstance(action_idx, int), \
+        assert isinstance(action_idx, (int, np.integer)), \
             ("When using flat action space, action must be an integer"
              f" or an Action object: {action_idx} is invalid")
         return self.defender_actions[action_idx]
@@ -6,11 +6,17 @@ import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
 
-from nasim_with_defender.envs.state import State
-from nasim_with_defender.envs.render import Viewer
+from nasim_with_defender.envs.state import State, ObservationView
+from nasim_with_defender.envs.state import FULL_VIEW, CHANGES_VIEW, ACTION_VIEW
 from nasim_with_defender.envs.network import Network
 from nasim_with_defender.envs.observation import Observation
-from nasim_with_defender.envs.action import Action, Action_Defender, FlatActionSpace, ParameterisedActionSpace
+from nasim_with_defender.envs.action_mask import ActionMask
+from nasim_with_defender.envs.action import Action, Action_Defender, FlatActionSpace, ParameterisedActionSpace, FlatDefenderActionSpace
+from nasim_with_defender.envs.action import ActionResult, NoOp
+
+# names of the agents in joint steps (see NASimEnv.step_joint)
+ATTACKER = "attacker"
+DEFENDER = "defender"
 
 
 class NASimEnv(gym.Env):
@@ -42,6 +48,9 @@ class NASimEnv(gym.Env):
         the current state of the environment
     last_obs : Observation
         the last observation that was generated by environment
+    last_defender_obs : Observation
+        the last defender observation that was generated by environment
+        (only set by joint and defender steps)
     steps : int
         the number of steps performed since last reset (this does not include
         generative steps)
@@ -55,13 +64,20 @@ class NASimEnv(gym.Env):
     observation_space = None
     current_state = None
     last_obs = None
+    last_defender_obs = None
+
+    possible_agents = [ATTACKER, DEFENDER]
 
     def __init__(self,
                  scenario,
                  fully_obs=False,
                  flat_actions=True,
                  flat_obs=True,
-                 render_mode=None):
+                 render_mode=None,
+                 reuse_obs_buffer=False,
+                 packed_obs=False,
+                 defender_fully_obs=True,
+                 obs_features=None):
         """
         Parameters
         ----------
@@ -78,6 +94,27 @@ class NASimEnv(gym.Env):
             observation space (default=True)
         render_mode : str, optional
             The render mode to use for the environment.
+        reuse_obs_buffer : bool, optional
+            If true then the environment writes every observation into the
+            same buffer, only updating the rows that changed, and returns a
+            view of it (so a flat observation is a reshape of the buffer
+            rather than a copy). Returned observations are then overwritten
+            by the next call to step or reset, so must be copied if they need
+            to be kept (default=False)
+        packed_obs : bool, optional
+            If true then observations are the packed state key (see
+            :func:`State.packed`), a small uint8 array that is suitable for
+            tabular agents. Requires fully_obs=True and a scenario without
+            defender actions, and flat_obs is ignored (default=False)
+        defender_fully_obs : bool, optional
+            If true then the defender observes every host, otherwise it only
+            observes the hosts that changed in the last step (default=True)
+        obs_features : dict, optional
+            map from agent name to the host features observed by that agent
+            in joint and defender steps, given as keyword arguments of
+            :func:`HostVector.observation_mask`, e.g.
+            ``{"defender": dict(address=True, compromised=True)}``. Agents
+            not in the map observe every feature (default=None)
         """
         self.name = scenario.name
         self.scenario = scenario
@@ -85,9 +122,39 @@ class NASimEnv(gym.Env):
         self.flat_actions = flat_actions
         self.flat_obs = flat_obs
         self.render_mode = render_mode
+        self.reuse_obs_buffer = reuse_obs_buffer
+        self.packed_obs = packed_obs
+        assert fully_obs or not packed_obs, \
+            "Packed observations are only supported in fully observable mode"
 
-        self.network = Network(scenario)
+        self.network = Network(scenario, self.np_random)
         self.current_state = State.generate_initial_state(self.network)
+        if reuse_obs_buffer:
+            self._obs_buffer = Observation(self.current_state.shape())
+        else:
+            self._obs_buffer = None
+        # per-agent observations used by joint and defender steps, which are
+        # always written into their own buffers
+        if obs_features is None:
+            obs_features = {}
+        self._views = {
+            ATTACKER: ObservationView(
+                self.current_state.shape(),
+                FULL_VIEW if fully_obs else ACTION_VIEW,
+                obs_features.get(ATTACKER)
+            ),
+            DEFENDER: ObservationView(
+                self.current_state.shape(),
+                FULL_VIEW if defender_fully_obs else CHANGES_VIEW,
+                obs_features.get(DEFENDER)
+            )
+        }
+        # every episode starts from a copy of the initial state and
+        # observation, unless host configurations are randomized
+        self._initial_state = self.current_state
+        self._initial_obs = self._initial_state.get_initial_observation(
+            self.fully_obs
+        )
         self._renderer = None
         self.reset()
 
@@ -95,15 +162,37 @@ class NASimEnv(gym.Env):
             self.action_space = FlatActionSpace(self.scenario)
         else:
             self.action_space = ParameterisedActionSpace(self.scenario)
+        self._action_mask = ActionMask(self.scenario, self.action_space)
 
-        if self.flat_obs:
-            obs_shape = self.last_obs.shape_flat()
+        if self.scenario.change or self.scenario.stop:
+            self.defender_action_space = FlatDefenderActionSpace(self.scenario)
+            self._defender_action_mask = ActionMask(
+                self.scenario, self.defender_action_space
+            )
         else:
-            obs_shape = self.last_obs.shape()
-        obs_low, obs_high = Observation.get_space_bounds(self.scenario)
-        self.observation_space = spaces.Box(
-            low=obs_low, high=obs_high, shape=obs_shape
-        )
+            self.defender_action_space = None
+            self._defender_action_mask = None
+        # packed observations only encode the dynamic host features, which
+        # do not cover the host and firewall changes of defender actions
+        assert not self.packed_obs or self.defender_action_space is None, \
+            "packed_obs is not supported for scenarios with defender actions"
+
+        if self.packed_obs:
+            self.observation_space = spaces.Box(
+                low=0,
+                high=255,
+                shape=(State.packed_size(len(self.network.hosts)), ),
+                dtype=np.uint8
+            )
+        else:
+            if self.flat_obs:
+                obs_shape = self.last_obs.shape_flat()
+            else:
+                obs_shape = self.last_obs.shape()
+            obs_low, obs_high = Observation.get_space_bounds(self.scenario)
+            self.observation_space = spaces.Box(
+                low=obs_low, high=obs_high, shape=obs_shape
+            )
 
         self.steps = 0
 
@@ -115,9 +204,19 @@ class NASimEnv(gym.Env):
         Parameters
         ----------
         seed : int, optional
-            the optional seed for the environments RNG
+            the optional seed for the environments RNG, which is used
+            for stochastic action outcomes
         options : dict, optional
-            optional environment options (does nothing in NASim at the moment)
+            optional reset options:
+
+            - randomize_hosts (bool): if True, the OS, services and
+              processes of every host are resampled uniformly at random for
+              this episode (see :func:`State.randomize_host_configs`),
+              otherwise hosts have their scenario configurations
+              (default=False)
+            - keep_sensitive_vulnerable (bool): if True, when randomizing
+              hosts every sensitive host is kept vulnerable to gaining root
+              access (default=True)
 
         Returns
         -------
@@ -127,64 +226,208 @@ class NASimEnv(gym.Env):
             auxiliary information regarding reset
         """
         super().reset(seed=seed, options=options)
+        if seed is not None:
+            # super().reset creates a new generator when seeded
+            self.network.seed(self.np_random)
         self.steps = 0
-        self.current_state = self.network.reset(self.current_state)
-        self.last_obs = self.current_state.get_initial_observation(
-            self.fully_obs
-        )
-
-        if self.flat_obs:
-            obs = self.last_obs.numpy_flat()
+        if options is not None and options.get("randomize_hosts", False):
+            self.current_state = self.network.reset(self._initial_state)
+            self.current_state.randomize_host_configs(
+                self.network,
+                self.np_random,
+                options.get("keep_sensitive_vulnerable", True)
+            )
+            self.last_obs = self.current_state.get_initial_observation(
+                self.fully_obs, obs=self._obs_buffer
+            )
         else:
-            obs = self.last_obs.numpy()
+            self.current_state = self._initial_state.copy()
+            self.last_obs = self._initial_obs.copy(out=self._obs_buffer)
+        self.last_defender_obs = None
+        for view in self._views.values():
+            view.last_state = None
+
+        return self._format_obs(self.current_state, self.last_obs), {}
+
+    def reset_joint(self, *, seed=None, options=None):
+        """Reset the environment and return the initial observation of each
+        agent, for use with :func:`step_joint`.
 
-        return obs, {}
+        Parameters are the same as for :func:`reset`.
+
+        Returns
+        -------
+        dict
+            initial observation of each agent
+        dict
+            auxiliary information of each agent
+        """
+        _, info = self.reset(seed=seed, options=options)
+        a_obs, d_obs = self.current_state.get_initial_observations(
+            [self._views[ATTACKER], self._views[DEFENDER]]
+        )
+        self.last_obs = a_obs
+        self.last_defender_obs = d_obs
+        obs = {
+            ATTACKER: self._format_obs(self.current_state, a_obs, True),
+            DEFENDER: self._format_obs(self.current_state, d_obs, True)
+        }
+        return obs, {ATTACKER: info, DEFENDER: {}}
 
     def step(self, action):
-        next_state, obs, reward, done, info = self.generative_step(
+        next_state, obs, reward, done, info = self._generative_step(
             self.current_state,
-            action
+            action,
+            obs=self._obs_buffer
         )
         self.current_state = next_state
         self.last_obs = obs
+        obs = self._format_obs(next_state, obs)
+        self.steps += 1
+        return obs, reward, done, self._step_limit_reached(), info
 
-        if self.flat_obs:
-            obs = obs.numpy_flat()
-        else:
-            obs = obs.numpy()
+    def step_joint(self, actions):
+        """Perform one round of attacker and defender actions.
 
-        self.steps += 1
+        Both actions are resolved against a single copy of the current
+        state, attacker first and then defender, after which the goal is
+        checked once and the observation of each agent is updated in a
+        single pass over the hosts that changed (see
+        :func:`State.get_observations`). Missing
+        actions are skipped (the attacker performs a NoOp and the defender
+        does nothing), so agents can act at different rates.
 
-        step_limit_reached = (
-            self.scenario.step_limit is not None
-            and self.steps >= self.scenario.step_limit
-        )
+        The return values follow the parallel API of PettingZoo, with each
+        being a dict keyed by agent name (see :class:`NASimParallelEnv`).
 
-        return obs, reward, done, step_limit_reached, info
+        Parameters
+        ----------
+        actions : dict
+            map from agent name ('attacker' and/or 'defender') to action,
+            either an index into the agents action space or an Action
 
-    def step_defender(self, action):
-        next_state, obs, reward, done, info = self.generative_step(
-            self.current_state,
-            action
+        Returns
+        -------
+        dict
+            observation of each agent
+        dict
+            reward of each agent. The attacker receives the value of its
+            action minus its cost, the defender receives minus the cost of
+            its action and minus the attackers value.
+        dict
+            whether each agent has terminated, i.e. the goal was reached
+        dict
+            whether each agent has been truncated, i.e. the step limit was
+            reached
+        dict
+            auxiliary information of each agent
+        """
+        a_action = actions.get(ATTACKER, None)
+        if a_action is None:
+            a_action = NoOp()
+        elif not isinstance(a_action, Action):
+            a_action = self.action_space.get_action(a_action)
+        next_state, a_result = self.network.perform_action(
+            self.current_state, a_action
         )
-        self.current_state = next_state
-        self.last_obs = obs
 
-        if self.flat_obs:
-            obs = obs.numpy_flat()
+        d_action = actions.get(DEFENDER, None)
+        d_cost = 0.0
+        if d_action is None:
+            d_result = ActionResult(True)
         else:
-            obs = obs.numpy()
+            d_action = self._get_defender_action(d_action)
+            d_result = self.network.perform_defender_action(
+                next_state, d_action
+            )
+            d_cost = d_action.cost
 
+        a_obs, d_obs = next_state.get_observations(
+            [self._views[ATTACKER], self._views[DEFENDER]],
+            [a_action, d_action],
+            [a_result, d_result]
+        )
+        self.current_state = next_state
+        self.last_obs = a_obs
+        self.last_defender_obs = d_obs
         self.steps += 1
 
-        step_limit_reached = (
+        done = self.goal_reached(next_state)
+        step_limit_reached = self._step_limit_reached()
+        obs = {
+            ATTACKER: self._format_obs(next_state, a_obs, True),
+            DEFENDER: self._format_obs(next_state, d_obs, True)
+        }
+        rewards = {
+            ATTACKER: a_result.value - a_action.cost,
+            DEFENDER: -d_cost - a_result.value
+        }
+        terminations = {ATTACKER: done, DEFENDER: done}
+        truncations = {
+            ATTACKER: step_limit_reached, DEFENDER: step_limit_reached
+        }
+        infos = {ATTACKER: a_result.info(), DEFENDER: d_result.info()}
+        return obs, rewards, terminations, truncations, infos
+
+    def _format_obs(self, state, obs, from_view=False):
+        if self.packed_obs:
+            return state.packed()
+        if self.flat_obs:
+            return obs.numpy_flat(copy=not self.reuse_obs_buffer)
+        if from_view and not self.reuse_obs_buffer:
+            # view buffers are overwritten by the next step
+            return obs.numpy().copy()
+        return obs.numpy()
+
+    def _step_limit_reached(self):
+        return (
             self.scenario.step_limit is not None
             and self.steps >= self.scenario.step_limit
         )
 
-        return obs, reward, done, step_limit_reached, info
+    def step_defender(self, action):
+        """Perform a defender action on its own.
+
+        The defender receives minus the cost of its action as reward (see
+        :func:`step_joint` for stepping the attacker and defender together).
+
+        Parameters
+        ----------
+        action : int or Action_Defender
+            index into the defender action space or an Action_Defender
+
+        Returns
+        -------
+        numpy.Array
+            the defender observation
+        float
+            the defender reward
+        bool
+            whether the goal was reached
+        bool
+            whether the step limit was reached
+        dict
+            auxiliary information about the action
+        """
+        action = self._get_defender_action(action)
+        next_state = self.current_state.copy()
+        action_obs = self.network.perform_defender_action(next_state, action)
+        obs, = next_state.get_observations(
+            [self._views[DEFENDER]], [action], [action_obs]
+        )
+        self.current_state = next_state
+        self.last_defender_obs = obs
+        obs = self._format_obs(next_state, obs, True)
+        reward = -action.cost
+        done = self.goal_reached(next_state)
+        info = action_obs.info()
+        self.steps += 1
+        return obs, reward, done, self._step_limit_reached(), info
 
     def generative_step(self, state, action):
+        return self._generative_step(state, action)
+
+    def _generative_step(self, state, action, obs=None):
         if not isinstance(action, Action):
             action = self.action_space.get_action(action)
 
@@ -192,12 +435,32 @@ class NASimEnv(gym.Env):
             state, action
         )
         obs = next_state.get_observation(
-            action, action_obs, self.fully_obs
+            action, action_obs, self.fully_obs, obs=obs
         )
         done = self.goal_reached(next_state)
         reward = action_obs.value - action.cost
         return next_state, obs, reward, done, action_obs.info()
 
+    def generative_defender_step(self, state, action):
+        return self._generative_defender_step(state, action)
+
+    def _generative_defender_step(self, state, action, obs=None):
+        action = self._get_defender_action(action)
+        next_state = state.copy()
+        action_obs = self.network.perform_defender_action(next_state, action)
+        obs = next_state.get_observation_defener(
+            action, action_obs, self.fully_obs, obs=obs
+        )
+        done = self.goal_reached(next_state)
+        return next_state, obs, -action.cost, done, action_obs.info()
+
+    def _get_defender_action(self, action):
+        if isinstance(action, Action_Defender):
+            return action
+        assert self.defender_action_space is not None, \
+            "Scenario does not define any defender actions"
+        return self.defender_action_space.get_defender_action(action)
+
     def generate_random_initial_state(self):
         return State.generate_random_initial_state(self.network)
 
@@ -219,11 +482,10 @@ class NASimEnv(gym.Env):
         if not isinstance(obs, Observation):
             obs = Observation.from_numpy(obs, self.current_state.shape())
 
-        if self._renderer is None:
-            self._renderer = Viewer(self.network)
+        renderer = self._get_renderer()
 
         if mode in ("human", "ansi"):
-            return self._renderer.render_readable(obs)
+            return renderer.render_readable(obs)
         else:
             raise NotImplementedError(
                 "Please choose correct render mode from :"
@@ -242,11 +504,10 @@ class NASimEnv(gym.Env):
                                      self.current_state.shape(),
                                      self.current_state.host_num_map)
 
-        if self._renderer is None:
-            self._renderer = Viewer(self.network)
+        renderer = self._get_renderer()
 
         if mode in ("human", "ansi"):
-            return self._renderer.render_readable_state(state)
+            return renderer.render_readable_state(state)
         else:
             raise NotImplementedError(
                 "Please choose correct render mode from : "
@@ -259,28 +520,32 @@ class NASimEnv(gym.Env):
         print(action)
 
     def render_episode(self, episode, width=7, height=7):
-        if self._renderer is None:
-            self._renderer = Viewer(self.network)
-        self._renderer.render_episode(episode, width, height)
+        renderer = self._get_renderer()
+        renderer.render_episode(episode, width, height)
 
     def render_network_graph(self, ax=None, show=False):
-        if self._renderer is None:
-            self._renderer = Viewer(self.network)
+        renderer = self._get_renderer()
         state = self.current_state
-        self._renderer.render_graph(state, ax, show)
+        renderer.render_graph(state, ax, show)
 
     def get_minimum_hops(self):
         return self.network.get_minimal_hops()
 
     def get_action_mask(self):
-        assert isinstance(self.action_space, FlatActionSpace), \
-            "Can only use action mask function when using flat action space"
-        mask = np.zeros(self.action_space.n, dtype=np.int64)
-        for a_idx in range(self.action_space.n):
-            action = self.action_space.get_action(a_idx)
-            if self.network.host_discovered(action.target):
-                mask[a_idx] = 1
-        return mask
+        """Get a mask for valid attacker actions in the current state.
+
+        Returns a read-only int8 vector for flat action spaces, or a tuple of
+        per parameter masks for parameterised action spaces. The mask is
+        only updated for hosts whose status changed since the last call
+        (see :class:`ActionMask`).
+        """
+        return self._action_mask.get_mask(self.current_state)
+
+    def get_defender_action_mask(self):
+        """Get a mask for valid defender actions in the current state """
+        assert self.defender_action_space is not None, \
+            "Scenario does not define any defender actions"
+        return self._defender_action_mask.get_mask(self.current_state)
 
     def get_score_upper_bound(self):
         max_reward = self.network.get_total_sensitive_host_value()
@@ -303,6 +568,14 @@ class NASimEnv(gym.Env):
         ]
         return "\n  ".join(output)
 
+    def _get_renderer(self):
+        if self._renderer is None:
+            # imported here so the rendering stack (tkinter, networkx,
+            # prettytable and matplotlib) is only loaded once it is used
+            from nasim_with_defender.envs.render import Viewer
+            self._renderer = Viewer(self.network)
+        return self._renderer
+
     def close(self):
         if self._renderer is not None:
             self._renderer.close()
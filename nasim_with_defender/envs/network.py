@@ -2,16 +2,21 @@ import numpy as np
 
 from nasim_with_defender.envs.action import ActionResult
 from nasim_with_defender.envs.utils import get_minimal_hops_to_goal, min_subnet_depth, AccessLevel
+from nasim_with_defender.envs.utils import UniformBuffer
+import nasim_with_defender.scenarios.utils as u
 
 # column in topology adjacency matrix that represents connection between
 # subnet and public
 INTERNET = 0
 
+# number of times to attempt to find a vulnerable host configuration
+VULNERABLE_CONFIG_RETRIES = 5
+
 
 class Network:
     """A computer network """
 
-    def __init__(self, scenario):
+    def __init__(self, scenario, np_random=None):
         self.hosts = scenario.hosts
         self.host_num_map = scenario.host_num_map
         self.subnets = scenario.subnets
@@ -21,21 +26,269 @@ class Network:
         self.address_space_bounds = scenario.address_space_bounds
         self.sensitive_addresses = scenario.sensitive_addresses
         self.sensitive_hosts = scenario.sensitive_hosts
+        self.services = scenario.services
+        self.os = scenario.os
+        self.processes = scenario.processes
+        self.service_idx_map = {
+            srv: srv_num for srv_num, srv in enumerate(self.services)
+        }
+        self._init_permissions(scenario)
+        self._init_vulnerabilities(scenario)
+        self._minimal_hops = None
+        self.seed(np_random)
+
+    def seed(self, np_random=None):
+        """Set the random number generator used for stochastic action
+        outcomes.
+
+        Parameters
+        ----------
+        np_random : numpy.random.Generator, optional
+            the random number generator to use, if None a new unseeded
+            generator is used (default=None)
+        """
+        if np_random is None:
+            np_random = np.random.default_rng()
+        self.np_random = np_random
+        self._uniforms = UniformBuffer(np_random)
+
+    def _init_permissions(self, scenario):
+        """Set topology and firewall arrays of network (see :func:`compile`)
+        """
+        for attr, array in self.compile(scenario).items():
+            setattr(self, attr, array)
+
+    @classmethod
+    def compile(cls, scenario):
+        """Precompute topology and firewall rules as boolean arrays.
+
+        The arrays are only computed once per scenario and are stored in
+        ``scenario.compiled``, so they are shared by every network of the
+        scenario (and so are read-only) and are included when the scenario
+        is cached (see :mod:`nasim_with_defender.scenarios.cache`).
+
+        Parameters
+        ----------
+        scenario : Scenario
+            the scenario
+
+        Returns
+        -------
+        dict
+            mapping from array name to array:
+
+            - host_subnets: (num_hosts, ) subnet of each host, by host number
+            - host_public: (num_hosts, ) whether host is in a public subnet
+            - host_topology: (num_hosts, num_subnets) whether subnet of host is
+              connected to each subnet
+            - subnet_hosts: (num_subnets, num_hosts) whether each subnet is
+              connected to subnet of host, i.e. the hosts discovered by a
+              subnet scan from or made reachable by compromising a host in
+              the subnet
+            - subnet_permissions: (num_subnets, num_subnets, num_services)
+              whether subnet firewalls permit traffic for service from src to
+              dest subnet (traffic within a subnet is always permitted)
+            - host_permissions: (num_hosts, num_subnets, num_services) subnet
+              permissions of the subnet of each host, i.e. for sources
+            - host_firewall_idx: (num_hosts, ) index of host in
+              host_firewall_masks or -1 if host firewall permits all traffic
+            - host_firewall_masks: (num_restricted_hosts, num_hosts,
+              num_services) whether host firewall permits traffic for service
+              from each source host
+        """
+        compiled = scenario.compiled.get("network")
+        if compiled is None:
+            compiled = cls._compile_permissions(scenario)
+            for array in compiled.values():
+                array.flags.writeable = False
+            scenario.compiled["network"] = compiled
+        return compiled
+
+    @staticmethod
+    def _compile_permissions(scenario):
+        num_hosts = len(scenario.host_num_map)
+        num_subnets = len(scenario.subnets)
+        num_services = len(scenario.services)
+
+        host_subnets = np.zeros(num_hosts, dtype=np.int64)
+        for addr, host_num in scenario.host_num_map.items():
+            host_subnets[host_num] = addr[0]
+
+        topology = np.asarray(scenario.topology) == 1
+        host_public = topology[host_subnets, INTERNET]
+        host_topology = topology[host_subnets]
+        subnet_hosts = topology[:, host_subnets]
+
+        subnet_permissions = np.zeros(
+            (num_subnets, num_subnets, num_services), dtype=bool
+        )
+        for src in range(num_subnets):
+            subnet_permissions[src, src] = True
+            for dest in range(num_subnets):
+                if src == dest or not topology[src, dest]:
+                    continue
+                allowed = scenario.firewall[(src, dest)]
+                for srv_num, srv in enumerate(scenario.services):
+                    subnet_permissions[src, dest, srv_num] = \
+                        srv in allowed
+        host_permissions = subnet_permissions[host_subnets]
+
+        host_firewall_idx = np.full(num_hosts, -1, dtype=np.int64)
+        host_firewall_masks = []
+        for dest_addr, dest_host in scenario.hosts.items():
+            mask = np.ones((num_hosts, num_services), dtype=bool)
+            for src_addr, denied in dest_host.firewall.items():
+                if src_addr not in scenario.host_num_map:
+                    continue
+                src_num = scenario.host_num_map[src_addr]
+                for srv_num, srv in enumerate(scenario.services):
+                    mask[src_num, srv_num] = srv not in denied
+            if not mask.all():
+                dest_num = scenario.host_num_map[dest_addr]
+                host_firewall_idx[dest_num] = len(host_firewall_masks)
+                host_firewall_masks.append(mask)
+        firewall_masks = np.zeros(
+            (len(host_firewall_masks), num_hosts, num_services), dtype=bool
+        )
+        for i, mask in enumerate(host_firewall_masks):
+            firewall_masks[i] = mask
+
+        return {
+            "host_subnets": host_subnets,
+            "host_public": host_public,
+            "host_topology": host_topology,
+            "subnet_hosts": subnet_hosts,
+            "subnet_permissions": subnet_permissions,
+            "host_permissions": host_permissions,
+            "host_firewall_idx": host_firewall_idx,
+            "host_firewall_masks": firewall_masks
+        }
+
+    def _init_vulnerabilities(self, scenario):
+        """Set arrays describing the host configurations each exploit and
+        privilege escalation requires.
+
+        Host configurations are given as the OS, services and processes
+        features of the host vector, in that order (see
+        :class:`HostVector`), and each array stores the configuration
+        column required, or -1 for exploits and privescs that work on any
+        OS.
+        """
+        os_cols = {os: i for i, os in enumerate(scenario.os)}
+        os_cols[None] = -1
+        srv_start = len(scenario.os)
+        proc_start = srv_start + len(scenario.services)
+        srv_cols = {
+            srv: srv_start + i for i, srv in enumerate(scenario.services)
+        }
+        proc_cols = {
+            proc: proc_start + i for i, proc in enumerate(scenario.processes)
+        }
+
+        e_defs = list(scenario.exploits.values())
+        self.exploit_service_cols = np.array(
+            [srv_cols[e[u.EXPLOIT_SERVICE]] for e in e_defs], dtype=np.int64
+        )
+        self.exploit_os_cols = np.array(
+            [os_cols[e[u.EXPLOIT_OS]] for e in e_defs], dtype=np.int64
+        )
+        self.exploit_access = np.array(
+            [e[u.EXPLOIT_ACCESS] for e in e_defs], dtype=np.int64
+        )
+        self.root_exploits = self.exploit_access >= AccessLevel.ROOT
+
+        pe_defs = list(scenario.privescs.values())
+        self.privesc_process_cols = np.array(
+            [proc_cols[pe[u.PRIVESC_PROCESS]] for pe in pe_defs],
+            dtype=np.int64
+        )
+        self.privesc_os_cols = np.array(
+            [os_cols[pe[u.PRIVESC_OS]] for pe in pe_defs], dtype=np.int64
+        )
+        self.num_os = len(scenario.os)
+        self.sensitive_host_nums = np.array(
+            [scenario.host_num_map[a] for a in self.sensitive_addresses],
+            dtype=np.int64
+        )
+
+    def root_vulnerable_hosts(self, host_configs):
+        """Get whether each host configuration is vulnerable to an exploit
+        that gives root access, or to any exploit and a privilege escalation.
+
+        Parameters
+        ----------
+        host_configs : numpy.Array
+            (num_hosts, num_os + num_services + num_processes) array of host
+            OS, services and processes features
+
+        Returns
+        -------
+        numpy.Array
+            bool array of whether each host configuration is vulnerable
+        """
+        host_os = host_configs[:, :self.num_os].argmax(axis=1)[:, np.newaxis]
+        exploit_vuln = (host_configs[:, self.exploit_service_cols] > 0) & (
+            (self.exploit_os_cols < 0) | (self.exploit_os_cols == host_os)
+        )
+        privesc_vuln = (host_configs[:, self.privesc_process_cols] > 0) & (
+            (self.privesc_os_cols < 0) | (self.privesc_os_cols == host_os)
+        )
+        return (exploit_vuln & self.root_exploits).any(axis=1) \
+            | (exploit_vuln.any(axis=1) & privesc_vuln.any(axis=1))
+
+    def make_root_vulnerable(self, host_config, np_random):
+        """Update a host configuration in place so it is vulnerable to an
+        exploit that gives root access, or to an exploit and a privilege
+        escalation (see :func:`root_vulnerable_hosts`).
+
+        An exploit is chosen at random and the host OS and service updated
+        to match it, and, if needed, a privilege escalation that matches the
+        host OS is chosen and its process added.
+
+        Parameters
+        ----------
+        host_config : numpy.Array
+            host OS, services and processes features
+        np_random : numpy.random.Generator
+            random number generator
+        """
+        for _ in range(VULNERABLE_CONFIG_RETRIES):
+            e = np_random.integers(len(self.exploit_service_cols))
+            host_config[self.exploit_service_cols[e]] = 1
+            if self.exploit_os_cols[e] >= 0:
+                host_config[:self.num_os] = 0
+                host_config[self.exploit_os_cols[e]] = 1
+            if self.root_exploits[e]:
+                return
+            host_os = host_config[:self.num_os].argmax()
+            valid_pe = np.flatnonzero(
+                (self.privesc_os_cols < 0) | (self.privesc_os_cols == host_os)
+            )
+            if len(valid_pe) > 0:
+                pe = valid_pe[np_random.integers(len(valid_pe))]
+                host_config[self.privesc_process_cols[pe]] = 1
+                return
+
+        raise AssertionError(
+            f"After {VULNERABLE_CONFIG_RETRIES} attempts, unable to find"
+            " vulnerable host configuration, scenario may need more"
+            " privilege escalation actions"
+        )
 
     def reset(self, state):
         """Reset the network state to initial state """
         next_state = state.copy()
-        for host_addr in self.address_space:
-            host = next_state.get_host(host_addr)
-            host.compromised = False
-            host.access = AccessLevel.NONE
-            host.reachable = self.subnet_public(host_addr[0])
-            host.discovered = host.reachable
+        next_state.reset_dynamic_features(self.host_public)
         return next_state
 
     def perform_action(self, state, action):
         """Perform the given Action against the network.
 
+        Actions are dispatched on their methods (e.g. is_exploit()) rather
+        than through the compiled :class:`ActionTable` arrays, since a single
+        step handles one Action object that may not come from the action
+        space.
+
         Arguments
         ---------
         state : State
@@ -59,6 +312,11 @@ class Network:
         if action.is_noop():
             return next_state, ActionResult(True)
 
+        if action.is_defender():
+            return next_state, self.perform_defender_action(
+                next_state, action
+            )
+
         if not state.host_reachable(action.target) \
            or not state.host_discovered(action.target):
             result = ActionResult(False, 0.0, connection_error=True)
@@ -84,7 +342,7 @@ class Network:
         if action.is_exploit() and host_compromised:
             # host already compromised so exploits don't fail due to randomness
             pass
-        elif np.random.rand() > action.prob:
+        elif self._uniforms.random() > action.prob:
             return next_state, ActionResult(False, 0.0, undefined_error=True)
 
         if action.is_subnet_scan():
@@ -96,6 +354,111 @@ class Network:
         self._update(next_state, action, action_obs)
         return next_state, action_obs
 
+    def perform_defender_action(self, state, action):
+        """Perform the given defender Action on the network.
+
+        Unlike :func:`perform_action` the state is updated in place, so
+        the caller is responsible for copying it first. This is so that the
+        attacker and defender actions of a joint step can be applied to the
+        same copy of the state (see :func:`NASimEnv.step_joint`).
+
+        Defender actions change the target host's configuration or its
+        subnet's firewall:
+
+        - change OS: the host OS is changed to a different OS chosen
+          uniformly at random
+        - stop service/process: a service/process running on host, chosen
+          uniformly at random, is stopped
+        - change firewall: traffic for every service running on host is
+          denied into the host's subnet from all other subnets
+
+        Only the host row and firewall permissions affected are written.
+
+        Arguments
+        ---------
+        state : State
+            the state to update
+        action : Action_Defender
+            the defender action to perform
+
+        Returns
+        -------
+        ActionResult
+            the result from the action
+        """
+        tgt_subnet, tgt_id = action.target
+        assert 0 < tgt_subnet < len(self.subnets)
+        assert tgt_id <= self.subnets[tgt_subnet]
+
+        if self._uniforms.random() > action.prob:
+            return ActionResult(False, 0.0, undefined_error=True)
+
+        host_idx = self.host_num_map[action.target]
+        config = state.get_host_config(host_idx)
+        srv_start = self.num_os
+        proc_start = srv_start + len(self.services)
+        if action.is_change_os():
+            return self._change_host_os(state, host_idx, config)
+        if action.is_stop_service():
+            srv_nums = np.flatnonzero(config[srv_start:proc_start])
+            if len(srv_nums) == 0:
+                return ActionResult(False, 0.0)
+            srv_num = srv_nums[int(self._uniforms.random() * len(srv_nums))]
+            state.stop_host_service(host_idx, srv_num)
+            return ActionResult(
+                True, 0.0, services={self.services[srv_num]: False}
+            )
+        if action.is_stop_process():
+            proc_nums = np.flatnonzero(config[proc_start:])
+            if len(proc_nums) == 0:
+                return ActionResult(False, 0.0)
+            proc_num = proc_nums[
+                int(self._uniforms.random() * len(proc_nums))
+            ]
+            state.stop_host_process(host_idx, proc_num)
+            return ActionResult(
+                True, 0.0, processes={self.processes[proc_num]: False}
+            )
+        if action.is_change_firewall():
+            srv_nums = np.flatnonzero(config[srv_start:proc_start])
+            self._deny_subnet_traffic(state, tgt_subnet, srv_nums)
+            return ActionResult(True, 0.0)
+        raise NotImplementedError(
+            f"Defender Action {action} not implemented"
+        )
+
+    def _change_host_os(self, state, host_idx, config):
+        if self.num_os < 2:
+            return ActionResult(False, 0.0)
+        os_num = config[:self.num_os].argmax()
+        offset = 1 + int(self._uniforms.random() * (self.num_os - 1))
+        new_os_num = (os_num + offset) % self.num_os
+        state.set_host_os(host_idx, new_os_num)
+        return ActionResult(True, 0.0, os={self.os[new_os_num]: True})
+
+    def _deny_subnet_traffic(self, state, dest_subnet, srv_nums):
+        """Deny traffic into subnet for services from every other subnet,
+        leaving the state's permissions shared if nothing changes
+        """
+        # traffic sources are hosts, so the internet is never a source
+        src_mask = np.ones(len(self.topology), dtype=bool)
+        src_mask[[INTERNET, dest_subnet]] = False
+        permissions = state.get_subnet_permissions(self.subnet_permissions)
+        if not permissions[src_mask, dest_subnet][:, srv_nums].any():
+            return
+        state.deny_subnet_traffic(
+            self.subnet_permissions, dest_subnet, src_mask, srv_nums
+        )
+
+    def _hosts_permitted(self, state, dest_subnet, srv_num):
+        """Get boolean array, by host number, of whether the subnet firewalls
+        of state permit traffic for service from each host to subnet
+        """
+        permissions = state.get_subnet_permissions(self.subnet_permissions)
+        if permissions is self.subnet_permissions:
+            return self.host_permissions[:, dest_subnet, srv_num]
+        return permissions[self.host_subnets, dest_subnet, srv_num]
+
     def _perform_subnet_scan(self, next_state, action):
         if not next_state.host_compromised(action.target):
             result = ActionResult(False, 0.0, connection_error=True)
@@ -105,26 +468,20 @@ class Network:
             result = ActionResult(False, 0.0, permission_error=True)
             return next_state, result
 
-        discovered = {}
-        newly_discovered = {}
-        discovery_reward = 0
-        target_subnet = action.target[0]
-        for h_addr in self.address_space:
-            newly_discovered[h_addr] = False
-            discovered[h_addr] = False
-            if self.subnets_connected(target_subnet, h_addr[0]):
-                host = next_state.get_host(h_addr)
-                discovered[h_addr] = True
-                if not host.discovered:
-                    newly_discovered[h_addr] = True
-                    host.discovered = True
-                    discovery_reward += host.discovery_value
+        discovered_mask = self.subnet_hosts[action.target[0]]
+        newly_discovered_mask = discovered_mask \
+            & ~next_state.discovered_mask()
+        discovery_reward = next_state.discovery_values()[
+            newly_discovered_mask
+        ].sum()
+        next_state.set_hosts_discovered(newly_discovered_mask)
 
         obs = ActionResult(
             True,
             discovery_reward,
-            discovered=discovered,
-            newly_discovered=newly_discovered
+            discovered_mask=discovered_mask,
+            newly_discovered_mask=newly_discovered_mask,
+            host_num_map=self.host_num_map
         )
         return next_state, obs
 
@@ -136,12 +493,7 @@ class Network:
         """Updates the reachable status of hosts on network, based on current
         state and newly exploited host
         """
-        comp_subnet = compromised_addr[0]
-        for addr in self.address_space:
-            if state.host_reachable(addr):
-                continue
-            if self.subnets_connected(comp_subnet, addr[0]):
-                state.set_host_reachable(addr)
+        state.set_hosts_reachable(self.subnet_hosts[compromised_addr[0]])
 
     def get_sensitive_hosts(self):
         return self.sensitive_addresses
@@ -156,9 +508,8 @@ class Network:
         if src_subnet == dest_subnet:
             # in same subnet so permitted
             return True
-        if not self.subnets_connected(src_subnet, dest_subnet):
-            return False
-        return service in self.firewall[(src_subnet, dest_subnet)]
+        srv_num = self.service_idx_map[service]
+        return bool(self.subnet_permissions[src_subnet, dest_subnet, srv_num])
 
     def host_traffic_permitted(self, src_addr, dest_addr, service):
         dest_host = self.hosts[dest_addr]
@@ -166,40 +517,31 @@ class Network:
 
     def has_required_remote_permission(self, state, action):
         """Checks attacker has necessary permissions for remote action """
-        if self.subnet_public(action.target[0]):
+        tgt_subnet = action.target[0]
+        if self.subnet_public(tgt_subnet):
             return True
 
-        for src_addr in self.address_space:
-            if not state.host_compromised(src_addr):
-                continue
-            if action.is_scan() and \
-               not self.subnets_connected(src_addr[0], action.target[0]):
-                continue
-            if action.is_exploit() and \
-               not self.subnet_traffic_permitted(
-                   src_addr[0], action.target[0], action.service
-               ):
-                continue
-            if state.host_has_access(src_addr, action.req_access):
-                return True
-        return False
+        src_mask = state.compromised_mask() \
+            & (state.access_levels() >= action.req_access)
+        if action.is_scan():
+            src_mask &= self.host_topology[:, tgt_subnet]
+        if action.is_exploit():
+            srv_num = self.service_idx_map[action.service]
+            src_mask &= self._hosts_permitted(state, tgt_subnet, srv_num)
+        return bool(src_mask.any())
 
     def traffic_permitted(self, state, host_addr, service):
         """Checks whether the subnet and host firewalls permits traffic to a
         given host and service, based on current set of compromised hosts on
         network.
         """
-        for src_addr in self.address_space:
-            if not state.host_compromised(src_addr) and \
-               not self.subnet_public(src_addr[0]):
-                continue
-            if not self.subnet_traffic_permitted(
-                    src_addr[0], host_addr[0], service
-            ):
-                continue
-            if self.host_traffic_permitted(src_addr, host_addr, service):
-                return True
-        return False
+        srv_num = self.service_idx_map[service]
+        src_mask = state.compromised_mask() | self.host_public
+        src_mask &= self._hosts_permitted(state, host_addr[0], srv_num)
+        fw_idx = self.host_firewall_idx[self.host_num_map[host_addr]]
+        if fw_idx >= 0:
+            src_mask &= self.host_firewall_masks[fw_idx, :, srv_num]
+        return bool(src_mask.any())
 
     def subnet_public(self, subnet):
         return self.topology[subnet][INTERNET] == 1
@@ -226,9 +568,11 @@ class Network:
         return total
 
     def get_minimal_hops(self):
-        return get_minimal_hops_to_goal(
-            self.topology, self.sensitive_addresses
-        )
+        if self._minimal_hops is None:
+            self._minimal_hops = get_minimal_hops_to_goal(
+                self.topology, self.sensitive_addresses
+            )
+        return self._minimal_hops
 
     def get_subnet_depths(self):
         return min_subnet_depth(self.topology)
@@ -0,0 +1,74 @@
+from nasim_with_defender.envs.environment import NASimEnv, DEFENDER
+
+
+class NASimParallelEnv:
+    """A wrapper around the NASimEnv with the parallel multi-agent API of
+    PettingZoo, where the attacker and defender act simultaneously each
+    step (see NASimEnv.step_joint).
+
+    PettingZoo is not required, the wrapper only follows its interface.
+
+    Attributes
+    ----------
+    env : NASimEnv
+        the wrapped environment
+    possible_agents : list[str]
+        names of all agents
+    agents : list[str]
+        names of agents that are still active in the current episode
+    """
+
+    metadata = {"render_modes": ["human", "ansi"],
+                "name": "nasim_with_defender_v0"}
+
+    def __init__(self, env):
+        """
+        Parameters
+        ----------
+        env : NASimEnv
+            the environment to wrap, its scenario must define defender
+            actions
+        """
+        assert isinstance(env, NASimEnv)
+        assert env.defender_action_space is not None, \
+            "Scenario does not define any defender actions"
+        self.env = env
+        self.possible_agents = list(env.possible_agents)
+        self.agents = []
+        self.render_mode = env.render_mode
+
+    @property
+    def num_agents(self):
+        return len(self.agents)
+
+    @property
+    def max_num_agents(self):
+        return len(self.possible_agents)
+
+    def observation_space(self, agent):
+        assert agent in self.possible_agents
+        return self.env.observation_space
+
+    def action_space(self, agent):
+        assert agent in self.possible_agents
+        if agent == DEFENDER:
+            return self.env.defender_action_space
+        return self.env.action_space
+
+    def reset(self, seed=None, options=None):
+        self.agents = list(self.possible_agents)
+        return self.env.reset_joint(seed=seed, options=options)
+
+    def step(self, actions):
+        assert self.agents, "Episode is over, reset must be called first"
+        obs, rewards, terminations, truncations, infos = \
+            self.env.step_joint(actions)
+        if any(terminations.values()) or any(truncations.values()):
+            self.agents = []
+        return obs, rewards, terminations, truncations, infos
+
+    def render(self):
+        return self.env.render()
+
+    def close(self):
+        self.env.close()
@@ -0,0 +1,233 @@
+"""A scheduler for agents acting at different rates in the defender
+environment.
+
+Time is measured in ticks. Each agent has a period, the minimum number of
+ticks between its decisions, and a time cost for its actions, the number of
+ticks an action takes to complete. An action submitted at tick t with time
+cost c is applied at tick t + c - 1, and the agent can next act at tick
+t + max(period, c). So with all periods and time costs equal to 1 the
+attacker and defender act every tick, as with :func:`NASimEnv.step_joint`,
+while a defender with period k acts once every k attacker actions.
+
+All actions that are due at a tick are applied together in a single joint
+transition of the environment, and ticks where no action is due are skipped
+without performing a transition, so the number of transitions grows with
+the number of scheduled actions rather than the number of ticks.
+"""
+from nasim_with_defender.envs.environment import NASimEnv
+
+
+class AgentScheduler:
+    """Schedules the actions of the agents of a NASimEnv.
+
+    Follows the parallel API of PettingZoo (see :class:`NASimParallelEnv`),
+    except that only the agents that are due to act next are included in
+    the observations returned by :func:`reset` and :func:`step`. Each agent
+    receives the sum of its rewards from every transition since it last
+    acted.
+
+    Attributes
+    ----------
+    env : NASimEnv
+        the scheduled environment
+    possible_agents : list[str]
+        names of all agents
+    agents : list[str]
+        names of agents that are still active in the current episode
+    periods : dict
+        minimum number of ticks between decisions of each agent
+    time_costs : dict
+        time cost in ticks of each agents actions, either an int or a
+        function from action to int
+    max_ticks : int
+        number of ticks after which episodes are truncated, or None
+    tick : int
+        the current tick
+    """
+
+    def __init__(self, env, periods=None, time_costs=None, max_ticks=None):
+        """
+        Parameters
+        ----------
+        env : NASimEnv
+            the environment to schedule
+        periods : dict, optional
+            map from agent name to minimum number of ticks between its
+            decisions. Agents not in the map act every tick (default=None)
+        time_costs : dict, optional
+            map from agent name to the time cost of its actions in ticks,
+            either an int or a function from action to int. Agents not in
+            the map have actions that take one tick (default=None)
+        max_ticks : int, optional
+            number of ticks after which episodes are truncated. If None the
+            scenario step limit is used (default=None)
+        """
+        assert isinstance(env, NASimEnv)
+        self.env = env
+        self.possible_agents = list(env.possible_agents)
+        self.agents = []
+        self.periods = {agent: 1 for agent in self.possible_agents}
+        if periods is not None:
+            self.periods.update(periods)
+        self.time_costs = {agent: 1 for agent in self.possible_agents}
+        if time_costs is not None:
+            self.time_costs.update(time_costs)
+        for agent in self.possible_agents:
+            assert self.periods[agent] >= 1, \
+                f"Period of {agent} must be at least one tick"
+        if max_ticks is None:
+            max_ticks = env.scenario.step_limit
+        self.max_ticks = max_ticks
+        self.tick = 0
+        # agent -> (tick action is applied, action)
+        self._pending = {}
+        # agent -> tick agent can next act, once its pending action applied
+        self._ready_tick = {}
+        self._rewards = {}
+        self._obs = {}
+        self._infos = {}
+        self._terminated = False
+
+    def reset(self, seed=None, options=None):
+        """Reset the environment and scheduler, every agent is due to act.
+
+        Returns
+        -------
+        dict
+            initial observation of each agent
+        dict
+            auxiliary information of each agent
+        """
+        self._obs, self._infos = self.env.reset_joint(
+            seed=seed, options=options
+        )
+        self.agents = list(self.possible_agents)
+        self.tick = 0
+        self._pending = {}
+        self._ready_tick = {agent: 0 for agent in self.agents}
+        self._rewards = {agent: 0.0 for agent in self.agents}
+        self._terminated = False
+        return dict(self._obs), dict(self._infos)
+
+    def ready_agents(self):
+        """Get the agents that are due to act at the current tick """
+        return [
+            agent for agent in self.agents
+            if agent not in self._pending
+            and self._ready_tick[agent] <= self.tick
+        ]
+
+    def submit(self, agent, action):
+        """Queue an action for an agent that is due to act.
+
+        Parameters
+        ----------
+        agent : str
+            the agent name
+        action : int or Action
+            the action, as accepted by :func:`NASimEnv.step_joint`
+        """
+        assert agent in self.ready_agents(), \
+            f"Agent {agent} is not due to act at tick {self.tick}"
+        time_cost = self.time_costs[agent]
+        if callable(time_cost):
+            time_cost = time_cost(action)
+        assert time_cost >= 1, "Actions must take at least one tick"
+        self._pending[agent] = (self.tick + time_cost - 1, action)
+        self._ready_tick[agent] = self.tick + max(
+            self.periods[agent], time_cost
+        )
+
+    def step(self, actions):
+        """Queue the actions of the agents that are due to act, and advance
+        until an agent is next due to act or the episode ends.
+
+        Agents that are due to act but have no action in actions pass, and
+        are next due to act after their period.
+
+        Parameters
+        ----------
+        actions : dict
+            map from agent name to action
+
+        Returns
+        -------
+        dict
+            observation of each agent that is due to act
+        dict
+            reward of each agent that is due to act, summed over every
+            transition since it last acted
+        dict
+            whether each agent that is due to act has terminated
+        dict
+            whether each agent that is due to act has been truncated
+        dict
+            auxiliary information of each agent that is due to act, from
+            the last transition
+        """
+        assert self.agents, "Episode is over, reset must be called first"
+        for agent in self.ready_agents():
+            if actions.get(agent, None) is None:
+                self._ready_tick[agent] = self.tick + self.periods[agent]
+            else:
+                self.submit(agent, actions[agent])
+
+        truncated = False
+        ready = self.ready_agents()
+        while not ready and not self._terminated and not truncated:
+            self._advance()
+            truncated = (
+                self.max_ticks is not None and self.tick >= self.max_ticks
+            )
+            ready = self.ready_agents()
+
+        if self._terminated or truncated:
+            ready = self.agents
+            self.agents = []
+        obs = {agent: self._obs[agent] for agent in ready}
+        rewards = {agent: self._rewards[agent] for agent in ready}
+        for agent in ready:
+            self._rewards[agent] = 0.0
+        terminations = {agent: self._terminated for agent in ready}
+        truncations = {agent: truncated for agent in ready}
+        infos = {agent: self._infos[agent] for agent in ready}
+        return obs, rewards, terminations, truncations, infos
+
+    def _advance(self):
+        """Advance to the next tick where an agent is due to act or actions
+        are due to be applied, applying the actions in one joint step.
+        """
+        next_ready = min(
+            (self._ready_tick[agent] for agent in self.agents
+             if agent not in self._pending),
+            default=None
+        )
+        next_due = min(
+            (due for due, _ in self._pending.values()), default=None
+        )
+        if next_due is None or (next_ready is not None
+                                and next_ready <= next_due):
+            self.tick = next_ready
+            return
+
+        due_actions = {}
+        for agent, (due, action) in list(self._pending.items()):
+            if due == next_due:
+                due_actions[agent] = action
+                del self._pending[agent]
+        self.tick = next_due
+        obs, rewards, terminations, _, infos = self.env.step_joint(
+            due_actions
+        )
+        self.tick += 1
+        self._obs = obs
+        self._infos = infos
+        for agent, reward in rewards.items():
+            self._rewards[agent] += reward
+        self._terminated = any(terminations.values())
+
+    def render(self):
+        return self.env.render()
+
+    def close(self):
+        self.env.close()
@@ -3,6 +3,16 @@ import numpy as np
 from nasim_with_defender.envs.host_vector import HostVector
 from nasim_with_defender.envs.observation import Observation
 
+# observation view modes (see ObservationView)
+FULL_VIEW = "full"
+CHANGES_VIEW = "changes"
+ACTION_VIEW = "action"
+
+# full views of states with at most this many features are rewritten with a
+# single copy of the state, which is faster than finding the changed hosts
+# for small networks
+FULL_VIEW_COPY_MAX_SIZE = 2**14
+
 
 class State:
     """A state in the NASim Environment.
@@ -13,27 +23,82 @@ class State:
 
     ...
 
+    Internally the state is split into two matrices. The static features of
+    each host (address, value, discovery value, OS, services and processes)
+    are stored in a read-only matrix that is built once from the scenario
+    and shared by every copy of the state. The dynamic features (compromised,
+    reachable, discovered and access) are stored in a small ``(num_hosts, 4)``
+    matrix owned by each state, so copying a state only copies the dynamic
+    matrix. The full state tensor is assembled on demand.
+
+    Any static host row that is written (e.g. by a defender action) is first
+    copied into a small per-state mapping of row overrides that is shared
+    between copies until written again. The overrides are merged into a new
+    shared static matrix once they grow beyond a quarter of the hosts.
+
+    Subnet firewall permissions are shared with the network until they are
+    changed by a defender action, after which the state holds its own copy
+    of them, which is again shared between copies until written.
+
+    ...
+
     Attributes
     ----------
     tensor : numpy.Array
-        tensor representation of the state of network
+        tensor representation of the state of network (assembled on each
+        access, so modifying it does not affect the state)
+    static_tensor : numpy.Array
+        read-only tensor of the static host features (the dynamic feature
+        columns of this tensor are not used)
     host_num_map : dict
         mapping from host address to host number (this is used
         to map host address to host row in the network tensor)
     """
 
+    # compromised, reachable, discovered and two access level bits
+    packed_bits_per_host = 5
+
+    # columns of dynamic host feature matrix
+    _compromised_col = 0
+    _reachable_col = 1
+    _discovered_col = 2
+    _access_col = 3
+
     def __init__(self, network_tensor, host_num_map):
         """
         Parameters
         ----------
-        state_tensor : np.Array
-            the tensor representation of the network state
+        network_tensor : np.Array
+            the tensor representation of the network state, with one row
+            per host. The dynamic columns (compromised, reachable,
+            discovered and access) are copied into a separate array, while
+            the remaining static columns are kept as a read-only view of
+            the tensor that is shared with copies of the state. The state
+            takes ownership of the tensor, so it should not be modified
+            after being passed in.
         host_num_map : dict
             mapping from host address to host number (this is used
             to map host address to host row in the network tensor)
         """
-        self.tensor = network_tensor
         self.host_num_map = host_num_map
+        self._dynamic_idxs = np.array([
+            HostVector._compromised_idx,
+            HostVector._reachable_idx,
+            HostVector._discovered_idx,
+            HostVector._access_idx
+        ])
+        self._dynamic = network_tensor[:, self._dynamic_idxs]
+        static = network_tensor.view()
+        static.flags.writeable = False
+        self._static = static
+        # static row overrides, and the subset of them that are not shared
+        # with any other state
+        self._static_rows = {}
+        self._owned_rows = set()
+        # subnet firewall permissions, or None if they are the network's,
+        # and whether they are not shared with any other state
+        self._subnet_permissions = None
+        self._owns_permissions = False
 
     @classmethod
     def tensorize(cls, network):
@@ -58,20 +123,10 @@ class State:
 
     @classmethod
     def generate_random_initial_state(cls, network):
-        h0 = network.hosts[(1, 0)]
-        h0_vector = HostVector.vectorize_random(
-            h0, network.address_space_bounds
-        )
-        tensor = np.zeros(
-            (len(network.hosts), h0_vector.state_size),
-            dtype=np.float32
+        state = cls.tensorize(network)
+        state.randomize_host_configs(
+            network, network.np_random, keep_sensitive_vulnerable=False
         )
-        for host_addr, host in network.hosts.items():
-            host_num = network.host_num_map[host_addr]
-            HostVector.vectorize_random(
-                host, network.address_space_bounds, tensor[host_num]
-            )
-        state = cls(tensor, network.host_num_map)
         # ensure host state set correctly
         return network.reset(state)
 
@@ -81,6 +136,43 @@ class State:
             s_array = s_array.reshape(state_shape)
         return State(s_array, host_num_map)
 
+    @classmethod
+    def from_key(cls, key, template_state):
+        """Construct state from a packed state key.
+
+        Parameters
+        ----------
+        key : bytes or numpy.Array
+            the packed key, as returned by :func:`key` or :func:`packed`.
+            Only the leading dynamic host features are decoded.
+        template_state : State
+            a state of the same scenario, which is used for the static host
+            features (address, value, OS, services, etc) and firewall
+            permissions
+
+        Returns
+        -------
+        State
+            a new state with the same static features as template_state and
+            the dynamic features encoded in key
+        """
+        num_hosts = len(template_state.host_num_map)
+        if isinstance(key, bytes):
+            key = np.frombuffer(key, dtype=np.uint8)
+        bits = np.unpackbits(
+            key, count=num_hosts*cls.packed_bits_per_host
+        ).reshape(num_hosts, cls.packed_bits_per_host)
+        dynamic = np.empty((num_hosts, 4), dtype=np.float32)
+        dynamic[:, :3] = bits[:, :3]
+        dynamic[:, cls._access_col] = bits[:, 3] + 2*bits[:, 4]
+        return template_state._with_dynamic(dynamic)
+
+    @classmethod
+    def packed_size(cls, num_hosts):
+        """Get number of bytes in packed state key for given number of hosts
+        """
+        return -(-num_hosts*cls.packed_bits_per_host // 8)
+
     @classmethod
     def reset(cls):
         """Reset any class attributes for state """
@@ -93,11 +185,66 @@ class State:
             hosts.append((host_addr, self.get_host(host_addr)))
         return hosts
 
-    def copy(self):
-        new_tensor = np.copy(self.tensor)
-        return State(new_tensor, self.host_num_map)
+    @property
+    def tensor(self):
+        return self.numpy()
+
+    @property
+    def static_tensor(self):
+        if self._static_rows:
+            self._merge_static_rows()
+        return self._static
 
-    def get_initial_observation(self, fully_obs):
+    def copy(self):
+        if len(self._static_rows) > len(self.host_num_map) // 4:
+            self._merge_static_rows()
+        return self._with_dynamic(np.copy(self._dynamic))
+
+    def _with_dynamic(self, dynamic):
+        new_state = State.__new__(State)
+        new_state.host_num_map = self.host_num_map
+        new_state._dynamic_idxs = self._dynamic_idxs
+        new_state._dynamic = dynamic
+        new_state._static = self._static
+        # static row overrides are now shared with the new state
+        self._owned_rows = set()
+        new_state._static_rows = dict(self._static_rows)
+        new_state._owned_rows = set()
+        self._owns_permissions = False
+        new_state._subnet_permissions = self._subnet_permissions
+        new_state._owns_permissions = False
+        return new_state
+
+    def _merge_static_rows(self):
+        static = np.copy(self._static)
+        for host_idx, row in self._static_rows.items():
+            static[host_idx] = row
+        static.flags.writeable = False
+        self._static = static
+        self._static_rows = {}
+        self._owned_rows = set()
+
+    def _get_static_row(self, host_idx):
+        row = self._static_rows.get(host_idx)
+        if row is None:
+            return self._static[host_idx]
+        return row
+
+    def _get_host_rows(self, host_idxs):
+        rows = self._static[host_idxs]
+        if self._static_rows:
+            for i, host_idx in enumerate(host_idxs):
+                if host_idx in self._static_rows:
+                    rows[i] = self._static_rows[host_idx]
+        rows[:, self._dynamic_idxs] = self._dynamic[host_idxs]
+        return rows
+
+    def _get_host_vector(self, host_idx):
+        vector = np.copy(self._get_static_row(host_idx))
+        vector[self._dynamic_idxs] = self._dynamic[host_idx]
+        return HostVector(vector)
+
+    def get_initial_observation(self, fully_obs, obs=None):
         """Get the initial observation of network.
 
         Returns
@@ -105,23 +252,27 @@ class State:
         Observation
             an observation object
         """
-        obs = Observation(self.shape())
+        if obs is None:
+            obs = Observation(self.shape())
+        else:
+            obs.clear()
         if fully_obs:
             obs.from_state(self)
             return obs
 
-        for host_addr, host in self.hosts:
-            if not host.reachable:
-                continue
-            host_obs = host.observe(address=True,
-                                    reachable=True,
-                                    discovered=True)
-            host_idx = self.get_host_idx(host_addr)
-            obs.update_from_host(host_idx, host_obs)
+        for host_idx in np.flatnonzero(self.reachable_mask()):
+            host = self._get_host_vector(host_idx)
+            host.observe(address=True,
+                         reachable=True,
+                         discovered=True,
+                         out=obs.get_host_row(host_idx))
         return obs
 
-    def get_observation(self, action, action_result, fully_obs):
-        obs = Observation(self.shape())
+    def get_observation(self, action, action_result, fully_obs, obs=None):
+        if obs is None:
+            obs = Observation(self.shape())
+        else:
+            obs.clear()
         obs.from_action_result(action_result)
         if fully_obs:
             obs.from_state(self)
@@ -165,114 +316,437 @@ class State:
             obs_kwargs["processes"] = True
             obs_kwargs["access"] = True
         elif action.is_subnet_scan():
-            for host_addr in action_result.discovered:
-                discovered = action_result.discovered[host_addr]
-                if not discovered:
-                    continue
-                d_idx, d_host = self.get_host_and_idx(host_addr)
-                newly_discovered = action_result.newly_discovered[host_addr]
-                d_obs = d_host.observe(
-                    discovery_value=newly_discovered, **obs_kwargs
-                )
-                obs.update_from_host(d_idx, d_obs)
+            if action_result.discovered_mask is not None:
+                d_idxs = np.flatnonzero(action_result.discovered_mask)
+                newly_discovered = action_result.newly_discovered_mask[d_idxs]
+            else:
+                # result only has address keyed dicts
+                d_addrs = [
+                    a for a, d in action_result.discovered.items() if d
+                ]
+                d_idxs = [self.host_num_map[a] for a in d_addrs]
+                newly_discovered = [
+                    action_result.newly_discovered[a] for a in d_addrs
+                ]
+            d_rows = self._get_host_rows(d_idxs)
+            d_obs = np.where(
+                HostVector.observation_mask(**obs_kwargs), d_rows, 0
+            ).astype(np.float32, copy=False)
+            dv_idx = HostVector._discovery_value_idx
+            d_obs[newly_discovered, dv_idx] = d_rows[newly_discovered, dv_idx]
+            obs.update_from_hosts(d_idxs, d_obs)
             # this is for target host (where scan was performed on)
             obs_kwargs["compromised"] = True
         else:
             raise NotImplementedError(f"Action {action} not implemented")
-
-        target_obs = t_host.observe(**obs_kwargs)
-        obs.update_from_host(t_idx, target_obs)
+        t_host.observe(out=obs.get_host_row(t_idx), **obs_kwargs)
         return obs
 
-    def get_observation_defener(self, action_defender, action_result, fully_obs):
-        obs = Observation(self.shape())
+    def get_initial_observations(self, views):
+        """Reset observation views to the initial observation of network.
+
+        Parameters
+        ----------
+        views : list[ObservationView]
+            the views to reset, each is updated in place
+
+        Returns
+        -------
+        list[Observation]
+            the observation of each view
+        """
+        for view in views:
+            obs = view.obs
+            if view.mode == FULL_VIEW:
+                obs.clear()
+                obs.from_state(self)
+                view.mask_rows(slice(None, obs.aux_row))
+            elif view.mode == ACTION_VIEW:
+                self.get_initial_observation(False, obs=obs)
+                view.mask_rows(obs._written_rows or [])
+            else:
+                obs.clear()
+            view.last_state = self
+        return [view.obs for view in views]
+
+    def get_observations(self, views, actions, action_results):
+        """Update observation views with the transition into this state.
+
+        Each view is updated in place in its own buffer. Full and changes
+        views only write the rows of hosts that changed since the state the
+        view was last updated with, and the changed hosts and their rows are
+        only computed once for all views that were last updated with the
+        same state. Full views of small states are instead rewritten with a
+        single copy of the state (see ``FULL_VIEW_COPY_MAX_SIZE``).
+
+        Parameters
+        ----------
+        views : list[ObservationView]
+            the views to update
+        actions : list[Action]
+            the action observed by each view, only used by action views
+        action_results : list[ActionResult]
+            the result of the action of each view, which is observed in the
+            auxiliary row
+
+        Returns
+        -------
+        list[Observation]
+            the observation of each view
+        """
+        changes = {}
+        copy_full = self._static.size <= FULL_VIEW_COPY_MAX_SIZE
+        for view, action, result in zip(views, actions, action_results):
+            obs = view.obs
+            last_state = view.last_state
+            if view.mode == ACTION_VIEW:
+                self.get_observation(action, result, False, obs=obs)
+                view.mask_rows(obs._written_rows)
+            elif view.mode == FULL_VIEW \
+                    and (copy_full or last_state is None):
+                # every host row is overwritten, and the auxiliary row
+                # features are all overwritten by the action result
+                obs.from_state(self)
+                view.mask_rows(slice(None, obs.aux_row))
+                obs.from_action_result(result)
+            elif last_state is None:
+                obs.clear()
+                obs.from_action_result(result)
+            else:
+                key = id(last_state)
+                if key not in changes:
+                    changed = self.changed_hosts(last_state)
+                    changes[key] = (changed, self._get_host_rows(changed))
+                changed, rows = changes[key]
+                if view.mode == CHANGES_VIEW:
+                    obs.clear()
+                if len(changed) > 0:
+                    obs.update_from_hosts(changed, rows)
+                    view.mask_rows(changed)
+                obs.from_action_result(result)
+            view.last_state = self
+        return [view.obs for view in views]
+
+    def changed_hosts(self, other):
+        """Get host numbers of hosts whose features differ from those in
+        another state of the same network.
+
+        Parameters
+        ----------
+        other : State
+            the other state
+
+        Returns
+        -------
+        numpy.Array
+            the changed host numbers, in increasing order
+        """
+        changed = (self._dynamic != other._dynamic).any(axis=1)
+        if self._static is not other._static:
+            changed |= (self.static_tensor != other.static_tensor).any(axis=1)
+            return np.flatnonzero(changed)
+        for host_idx in self._static_rows.keys() | other._static_rows.keys():
+            row = self._static_rows.get(host_idx)
+            other_row = other._static_rows.get(host_idx)
+            if row is not other_row and not np.array_equal(
+                self._get_static_row(host_idx),
+                other._get_static_row(host_idx)
+            ):
+                changed[host_idx] = True
+        return np.flatnonzero(changed)
+
+    def get_observation_defener(self,
+                                action_defender,
+                                action_result,
+                                fully_obs,
+                                obs=None):
+        if obs is None:
+            obs = Observation(self.shape())
+        else:
+            obs.clear()
         obs.from_action_result(action_result)
         if fully_obs:
             obs.from_state(self)
             return obs
 
-        if action_defender.is_noop():
-            return obs
-
         if not action_result.success:
             # action failed so no observation
             return obs
 
+        # defender observes the host features it changed
         t_idx, t_host = self.get_host_and_idx(action_defender.target)
         obs_kwargs = dict(
-            address=True,       # must be true for success
+            address=True,
             compromised=False,
-            reachable=True,     # must be true for success
-            discovered=True,    # must be true for success
+            reachable=False,
+            discovered=False,
             value=False,
-            # discovery_value=False,    # this is only added as needed
             services=False,
             processes=False,
             os=False,
             access=False
         )
-        # defender / action
         if action_defender.is_change_os():
-            obs_kwargs["os"] = False
+            obs_kwargs["os"] = True
         elif action_defender.is_change_firewall():
-            obs_kwargs["firewall"] = False
+            obs_kwargs["services"] = True
         elif action_defender.is_stop_service():
-            obs_kwargs["services"] = False
+            obs_kwargs["services"] = True
         elif action_defender.is_stop_process():
-            obs_kwargs["processes"] = False
+            obs_kwargs["processes"] = True
         else:
-            raise NotImplementedError(f"Defender Action {action_defender} not implemented")
-        target_obs = t_host.observe(**obs_kwargs)
-        obs.update_from_host(t_idx, target_obs)
+            raise NotImplementedError(
+                f"Defender Action {action_defender} not implemented"
+            )
+        t_host.observe(out=obs.get_host_row(t_idx), **obs_kwargs)
         return obs
 
     def shape_flat(self):
-        return self.numpy_flat().shape
+        return (self._static.size, )
 
     def shape(self):
-        return self.tensor.shape
+        return self._static.shape
 
     def numpy_flat(self):
-        return self.tensor.flatten()
+        return self.numpy().reshape(-1)
 
-    def numpy(self):
-        return self.tensor
+    def numpy(self, out=None):
+        """Get the full state tensor.
+
+        Parameters
+        ----------
+        out : numpy.Array, optional
+            if not None, the tensor is written into this array rather than
+            a new array (default=None)
+
+        Returns
+        -------
+        numpy.Array
+            the state tensor, assembled from the static and dynamic host
+            features
+        """
+        if out is None:
+            out = np.empty(self._static.shape, dtype=np.float32)
+        out[:] = self._static
+        for host_idx, row in self._static_rows.items():
+            out[host_idx] = row
+        out[:, self._dynamic_idxs] = self._dynamic
+        return out
 
     def update_host(self, host_addr, host_vector):
         host_idx = self.host_num_map[host_addr]
-        self.tensor[host_idx] = host_vector.vector
+        vector = host_vector.vector
+        self._dynamic[host_idx] = vector[self._dynamic_idxs]
+        static_row = self._get_static_row(host_idx)
+        static_changed = static_row != vector
+        static_changed[self._dynamic_idxs] = False
+        if static_changed.any():
+            self._get_writable_static_row(host_idx)[:] = vector
+
+    def _get_writable_static_row(self, host_idx):
+        if host_idx not in self._owned_rows:
+            self._static_rows[host_idx] = np.copy(
+                self._get_static_row(host_idx)
+            )
+            self._owned_rows.add(host_idx)
+        return self._static_rows[host_idx]
+
+    def get_host_config(self, host_idx):
+        """Get read-only OS, services and processes features of host, in
+        that order, given by host number
+        """
+        start = HostVector._os_start_idx
+        stop = HostVector._process_start_idx + HostVector.num_processes
+        config = self._get_static_row(host_idx)[start:stop]
+        config.flags.writeable = False
+        return config
+
+    def set_host_os(self, host_idx, os_num):
+        """Set the OS of host, given by host number and OS number """
+        row = self._get_writable_static_row(host_idx)
+        row[HostVector._os_idx_slice()] = 0
+        row[HostVector._get_os_idx(os_num)] = 1
+
+    def stop_host_service(self, host_idx, srv_num):
+        """Stop service running on host, given by host and service number """
+        row = self._get_writable_static_row(host_idx)
+        row[HostVector._get_service_idx(srv_num)] = 0
+
+    def stop_host_process(self, host_idx, proc_num):
+        """Stop process running on host, given by host and process number """
+        row = self._get_writable_static_row(host_idx)
+        row[HostVector._get_process_idx(proc_num)] = 0
+
+    def get_subnet_permissions(self, default):
+        """Get the subnet firewall permissions of this state.
+
+        Parameters
+        ----------
+        default : numpy.Array
+            the network's subnet permissions (see :func:`Network.compile`)
+
+        Returns
+        -------
+        numpy.Array
+            (num_subnets, num_subnets, num_services) whether subnet
+            firewalls permit traffic for service from each subnet to each
+            subnet, which is default unless a firewall has been changed in
+            this state
+        """
+        if self._subnet_permissions is None:
+            return default
+        return self._subnet_permissions
+
+    def deny_subnet_traffic(self, default, dest_subnet, src_mask, srv_nums):
+        """Deny traffic into a subnet for the given services and source
+        subnets, only updating the affected permissions.
+
+        Parameters
+        ----------
+        default : numpy.Array
+            the network's subnet permissions (see :func:`Network.compile`)
+        dest_subnet : int
+            destination subnet
+        src_mask : numpy.Array
+            boolean array of source subnets to deny, by subnet number
+        srv_nums : numpy.Array
+            service numbers to deny
+        """
+        if not self._owns_permissions:
+            self._subnet_permissions = np.copy(
+                self.get_subnet_permissions(default)
+            )
+            self._owns_permissions = True
+        self._subnet_permissions[
+            np.ix_(np.flatnonzero(src_mask), [dest_subnet], srv_nums)
+        ] = False
+
+    def randomize_host_configs(self,
+                               network,
+                               np_random,
+                               keep_sensitive_vulnerable=True):
+        """Resample the OS, services and processes of every host in place.
+
+        Every host gets an OS chosen uniformly at random, and each service
+        and process is running with probability 0.5, all drawn at once. Only
+        this state uses the new configurations, any copies of it are not
+        affected.
+
+        Parameters
+        ----------
+        network : Network
+            the network of the state
+        np_random : numpy.random.Generator
+            random number generator
+        keep_sensitive_vulnerable : bool, optional
+            whether to ensure that every sensitive host is vulnerable to an
+            exploit that gives root access, or to an exploit and a privilege
+            escalation. If False the goal may be unreachable (default=True)
+        """
+        start = HostVector._os_start_idx
+        stop = HostVector._process_start_idx + HostVector.num_processes
+        num_os = HostVector.num_os
+        static = np.copy(self.static_tensor)
+        configs = static[:, start:stop]
+
+        draws = np_random.random(configs.shape)
+        os_nums = draws[:, :num_os].argmax(axis=1)
+        configs[:] = draws < 0.5
+        configs[:, :num_os] = 0
+        configs[np.arange(len(configs)), os_nums] = 1
+
+        if keep_sensitive_vulnerable:
+            sensitive = network.sensitive_host_nums
+            vulnerable = network.root_vulnerable_hosts(configs[sensitive])
+            for host_num in sensitive[~vulnerable]:
+                network.make_root_vulnerable(configs[host_num], np_random)
+
+        static.flags.writeable = False
+        self._static = static
+        self._static_rows = {}
+        self._owned_rows = set()
+
+    def reset_dynamic_features(self, reachable):
+        """Reset the dynamic features of every host in place.
+
+        No host is compromised or accessed, and only the given hosts are
+        reachable and discovered.
+
+        Parameters
+        ----------
+        reachable : numpy.Array
+            boolean array of which hosts are reachable, by host number
+        """
+        self._dynamic[:] = 0
+        self._dynamic[:, self._reachable_col] = reachable
+        self._dynamic[:, self._discovered_col] = reachable
 
     def get_host(self, host_addr):
         host_idx = self.host_num_map[host_addr]
-        return HostVector(self.tensor[host_idx])
+        return self._get_host_vector(host_idx)
 
     def get_host_idx(self, host_addr):
         return self.host_num_map[host_addr]
 
     def get_host_and_idx(self, host_addr):
         host_idx = self.host_num_map[host_addr]
-        return host_idx, HostVector(self.tensor[host_idx])
+        return host_idx, self._get_host_vector(host_idx)
 
     def host_reachable(self, host_addr):
-        return self.get_host(host_addr).reachable
+        host_idx = self.host_num_map[host_addr]
+        return self._dynamic[host_idx, self._reachable_col]
 
     def host_compromised(self, host_addr):
-        return self.get_host(host_addr).compromised
+        host_idx = self.host_num_map[host_addr]
+        return self._dynamic[host_idx, self._compromised_col]
 
     def host_discovered(self, host_addr):
-        return self.get_host(host_addr).discovered
+        host_idx = self.host_num_map[host_addr]
+        return self._dynamic[host_idx, self._discovered_col]
 
     def host_has_access(self, host_addr, access_level):
-        return self.get_host(host_addr).access >= access_level
+        host_idx = self.host_num_map[host_addr]
+        return self._dynamic[host_idx, self._access_col] >= access_level
+
+    def compromised_mask(self):
+        """Get boolean array of which hosts are compromised, by host number """
+        return self._dynamic[:, self._compromised_col] > 0
+
+    def reachable_mask(self):
+        """Get boolean array of which hosts are reachable, by host number """
+        return self._dynamic[:, self._reachable_col] > 0
+
+    def discovered_mask(self):
+        """Get boolean array of which hosts are discovered, by host number """
+        return self._dynamic[:, self._discovered_col] > 0
+
+    def access_levels(self):
+        """Get array of access level on each host, by host number """
+        return self._dynamic[:, self._access_col].copy()
 
     def set_host_compromised(self, host_addr):
-        self.get_host(host_addr).compromised = True
+        host_idx = self.host_num_map[host_addr]
+        self._dynamic[host_idx, self._compromised_col] = 1
 
     def set_host_reachable(self, host_addr):
-        self.get_host(host_addr).reachable = True
+        host_idx = self.host_num_map[host_addr]
+        self._dynamic[host_idx, self._reachable_col] = 1
 
     def set_host_discovered(self, host_addr):
-        self.get_host(host_addr).discovered = True
+        host_idx = self.host_num_map[host_addr]
+        self._dynamic[host_idx, self._discovered_col] = 1
+
+    def set_hosts_reachable(self, mask):
+        """Set hosts reachable, given boolean array by host number """
+        self._dynamic[mask, self._reachable_col] = 1
+
+    def set_hosts_discovered(self, mask):
+        """Set hosts discovered, given boolean array by host number """
+        self._dynamic[mask, self._discovered_col] = 1
+
+    def discovery_values(self):
+        """Get array of discovery value of each host, by host number """
+        return self.static_tensor[:, HostVector._discovery_value_idx]
 
     def get_host_value(self, host_address):
         return self.hosts[host_address].get_value()
@@ -284,14 +758,11 @@ class State:
         return self.get_host(host_addr).is_running_os(os)
 
     def get_total_host_value(self):
-        total_value = 0
-        for host_addr in self.host_num_map:
-            host = self.get_host(host_addr)
-            total_value += host.value
-        return total_value
+        values = self.static_tensor[:, HostVector._value_idx]
+        return values.sum()
 
     def state_size(self):
-        return self.tensor.size
+        return self._static.size
 
     def get_readable(self):
         host_obs = []
@@ -308,8 +779,136 @@ class State:
             output += str(host) + "\n"
         return output
 
+    def packed(self):
+        """Get the dynamic host features packed into a bit array.
+
+        Packs the compromised, reachable and discovered flags and access
+        level of each host into 5 bits, which along with the scenario fully
+        determines the state as long as no defender action has changed the
+        hosts or firewalls (see :func:`from_key` and :func:`key`).
+
+        Returns
+        -------
+        numpy.Array
+            1D uint8 array of packed bits
+        """
+        dynamic = self._dynamic.astype(np.uint8)
+        access = dynamic[:, self._access_col]
+        bits = np.concatenate([
+            dynamic[:, :self._access_col] > 0,
+            (access & 1)[:, None],
+            (access >> 1)[:, None]
+        ], axis=1)
+        return np.packbits(bits)
+
+    def key(self):
+        """Get compact hashable key of the state.
+
+        Since defender actions can change the OS, services and processes of
+        hosts and the subnet firewalls, the packed host configurations and
+        any firewall permissions that differ from the network's are appended
+        to the packed dynamic host features.
+
+        Returns
+        -------
+        bytes
+            the packed dynamic host features (see :func:`packed`), followed
+            by the packed host configurations and firewall permissions
+        """
+        start = HostVector._os_start_idx
+        stop = HostVector._process_start_idx + HostVector.num_processes
+        configs = self._static[:, start:stop] > 0
+        if self._static_rows:
+            configs = configs.copy()
+            for host_idx, row in self._static_rows.items():
+                configs[host_idx] = row[start:stop] > 0
+        key = self.packed().tobytes() + np.packbits(configs).tobytes()
+        if self._subnet_permissions is not None:
+            key += np.packbits(self._subnet_permissions).tobytes()
+        return key
+
     def __hash__(self):
-        return hash(str(self.tensor))
+        return hash(self.key())
 
     def __eq__(self, other):
-        return np.array_equal(self.tensor, other.tensor)
+        if not np.array_equal(self._dynamic, other._dynamic):
+            return False
+        if self._subnet_permissions is not other._subnet_permissions \
+           and (self._subnet_permissions is None
+                or other._subnet_permissions is None
+                or not np.array_equal(self._subnet_permissions,
+                                      other._subnet_permissions)):
+            return False
+        if self._static is other._static \
+           and not self._static_rows and not other._static_rows:
+            return True
+        return np.array_equal(self.static_tensor, other.static_tensor)
+
+
+class ObservationView:
+    """The observability of an agent, along with a preallocated observation
+    buffer that is updated in place (see :func:`State.get_observations`).
+
+    There are three modes:
+
+    - full: every host is observed, only rows of hosts that changed are
+      rewritten each step
+    - changes: only hosts that changed in the last transition are observed,
+      e.g. for a defender that is alerted to changes on the network
+    - action: only what the last action revealed is observed, i.e. the
+      attacker's partially observable view (see
+      :func:`State.get_observation`)
+
+    In every mode only the host features in the view's feature mask are
+    observed.
+
+    Attributes
+    ----------
+    mode : str
+        the view mode, one of 'full', 'changes' or 'action'
+    feature_mask : numpy.Array
+        boolean mask of observed host vector features
+    obs : Observation
+        the observation buffer
+    last_state : State
+        the state the view was last updated with, or None
+    """
+
+    def __init__(self, state_shape, mode=FULL_VIEW, features=None):
+        """
+        Parameters
+        ----------
+        state_shape : (int, int)
+            2D shape of the state (i.e. num_hosts, host_vector_size)
+        mode : str, optional
+            the view mode (default='full')
+        features : dict, optional
+            the host features observed, as keyword arguments of
+            :func:`HostVector.observation_mask`. If None every feature is
+            observed (default=None)
+        """
+        assert mode in (FULL_VIEW, CHANGES_VIEW, ACTION_VIEW), \
+            f"Invalid observation view mode: {mode}"
+        self.mode = mode
+        if features is None:
+            self.feature_mask = np.ones(state_shape[1], dtype=bool)
+        else:
+            self.feature_mask = HostVector.observation_mask(**features)
+        self._hidden_idxs = np.flatnonzero(~self.feature_mask)
+        self.obs = Observation(state_shape)
+        self.last_state = None
+
+    def mask_rows(self, host_idxs):
+        """Zero the features not in view for rows of observation buffer.
+
+        Parameters
+        ----------
+        host_idxs : slice or list[int]
+            the host rows to mask
+        """
+        if len(self._hidden_idxs) == 0:
+            return
+        if isinstance(host_idxs, slice):
+            self.obs.tensor[host_idxs, self._hidden_idxs] = 0
+        elif len(host_idxs) > 0:
+            self.obs.tensor[np.ix_(host_idxs, self._hidden_idxs)] = 0
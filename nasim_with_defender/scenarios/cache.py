@@ -0,0 +1,196 @@
+"""This module contains an on-disk cache of built scenarios.
+
+Loading a scenario from a yaml file (parsing and validating it) or generating
+a scenario can be slow, so fully built :class:`Scenario` objects can be
+cached on disk, along with the arrays precomputed from them when the first
+environment is created (see ``Scenario.compiled``). On a cache hit the
+parsing, validation and generation are skipped entirely.
+
+Cache entries are keyed by a hash of:
+
+- the contents of the yaml file and the scenario name, for loaded scenarios
+- the generator parameters, including the seed, for generated scenarios
+  (scenarios generated without a seed are never cached)
+- the source code of the modules used to build scenarios and environments,
+  so entries are automatically invalidated when that code changes
+
+The cache is disabled by default. It is enabled by setting the
+``NASIM_SCENARIO_CACHE`` environment variable to a directory, or by calling
+:func:`set_cache_dir`.
+"""
+import os
+import pickle
+import hashlib
+import tempfile
+from functools import lru_cache
+
+# environment variable used to set default cache directory
+CACHE_DIR_ENV_VAR = "NASIM_SCENARIO_CACHE"
+
+# increment when the format of cache entries changes
+CACHE_FORMAT_VERSION = 1
+
+# source files, relative to the package directory, that determine how
+# scenarios and the arrays precomputed from them are built
+SOURCE_FILES = [
+    "scenarios/scenario.py",
+    "scenarios/loader.py",
+    "scenarios/generator.py",
+    "scenarios/host.py",
+    "scenarios/utils.py",
+    "envs/network.py"
+]
+
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_cache_dir = os.environ.get(CACHE_DIR_ENV_VAR) or None
+
+
+def set_cache_dir(cache_dir):
+    """Set the directory used for the scenario cache.
+
+    Parameters
+    ----------
+    cache_dir : str or None
+        the cache directory, which is created if it does not exist. If None
+        the cache is disabled.
+    """
+    global _cache_dir
+    _cache_dir = cache_dir
+
+
+def get_cache_dir():
+    """Get the directory used for the scenario cache, or None if disabled """
+    return _cache_dir
+
+
+@lru_cache(maxsize=None)
+def _source_hash():
+    h = hashlib.sha256()
+    h.update(str(CACHE_FORMAT_VERSION).encode())
+    for rel_path in SOURCE_FILES:
+        with open(os.path.join(_PACKAGE_DIR, rel_path), "rb") as fin:
+            h.update(fin.read())
+    return h.hexdigest()
+
+
+def _hash_key(*parts):
+    h = hashlib.sha256()
+    h.update(_source_hash().encode())
+    for part in parts:
+        h.update(b"\0")
+        h.update(part)
+    return h.hexdigest()
+
+
+def yaml_key(file_path, name=None):
+    """Get the cache key for a scenario loaded from a yaml file.
+
+    Parameters
+    ----------
+    file_path : str
+        path to scenario file
+    name : str, optional
+        the scenarios name (default=None)
+
+    Returns
+    -------
+    str
+        the cache key
+    """
+    with open(file_path, "rb") as fin:
+        content = fin.read()
+    return _hash_key(b"yaml", content, repr(name).encode())
+
+
+def generator_key(num_hosts, num_services, **params):
+    """Get the cache key for a generated scenario.
+
+    Parameters
+    ----------
+    num_hosts : int
+        number of hosts in network
+    num_services : int
+        number of services running on network
+    params : dict
+        other generator params (see :class:`ScenarioGenerator`)
+
+    Returns
+    -------
+    str or None
+        the cache key, or None if the scenario is not seeded and so should
+        not be cached
+    """
+    if params.get("seed", None) is None:
+        return None
+    params = dict(params, num_hosts=num_hosts, num_services=num_services)
+    return _hash_key(b"generated", repr(sorted(params.items())).encode())
+
+
+def _entry_path(key):
+    return os.path.join(_cache_dir, f"{key}.pkl")
+
+
+def load(key):
+    """Load scenario from the cache.
+
+    Parameters
+    ----------
+    key : str
+        the cache key
+
+    Returns
+    -------
+    Scenario or None
+        the cached scenario, or None if cache is disabled or there is no
+        valid entry for key
+    """
+    if _cache_dir is None or key is None:
+        return None
+    try:
+        with open(_entry_path(key), "rb") as fin:
+            return pickle.load(fin)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError,
+            ImportError):
+        return None
+
+
+def save(key, scenario):
+    """Save scenario to the cache.
+
+    The arrays precomputed from the scenario by the environment are computed
+    first, so they are included in the cache entry. The entry is written to
+    a temporary file and then moved into place, so concurrent processes never
+    read a partially written entry.
+
+    Parameters
+    ----------
+    key : str
+        the cache key
+    scenario : Scenario
+        the scenario to cache
+    """
+    if _cache_dir is None or key is None:
+        return
+    from nasim_with_defender.envs.network import Network
+    Network.compile(scenario)
+
+    os.makedirs(_cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=_cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fout:
+            pickle.dump(scenario, fout, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, _entry_path(key))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def clear():
+    """Remove all entries from the scenario cache """
+    if _cache_dir is None or not os.path.isdir(_cache_dir):
+        return
+    for filename in os.listdir(_cache_dir):
+        if filename.endswith(".pkl") or filename.endswith(".tmp"):
+            os.remove(os.path.join(_cache_dir, filename))
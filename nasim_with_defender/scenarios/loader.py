@@ -10,9 +10,6 @@ from nasim_with_defender.scenarios.host import Host
 
 # dictionary of valid key names and value types for config file
 VALID_CONFIG_KEYS = {
-    # defender defined
-    u.DEFENDER_CHANGE: list,
-    u.DEFENDER_STOP: list,
     u.SUBNETS: list,
     u.TOPOLOGY: list,
     u.SENSITIVE_HOSTS: dict,
@@ -29,7 +26,12 @@ VALID_CONFIG_KEYS = {
     u.FIREWALL: dict
 }
 
-OPTIONAL_CONFIG_KEYS = {u.STEP_LIMIT: int}
+OPTIONAL_CONFIG_KEYS = {
+    u.STEP_LIMIT: int,
+    # defender defined
+    u.DEFENDER_CHANGE: dict,
+    u.DEFENDER_STOP: dict
+}
 
 VALID_ACCESS_VALUES = ["user", "root", u.USER_ACCESS, u.ROOT_ACCESS]
 ACCESS_LEVEL_MAP = {
@@ -63,6 +65,32 @@ STOP_SERVICE_KEYS = {
     u.STOP_SERVICE_ACCESS: (str, int)
 }
 
+DEFENDER_CHANGE_KEYS = {
+    u.CHANGE_OS: CHANGE_OS_KEYS,
+    u.CHANGE_FIREWALL: CHANGE_FIREWALL_KEYS
+}
+
+DEFENDER_STOP_KEYS = {
+    u.STOP_PROC: STOP_PROC_KEYS,
+    u.STOP_SERVICE: STOP_SERVICE_KEYS
+}
+
+# (prob, cost, access) keys of each defender action
+DEFENDER_PARAM_KEYS = {
+    u.CHANGE_OS: (u.CHANGE_OS_PROB, u.CHANGE_OS_COST, u.CHANGE_OS_ACCESS),
+    u.CHANGE_FIREWALL: (
+        u.CHANGE_FIREWALL_PROB,
+        u.CHANGE_FIREWALL_COST,
+        u.CHANGE_FIREWALL_ACCESS
+    ),
+    u.STOP_PROC: (u.STOP_PROC_PROB, u.STOP_PROC_COST, u.STOP_PROC_ACCESS),
+    u.STOP_SERVICE: (
+        u.STOP_SERVICE_PROB,
+        u.STOP_SERVICE_COST,
+        u.STOP_SERVICE_ACCESS
+    )
+}
+
 # required keys for exploits
 EXPLOIT_KEYS = {
     u.EXPLOIT_SERVICE: str,
@@ -131,6 +159,7 @@ class ScenarioLoader:
         self._parse_firewall()
         self._parse_hosts()
         self._parse_step_limit()
+        self._parse_defender_actions()
         return self._construct_scenario()
 
     def _construct_scenario(self):
@@ -150,6 +179,8 @@ class ScenarioLoader:
         scenario_dict[u.FIREWALL] = self.firewall
         scenario_dict[u.HOSTS] = self.hosts
         scenario_dict[u.STEP_LIMIT] = self.step_limit
+        scenario_dict[u.DEFENDER_CHANGE] = self.defender_change
+        scenario_dict[u.DEFENDER_STOP] = self.defender_stop
         return Scenario(
             scenario_dict, name=self.name, generated=False
         )
@@ -611,4 +642,44 @@ class ScenarioLoader:
                 f"Step limit must be positive int: {step_limit} is invalid"
 
         self.step_limit = step_limit
-    
\ No newline at end of file
+    
+
+    def _parse_defender_actions(self):
+        self.defender_change = self.yaml_dict.get(u.DEFENDER_CHANGE, {})
+        self._validate_defender_actions(
+            self.defender_change, DEFENDER_CHANGE_KEYS
+        )
+        self.defender_stop = self.yaml_dict.get(u.DEFENDER_STOP, {})
+        self._validate_defender_actions(
+            self.defender_stop, DEFENDER_STOP_KEYS
+        )
+
+    def _validate_defender_actions(self, defender_actions, valid_keys):
+        for d_name, d in defender_actions.items():
+            assert d_name in valid_keys, \
+                (f"{d_name}. Defender action invalid. Must be one of "
+                 f"{list(valid_keys)}")
+            assert isinstance(d, dict), \
+                f"{d_name}. Defender action must be a dict."
+
+            for k, t in valid_keys[d_name].items():
+                assert k in d, f"{d_name}. Defender action missing key: '{k}'"
+                assert isinstance(d[k], t), \
+                    (f"{d_name}. Defender action '{k}' incorrect type. "
+                     f"Expected {t}")
+
+            prob_key, cost_key, access_key = DEFENDER_PARAM_KEYS[d_name]
+            assert 0 <= d[prob_key] <= 1.0, \
+                (f"{d_name}. Defender action probability, "
+                 f"'{d[prob_key]}' not a valid probability")
+
+            assert d[cost_key] >= 0, \
+                f"{d_name}. Defender action cost must be >= 0."
+
+            assert d[access_key] in VALID_ACCESS_VALUES, \
+                (f"{d_name}. Defender action access value "
+                 f"'{d[access_key]}' invalid. Must be one of "
+                 f"{VALID_ACCESS_VALUES}")
+
+            if isinstance(d[access_key], str):
+                d[access_key] = ACCESS_LEVEL_MAP[d[access_key]]
@@ -12,6 +12,9 @@ class Scenario:
         self.generated = generated
         self._e_map = None
         self._pe_map = None
+        # data precomputed from the scenario by the environment, e.g. the
+        # network permission arrays (see Network.compile)
+        self.compiled = {}
 
         # this is used for consistent positioning of
         # host state and obs in state and obs matrices
@@ -62,10 +65,11 @@ class Scenario:
     # Defender
     @property
     def change(self):
-        return self.scenario_dict[u.DEFENDER_CHANGE]
+        return self.scenario_dict.get(u.DEFENDER_CHANGE, {})
 
+    @property
     def stop(self):
-        return self.scenario_dict[u.DEFENDER_STOP]
+        return self.scenario_dict.get(u.DEFENDER_STOP, {})
 
     @property
     def exploit_map(self):
@@ -188,19 +192,19 @@ class Scenario:
     # Defender Setting
     @property
     def change_os_cost(self):
-        return self.scenario_dict[u.CHANGE_OS_COST]
+        return self.change[u.CHANGE_OS][u.CHANGE_OS_COST]
 
     @property
     def change_firewall_cost(self):
-        return self.scenario_dict[u.CHANGE_FIREWALL_COST]
+        return self.change[u.CHANGE_FIREWALL][u.CHANGE_FIREWALL_COST]
 
     @property
     def stop_processes_cost(self):
-        return self.scenario_dict[u.STOP_PROCESSES_COST]
+        return self.stop[u.STOP_PROC][u.STOP_PROC_COST]
 
     @property
     def stop_service_cost(self):
-        return self.scenario_dict[u.STOP_SERVICE_COST]
+        return self.stop[u.STOP_SERVICE][u.STOP_SERVICE_COST]
 
     @property
     def host_value_bounds(self):
@@ -59,20 +59,24 @@ HOST_VALUE = "value"
 # defender change
 DEFENDER_CHANGE = "defender_change"
 # defender change os action
+CHANGE_OS = "change_os"
 CHANGE_OS_COST = "cost"
 CHANGE_OS_PROB = "prob"
 CHANGE_OS_ACCESS = "access"
 # defender change firewall action
+CHANGE_FIREWALL = "change_firewall"
 CHANGE_FIREWALL_COST = "cost"
 CHANGE_FIREWALL_PROB = "prob"
 CHANGE_FIREWALL_ACCESS = "access"
 # defender stop 
 DEFENDER_STOP = "defender_stop"
 # defender stop processes action 
+STOP_PROC = "stop_processes"
 STOP_PROC_COST = "cost"
 STOP_PROC_PROB = "prob"
 STOP_PROC_ACCESS = "access"
 # defender stop service action
+STOP_SERVICE = "stop_service"
 STOP_SERVICE_COST= "cost"
 STOP_SERVICE_PROB= "prob"
 STOP_SERVICE_ACCESS = "access"
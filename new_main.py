@@ -1,8 +1,17 @@
 """A script for training a DQN agent and storing best policy """
 
+import torch
+
 import nasim_with_defender
 from nasim_with_defender.agents.dqn_agent import DQNAgent
 from nasim_with_defender.agents.dqn_agent_defender import DQNAgent_Defender
+from nasim_with_defender.agents.joint_replay import JointReplayMemory
+from nasim_with_defender.envs import AgentScheduler
+
+# minimum number of ticks between decisions of each agent, e.g. set the
+# defender period to k for a defender that acts every k attacker actions
+AGENT_PERIODS = {"attacker": 1, "defender": 1}
+REPLAY_SIZE = 10000
 
 if __name__ == "__main__":
 
@@ -10,11 +19,19 @@ if __name__ == "__main__":
                                              fully_obs=True,
                                              flat_actions=True,
                                              flat_obs=True)
+    # observations of both agents are stored once in a shared memory, apart
+    # from the auxiliary row with the result of each agents last action
+    memory = JointReplayMemory(REPLAY_SIZE,
+                               env.observation_space.shape,
+                               env.possible_agents,
+                               aux_size=env.last_obs.shape()[1],
+                               device=("cuda" if torch.cuda.is_available()
+                                       else "cpu"))
     dqn_agent = DQNAgent(env,
                          lr=0.001,
                          training_steps=2000000,
                          batch_size=32,
-                         replay_size=10000,
+                         replay=memory.agent_memory("attacker"),
                          final_epsilon=0.05,
                          exploration_steps=1000,
                          gamma=0.99,
@@ -26,53 +43,54 @@ if __name__ == "__main__":
                                            lr=0.001,
                                            training_steps=2000000,
                                            batch_size=32,
-                                           replay_size=10000,
+                                           replay=memory.agent_memory(
+                                               "defender"),
                                            final_epsilon=0.05,
                                            exploration_steps=1000,
                                            gamma=0.99,
                                            hidden_sizes=[64, 64],
                                            target_update_freq=1000,
                                            verbose=True,)
+
+    scheduler = AgentScheduler(env, periods=AGENT_PERIODS)
+    agents = {"attacker": dqn_agent, "defender": dqn_agent_defender}
     episode = 0
     while episode < 5000:
         episode += 1
-        o, _ = env.reset()
-        done = False
-        env_step_limit_reached = False
-
+        obs, _ = scheduler.reset()
+        frame_ids = memory.add_frames(obs)
+        returns = {agent: 0 for agent in agents}
         steps = 0
-        ak_episode_return = 0
-        df_episode_return = 0
-
-        while not done and not env_step_limit_reached and steps < 1000:
-            #attacker
-            a = dqn_agent.get_egreedy_action(o, dqn_agent.get_epsilon())
-
-            next_o, r, done, env_step_limit_reached, _ = dqn_agent.env.step(a)
-            dqn_agent.replay.store(o, a, next_o, r, done)
-            dqn_agent.steps_done += 1
-            loss, mean_v = dqn_agent.optimize()
-            dqn_agent.logger.add_scalar("attacker_loss", loss, dqn_agent.steps_done)
-            dqn_agent.logger.add_scalar("attacker_mean_v", mean_v, dqn_agent.steps_done)
-
-            o = next_o
-            ak_episode_return += r
-            steps += 1
-            #defender
-            a_d = dqn_agent_defender.get_egreedy_action(o, dqn_agent_defender.get_epsilon())
+        # observation frame and action of each agent at its last decision
+        last = {}
 
-            next_o_d, r_d, done_d, env_step_limit_reached_d, _ = dqn_agent_defender.env.step(a_d)
-            dqn_agent_defender.replay.store(o, a, next_o, r, done)
-            dqn_agent_defender.steps_done += 1
-            loss_d, mean_v_d = dqn_agent_defender.optimize()
-            dqn_agent_defender.logger.add_scalar("defender_loss", loss_d, dqn_agent_defender.steps_done)
-            dqn_agent_defender.logger.add_scalar("defender_mean_v", mean_v_d, dqn_agent_defender.steps_done)
+        while scheduler.agents:
+            actions = {}
+            for agent, o in obs.items():
+                actions[agent] = agents[agent].get_egreedy_action(
+                    o, agents[agent].get_epsilon()
+                )
+                last[agent] = (frame_ids[agent], actions[agent])
 
-            df_episode_return += r_d
-            o = next_o_d
+            obs, r, terminations, truncations, _ = scheduler.step(actions)
+            frame_ids = memory.add_frames(obs)
+            for agent in obs:
+                if agent not in last:
+                    continue
+                s_id, a = last[agent]
+                dqn = agents[agent]
+                memory.store(agent, s_id, a, frame_ids[agent], r[agent],
+                             terminations[agent])
+                dqn.steps_done += 1
+                loss, mean_v = dqn.optimize()
+                dqn.logger.add_scalar(f"{agent}_loss", loss, dqn.steps_done)
+                dqn.logger.add_scalar(f"{agent}_mean_v", mean_v,
+                                      dqn.steps_done)
+                returns[agent] += r[agent]
+            steps = scheduler.tick
 
-        print(f'###########################################################')
-        print(f'Attacker \n episode:{episode},reward:{ak_episode_return}, '
-              f'steps:{steps}, done:{dqn_agent.env.goal_reached()}')
-        print(f'Defender \n episode:{episode},reward:{df_episode_return}, '
-              f'steps:{steps}, done:{dqn_agent_defender.env.goal_reached()}')
\ No newline at end of file
+        print('###########################################################')
+        print(f'Attacker \n episode:{episode},reward:{returns["attacker"]}, '
+              f'steps:{steps}, done:{env.goal_reached()}')
+        print(f'Defender \n episode:{episode},reward:{returns["defender"]}, '
+              f'steps:{steps}, done:{env.goal_reached()}')